@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+import asyncio
 import logging
 import os
+from dataclasses import replace
+from functools import partial
 from datetime import datetime
 import uuid
 
 from app.database.connection import get_db
-from app.schemas.analysis import AnalysisResponse, CompareDocumentsRequest, ExportRequest
+from app.schemas.analysis import AnalysisResponse, ChangeDetail, CompareDocumentsRequest, ExportRequest, ReanalysisResponse
 from app.services.document_processor import DocumentProcessor
-from app.services.diff_analyzer import DiffAnalyzer
+from app.services.diff_analyzer import DiffAnalyzer, DiffChange, UNCHANGED_SINCE_PREVIOUS, REVERTED_TO_REFERENCE
+from app.services.word_diff import DIFF_ALGORITHMS
 from app.services.regulatory_matcher import RegulatoryMatcher
-from app.services.llm_analyzer import LLMAnalyzer
+from app.services.llm_analyzer import LLMAnalyzer, LLMAnalysisResult
+from app.services.llm_work_queue import BATCH, INTERACTIVE, REANALYSIS, LLMJob
 from app.services.report_generator import ReportGenerator
+from app.services.analysis_store import AnalysisStore
+from app.services.triage import TriageEngine
+from app.services.change_clusterer import cluster_changes, delta_signature
 from app.services.metrics import metrics_service
 from app.core.config import settings
 
@@ -23,10 +31,12 @@ router = APIRouter()
 
 # Initialize services
 document_processor = DocumentProcessor()
-diff_analyzer = DiffAnalyzer()
+diff_analyzer = DiffAnalyzer(algorithm=settings.DIFF_ALGORITHM)
 regulatory_matcher = RegulatoryMatcher()
 llm_analyzer = LLMAnalyzer()
 report_generator = ReportGenerator()
+analysis_store = AnalysisStore()
+triage_engine = TriageEngine.from_yaml(settings.TRIAGE_RULES_PATH) if settings.TRIAGE_ENABLED else TriageEngine()
 
 def validate_file(file: UploadFile) -> None:
     """Validate uploaded file"""
@@ -43,6 +53,79 @@ def validate_file(file: UploadFile) -> None:
             detail=f"Неподдерживаемый формат файла. Разрешены: {', '.join(settings.ALLOWED_EXTENSIONS_LIST)}"
         )
 
+def validate_analysis_id(analysis_id: Optional[str]) -> None:
+    """Validate analysis identifier format"""
+    if analysis_id is None:
+        return
+    try:
+        uuid.UUID(analysis_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный идентификатор анализа")
+
+def round_status_result(change: DiffChange, previous_row=None) -> LLMAnalysisResult:
+    """
+    Analysis result for a three-way change that does not need the LLM
+
+    A deviation unchanged since the previous draft keeps the verdict of the
+    previous analysis; without one it is left pending for reanalysis.
+    """
+    if change.round_status == REVERTED_TO_REFERENCE:
+        return LLMAnalysisResult(
+            comment="Лизингополучатель вернул подпункт к редакции СБЛ",
+            required_services=[],
+            severity="low",
+            confidence=1.0,
+            reasoning=f"Трехстороннее сравнение: {change.round_status}, анализ LLM не требуется"
+        )
+    if previous_row is None or previous_row.pending_reanalysis:
+        return LLMAnalysisResult(
+            comment="Отклонение от редакции СБЛ присутствовало в предыдущей редакции лизингополучателя, "
+                    "результат его анализа недоступен",
+            required_services=[],
+            severity="medium",
+            confidence=0.0,
+            reasoning="Изменение будет проанализировано повторно",
+            pending_reanalysis=True
+        )
+    return LLMAnalysisResult(
+        comment=previous_row.llm_comment,
+        required_services=previous_row.required_services or [],
+        severity=previous_row.severity,
+        confidence=float(previous_row.confidence),
+        reasoning=f"{previous_row.reasoning} [Трехстороннее сравнение: {change.round_status}, "
+                  f"результат анализа предыдущей редакции]"
+    )
+
+def previous_clause_key(change) -> Tuple[str, str]:
+    """Clause of the client draft a change is about: the modified text, or the deleted one"""
+    return change.change_type, change.modified_text or change.original_text
+
+def triage_result(change) -> Optional[LLMAnalysisResult]:
+    """Analysis result from the first matching triage rule, None if the LLM is needed"""
+    if not triage_engine.rules:
+        return None
+    rule = triage_engine.match(change)
+    metrics_service.record_triage(rule.name if rule else "none")
+    return replace(rule.result) if rule else None
+
+def cluster_pending(changes) -> List[Tuple[Optional[str], List[int]]]:
+    """Groups of repeated changes analyzed once; each change on its own when clustering is off"""
+    if not settings.CLUSTERING_ENABLED:
+        return [(None, [k]) for k in range(len(changes))]
+    groups = cluster_changes(changes)
+    clusters = [members for cluster_id, members in groups if cluster_id is not None]
+    metrics_service.record_change_clusters(len(clusters), sum(len(members) - 1 for members in clusters))
+    return groups
+
+def cluster_member_result(result: LLMAnalysisResult, representative) -> LLMAnalysisResult:
+    """Result of the analyzed change of a cluster, given to another member"""
+    source = representative.context or f"позиция {representative.position}"
+    return replace(
+        result,
+        reasoning=f"{result.reasoning} [Повторяющееся изменение: результат анализа такого же "
+                  f"изменения ({source}), анализ LLM не выполнялся]"
+    )
+
 async def save_uploaded_file(file: UploadFile) -> str:
     """Save uploaded file and return path"""
     file_id = str(uuid.uuid4())
@@ -58,21 +141,58 @@ async def save_uploaded_file(file: UploadFile) -> str:
         logger.error(f"Error saving file: {e}")
         raise HTTPException(status_code=500, detail="Ошибка сохранения файла")
 
-@router.post("/compare", response_model=AnalysisResponse)
+@router.post("/compare", response_model=AnalysisResponse, response_model_exclude_none=True)
 async def compare_documents(
     background_tasks: BackgroundTasks,
     reference_doc: UploadFile = File(...),
     client_doc: UploadFile = File(...),
+    diff_algorithm: Optional[str] = Form(None),
+    include_markup: bool = Form(False),
+    previous_analysis_id: Optional[str] = Form(None),
+    previous_client_doc: Optional[UploadFile] = File(None),
+    lazy_detail: bool = Form(False),
+    priority: str = Form(INTERACTIVE),
     db: AsyncSession = Depends(get_db)
 ):
-    """Compare two documents and analyze changes"""
+    """
+    Compare two documents and analyze changes
+
+    When a previous client draft is available (previous_client_doc, or the client
+    draft of previous_analysis_id) the comparison is three-way: each change is
+    labeled new_in_this_round, unchanged_since_previous or reverted_to_reference
+    and only new changes are sent to the LLM. Results of the previous analysis
+    are carried over for clause pairs that are still present.
+
+    With lazy_detail the diff only aligns sections and clauses; word-level spans
+    are computed for the changes sent to triage and the LLM, the others are
+    returned as detailPending and fetched on demand from
+    /analyses/{analysis_id}/changes/{change_id}/detail.
+
+    priority is the LLM queue class of the analysis: interactive, or batch for
+    bulk submissions that may wait behind interactive analyses.
+    """
     
     # Validate files
     validate_file(reference_doc)
     validate_file(client_doc)
+    if previous_client_doc is not None:
+        validate_file(previous_client_doc)
+    
+    if diff_algorithm and diff_algorithm not in DIFF_ALGORITHMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестный алгоритм сравнения. Доступны: {', '.join(DIFF_ALGORITHMS)}"
+        )
+    validate_analysis_id(previous_analysis_id)
+    if priority not in (INTERACTIVE, BATCH):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестный приоритет анализа. Доступны: {INTERACTIVE}, {BATCH}"
+        )
     
     analysis_id = str(uuid.uuid4())
     start_time = datetime.now()
+    llm_job = LLMJob(analysis_id, priority)
     
     try:
         # Save uploaded files
@@ -85,23 +205,48 @@ async def compare_documents(
         reference_text = await document_processor.process_document(reference_path)
         client_text = await document_processor.process_document(client_path)
         
-        # Analyze differences
-        changes = await diff_analyzer.analyze_differences(reference_text, client_text)
+        # Previous client draft: uploaded explicitly or taken from the previous analysis
+        previous_text = None
+        if previous_client_doc is not None:
+            previous_path = await save_uploaded_file(previous_client_doc)
+            background_tasks.add_task(os.remove, previous_path)
+            previous_text = await document_processor.process_document(previous_path)
         
-        # Process each change
-        analysis_results = []
-        for change in changes:
-            # Find relevant regulations
-            regulations = await regulatory_matcher.find_relevant_regulations(
-                change.text, db
-            )
-            
-            # Get LLM analysis
-            llm_result = await llm_analyzer.analyze_change(
-                change, regulations
-            )
+        # Load results of the previous negotiation round
+        previous_rows = {}
+        previous_clause_rows = {}
+        if previous_analysis_id:
+            previous_analysis = await analysis_store.get_analysis(db, previous_analysis_id)
+            if previous_analysis is None:
+                raise HTTPException(status_code=404, detail="Предыдущий анализ не найден")
             
-            analysis_results.append({
+            rows = await analysis_store.get_results(db, previous_analysis_id)
+            previous_rows = {(row.original_text, row.modified_text): row for row in rows}
+            # Verdicts for deviations kept since the previous draft even if the reference changed
+            previous_clause_rows = {previous_clause_key(row): row for row in rows}
+            if previous_text is None:
+                previous_text = {'text': previous_analysis.client_text}
+        
+        def carried_over_result(change: DiffChange) -> Optional[dict]:
+            pair = (change.original_text, change.modified_text)
+            if pair not in previous_rows or previous_rows[pair].pending_reanalysis:
+                # Changes left pending while the LLM was unavailable are analyzed again
+                return None
+            # The same clause pair was already analyzed in the previous round
+            result = analysis_store.row_to_result(previous_rows[pair], "carried_over")
+            result["roundStatus"] = change.round_status or None
+            return result
+        
+        def local_result(change: DiffChange) -> Optional[LLMAnalysisResult]:
+            if change.round_status in (UNCHANGED_SINCE_PREVIOUS, REVERTED_TO_REFERENCE):
+                # The LLM is called only for changes of the current round
+                return round_status_result(change, previous_clause_rows.get(previous_clause_key(change)))
+            # Trivial changes are resolved by rules without the LLM
+            return triage_result(change)
+        
+        def build_result(change: DiffChange, llm_result: LLMAnalysisResult,
+                         cluster_id: Optional[str] = None) -> dict:
+            return {
                 "id": str(uuid.uuid4()),
                 "originalText": change.original_text,
                 "modifiedText": change.modified_text,
@@ -111,9 +256,169 @@ async def compare_documents(
                 "severity": llm_result.severity,
                 "confidence": llm_result.confidence,
                 "createdAt": datetime.now().isoformat(),
-                "highlightedOriginal": change.highlighted_original,
-                "highlightedModified": change.highlighted_modified
-            })
+                "originalSpans": change.original_spans,
+                "modifiedSpans": change.modified_spans,
+                # The legacy [-]/[+] markup is returned only on request
+                "highlightedOriginal": change.highlighted_original if include_markup else None,
+                "highlightedModified": change.highlighted_modified if include_markup else None,
+                "revisionStatus": "new" if previous_analysis_id else None,
+                "roundStatus": change.round_status or None,
+                "detailPending": change.detail_pending or None,
+                "factDeltas": [delta.describe() for delta in change.fact_deltas] or None,
+                "severityScore": change.severity_score,
+                "pendingReanalysis": llm_result.pending_reanalysis or None,
+                "clusterId": cluster_id,
+                "reasoning": llm_result.reasoning,
+                "context": change.context,
+                "position": change.position
+            }
+        
+        # Streamed changes: signature -> (analyzed change, task giving its LLM result and response item)
+        streamed_clusters: Dict[str, tuple] = {}
+        # Streamed changes are analyzed concurrently, but the request's session
+        # runs one query at a time: regulation lookups take turns
+        regulations_lock = asyncio.Lock()
+        
+        async def analyze_streamed(change: DiffChange) -> Tuple[LLMAnalysisResult, dict]:
+            async with regulations_lock:
+                regulations = await regulatory_matcher.find_relevant_regulations(change.text, db)
+            llm_result = await llm_analyzer.analyze_change(change, regulations, llm_job)
+            return llm_result, build_result(change, llm_result)
+        
+        async def process_change(change: DiffChange) -> dict:
+            result = carried_over_result(change)
+            if result is not None:
+                return result
+            
+            llm_result = local_result(change)
+            if llm_result is not None:
+                return build_result(change, llm_result)
+            
+            signature = delta_signature(change) if settings.CLUSTERING_ENABLED else None
+            if signature in streamed_clusters:
+                # Repeated change: reuse the result of the first change in its group
+                representative, analysis = streamed_clusters[signature]
+                llm_result, first = await analysis
+                metrics_service.record_change_clusters(1 if first["clusterId"] is None else 0, 1)
+                first["clusterId"] = signature
+                return build_result(change, cluster_member_result(llm_result, representative), signature)
+            
+            # Repeated changes arriving while this one is analyzed wait for its result
+            analysis = asyncio.ensure_future(analyze_streamed(change))
+            if signature is not None:
+                streamed_clusters[signature] = (change, analysis)
+            _, result = await analysis
+            return result
+        
+        async def process_changes(changes) -> List[dict]:
+            # Changes with the most critical fact deltas are sent to the LLM first,
+            # results are returned in document order
+            order = sorted(range(len(changes)), key=lambda k: -changes[k].severity_score)
+            results = [None] * len(changes)
+            for k in order:
+                results[k] = carried_over_result(changes[k])
+            
+            # Triage, routing and the LLM prompt need word-level spans: changes of a
+            # lazy_detail analysis get them here, in the analyzer's executor
+            lazy = [changes[k] for k in order if results[k] is None and changes[k].detail_pending
+                    and changes[k].round_status not in (UNCHANGED_SINCE_PREVIOUS, REVERTED_TO_REFERENCE)]
+            if lazy:
+                await asyncio.get_running_loop().run_in_executor(
+                    diff_analyzer.executor,
+                    partial(diff_analyzer.ensure_details, lazy, algorithm=diff_algorithm)
+                )
+            
+            pending = []
+            for k in order:
+                if results[k] is not None:
+                    continue
+                llm_result = local_result(changes[k])
+                if llm_result is None:
+                    pending.append(k)
+                else:
+                    results[k] = build_result(changes[k], llm_result)
+            
+            # Repeated changes are analyzed once per cluster, the rest of the
+            # changes left for the LLM are packed into batched requests
+            groups = cluster_pending([changes[k] for k in pending])
+            representatives = [changes[pending[members[0]]] for _, members in groups]
+            regulations = [
+                await regulatory_matcher.find_relevant_regulations(change.text, db)
+                for change in representatives
+            ]
+            llm_results = await llm_analyzer.analyze_changes(representatives, regulations, llm_job)
+            for (cluster_id, members), representative, llm_result in zip(groups, representatives, llm_results):
+                for n, member in enumerate(members):
+                    k = pending[member]
+                    member_result = llm_result if n == 0 else cluster_member_result(llm_result, representative)
+                    results[k] = build_result(changes[k], member_result, cluster_id)
+            return results
+        
+        # Analyze differences and process each change
+        analysis_results = []
+        total_length = len(reference_text['text']) + len(client_text['text'])
+        if previous_text is not None:
+            # Already analyzed clause pairs are not diffed word by word
+            changes = await diff_analyzer.analyze_three_way(
+                reference_text, previous_text, client_text,
+                algorithm=diff_algorithm,
+                include_markup=include_markup,
+                known_pairs=set(previous_rows)
+            )
+            analysis_results.extend(await process_changes(changes))
+        elif total_length > settings.STREAMING_DIFF_THRESHOLD:
+            # Very large documents: LLM analysis starts while diffing continues
+            logger.info(f"Analysis {analysis_id}: streaming diff of {total_length} characters")
+            tasks = []
+            try:
+                async for change in diff_analyzer.stream_differences(
+                    reference_text, client_text,
+                    algorithm=diff_algorithm,
+                    include_markup=include_markup,
+                    window_size=settings.DIFF_WINDOW_SIZE
+                ):
+                    # Changes go to the LLM scheduler as they arrive, while diffing continues
+                    tasks.append(asyncio.ensure_future(process_change(change)))
+                analysis_results.extend(await asyncio.gather(*tasks))
+            finally:
+                # On an error the remaining analyses are not left running
+                for task in tasks:
+                    task.cancel()
+        elif lazy_detail:
+            # Section/clause alignment only, word-level detail is computed on demand;
+            # the alignment runs in the analyzer's executor, off the event loop
+            changes = await asyncio.get_running_loop().run_in_executor(
+                diff_analyzer.executor,
+                partial(diff_analyzer.analyze_hierarchical, reference_text, client_text, algorithm=diff_algorithm)
+            )
+            analysis_results.extend(await process_changes(changes))
+        elif include_markup:
+            changes = await diff_analyzer.analyze_differences(
+                reference_text, client_text,
+                algorithm=diff_algorithm,
+                include_markup=include_markup
+            )
+            analysis_results.extend(await process_changes(changes))
+        else:
+            # Compact columnar change set: texts are materialized per change
+            changes = await diff_analyzer.analyze_change_set(
+                reference_text, client_text,
+                algorithm=diff_algorithm
+            )
+            analysis_results.extend(await process_changes(changes))
+        
+        # Changes of the previous round that no longer appear are resolved
+        current_pairs = {(r["originalText"], r["modifiedText"]) for r in analysis_results}
+        resolved_results = [
+            analysis_store.row_to_result(row, "resolved")
+            for pair, row in previous_rows.items() if pair not in current_pairs
+        ]
+        
+        # Count changes per three-way round status
+        round_statuses = {}
+        for result in analysis_results:
+            if result.get("roundStatus"):
+                round_statuses[result["roundStatus"]] = round_statuses.get(result["roundStatus"], 0) + 1
         
         # Calculate processing time
         processing_time = (datetime.now() - start_time).total_seconds()
@@ -128,6 +433,33 @@ async def compare_documents(
                 "clientDoc": client_doc.filename
             }
         }
+        if previous_text is not None:
+            summary["roundStatuses"] = round_statuses
+        pending_changes = sum(1 for r in analysis_results if r.get("pendingReanalysis"))
+        if pending_changes:
+            summary["pendingReanalysisChanges"] = pending_changes
+        cluster_ids = [r["clusterId"] for r in analysis_results if r.get("clusterId")]
+        if cluster_ids:
+            # Clustered changes that reused a representative's result
+            summary["clusteredChanges"] = len(cluster_ids) - len(set(cluster_ids))
+        llm_usage = llm_job.usage.summary()
+        if llm_usage:
+            summary["llmUsage"] = llm_usage
+        if previous_analysis_id:
+            summary.update({
+                "newChanges": sum(1 for r in analysis_results if r["revisionStatus"] == "new"),
+                "carriedOverChanges": sum(1 for r in analysis_results if r["revisionStatus"] == "carried_over"),
+                "resolvedChanges": len(resolved_results),
+            })
+        
+        # Store drafts and results so the next round can be analyzed incrementally
+        await analysis_store.save_analysis(
+            db, analysis_id,
+            reference_doc.filename, client_doc.filename,
+            reference_text['text'], client_text['text'],
+            analysis_results + resolved_results,
+            previous_analysis_id
+        )
         
         # Clean up files in background
         background_tasks.add_task(os.remove, reference_path)
@@ -137,14 +469,138 @@ async def compare_documents(
         
         return AnalysisResponse(
             analysisId=analysis_id,
-            changes=analysis_results,
+            previousAnalysisId=previous_analysis_id,
+            changes=analysis_results + resolved_results,
             summary=summary
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in document analysis: {e}")
         raise HTTPException(status_code=500, detail="Ошибка при анализе документов")
 
+@router.get("/analyses/{analysis_id}/changes/{change_id}/detail", response_model=ChangeDetail)
+async def get_change_detail(
+    analysis_id: str,
+    change_id: str,
+    diff_algorithm: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get word-level highlight spans of a change, computing them on first request"""
+    
+    validate_analysis_id(analysis_id)
+    validate_analysis_id(change_id)
+    if diff_algorithm and diff_algorithm not in DIFF_ALGORITHMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестный алгоритм сравнения. Доступны: {', '.join(DIFF_ALGORITHMS)}"
+        )
+    
+    try:
+        row = await analysis_store.get_result(db, analysis_id, change_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Изменение не найдено")
+        
+        if row.original_spans or row.modified_spans:
+            original_spans = [tuple(span) for span in row.original_spans or []]
+            modified_spans = [tuple(span) for span in row.modified_spans or []]
+        else:
+            # The word-level diff runs in the analyzer's executor, off the event loop
+            original_spans, modified_spans = await asyncio.get_running_loop().run_in_executor(
+                diff_analyzer.executor,
+                partial(diff_analyzer.change_detail, row.original_text, row.modified_text, diff_algorithm)
+            )
+            await analysis_store.save_spans(db, row, original_spans, modified_spans)
+        
+        return ChangeDetail(
+            changeId=change_id,
+            originalSpans=list(original_spans),
+            modifiedSpans=list(modified_spans)
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing change detail: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка при сравнении изменения")
+
+@router.post("/analyses/{analysis_id}/reanalyze", response_model=ReanalysisResponse, response_model_exclude_none=True)
+async def reanalyze_pending_changes(
+    analysis_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """Analyze again the changes left pending while the LLM endpoint was unavailable"""
+    
+    validate_analysis_id(analysis_id)
+    
+    try:
+        if await analysis_store.get_analysis(db, analysis_id) is None:
+            raise HTTPException(status_code=404, detail="Анализ не найден")
+        
+        rows = await analysis_store.get_pending_results(db, analysis_id)
+        changes = [
+            diff_analyzer.with_facts(DiffChange(
+                original_text=row.original_text,
+                modified_text=row.modified_text,
+                change_type=row.change_type,
+                position=row.position or 0,
+                text=row.modified_text or row.original_text,
+                context=row.context or "",
+            ))
+            for row in rows
+        ]
+        groups = cluster_pending(changes)
+        representatives = [changes[members[0]] for _, members in groups]
+        regulations = [
+            await regulatory_matcher.find_relevant_regulations(change.text, db)
+            for change in representatives
+        ]
+        llm_job = LLMJob(analysis_id, REANALYSIS)
+        llm_results = await llm_analyzer.analyze_changes(representatives, regulations, llm_job)
+        row_results = [None] * len(rows)
+        for (_, members), representative, llm_result in zip(groups, representatives, llm_results):
+            for n, k in enumerate(members):
+                row_results[k] = llm_result if n == 0 else cluster_member_result(llm_result, representative)
+        await analysis_store.save_llm_results(db, rows, row_results)
+        
+        results = []
+        for row in rows:
+            result = analysis_store.row_to_result(row, row.revision_status)
+            result["id"] = str(row.id)
+            results.append(result)
+        
+        return ReanalysisResponse(
+            analysisId=analysis_id,
+            changes=results,
+            pendingChanges=sum(1 for row in rows if row.pending_reanalysis),
+            llmUsage=llm_job.usage.summary()
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error reanalyzing changes: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка при повторном анализе изменений")
+
+@router.delete("/admin/llm-cache")
+async def purge_llm_cache(
+    model: Optional[str] = None,
+    prompt_version: Optional[str] = None
+):
+    """Purge cached LLM results of a model and/or prompt version (all entries without filters)"""
+    
+    if llm_analyzer.cache is None:
+        raise HTTPException(status_code=404, detail="Кэш ответов LLM отключен")
+    
+    try:
+        deleted = await llm_analyzer.cache.purge(model=model, prompt_version=prompt_version)
+        return {"deleted": deleted, "model": model, "promptVersion": prompt_version}
+        
+    except Exception as e:
+        logger.error(f"Error purging LLM cache: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка при очистке кэша ответов LLM")
+
 @router.post("/export")
 async def export_results(
     request: ExportRequest,
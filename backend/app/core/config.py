@@ -35,6 +35,25 @@ class Settings(BaseSettings):
     OPENAI_TEMPERATURE: float = Field(0.3, env="OPENAI_TEMPERATURE")
     OPENAI_MAX_TOKENS: int = Field(2000, env="OPENAI_MAX_TOKENS")
     
+    # LLM HTTP connection pool settings
+    LLM_MAX_CONNECTIONS: int = Field(32, env="LLM_MAX_CONNECTIONS")  # also the maximum of concurrent calls
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = Field(32, env="LLM_MAX_KEEPALIVE_CONNECTIONS")
+    LLM_KEEPALIVE_EXPIRY: float = Field(30.0, env="LLM_KEEPALIVE_EXPIRY")  # seconds
+    LLM_CONNECT_TIMEOUT: float = Field(10.0, env="LLM_CONNECT_TIMEOUT")  # seconds
+    LLM_READ_TIMEOUT: float = Field(120.0, env="LLM_READ_TIMEOUT")  # seconds
+    LLM_POOL_TIMEOUT: float = Field(60.0, env="LLM_POOL_TIMEOUT")  # seconds waiting for a free connection
+    LLM_HTTP2: bool = Field(True, env="LLM_HTTP2")  # used only if the h2 package is installed
+    
+    # LLM response cache settings
+    LLM_CACHE_ENABLED: bool = Field(True, env="LLM_CACHE_ENABLED")
+    LLM_CACHE_MEMORY_SIZE: int = Field(2048, env="LLM_CACHE_MEMORY_SIZE")  # entries in the in-process LRU
+    LLM_CACHE_TTL: int = Field(2592000, env="LLM_CACHE_TTL")  # seconds, 30 days
+    LLM_CACHE_MAX_ENTRIES: int = Field(100000, env="LLM_CACHE_MAX_ENTRIES")  # rows in the llm_cache table
+    LLM_SEMANTIC_CACHE_ENABLED: bool = Field(True, env="LLM_SEMANTIC_CACHE_ENABLED")
+    LLM_SEMANTIC_CACHE_THRESHOLD: float = Field(0.85, env="LLM_SEMANTIC_CACHE_THRESHOLD")  # estimated Jaccard similarity
+    LLM_SEMANTIC_CACHE_CONFIDENCE_FACTOR: float = Field(0.8, env="LLM_SEMANTIC_CACHE_CONFIDENCE_FACTOR")
+    LLM_SEMANTIC_CACHE_PATH: str = Field("/app/data/semantic_cache_index.npz", env="LLM_SEMANTIC_CACHE_PATH")
+    
     # File upload settings
     MAX_FILE_SIZE: int = Field(10485760, env="MAX_FILE_SIZE")  # 10MB
     ALLOWED_EXTENSIONS: str = Field("pdf,docx,txt", env="ALLOWED_EXTENSIONS")
@@ -61,6 +80,12 @@ class Settings(BaseSettings):
     ALGORITHM: str = Field("HS256", env="ALGORITHM")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
     
+    # Redis settings
+    REDIS_HOST: str = Field("redis", env="REDIS_HOST")
+    REDIS_PORT: int = Field(6379, env="REDIS_PORT")
+    REDIS_DB: int = Field(0, env="REDIS_DB")
+    REDIS_PASSWORD: Optional[str] = Field(None, env="REDIS_PASSWORD")
+    
     @property
     def REDIS_URL(self) -> str:
         if self.REDIS_PASSWORD:
@@ -70,13 +95,57 @@ class Settings(BaseSettings):
     # Document processing settings
     MAX_DOCUMENT_PAGES: int = Field(50, env="MAX_DOCUMENT_PAGES")
     PROCESSING_TIMEOUT: int = Field(300, env="PROCESSING_TIMEOUT")  # 5 minutes
-    CHUNK_SIZE: int = Field(1000, env="CHUNK_SIZE")
+    CHUNK_SIZE: int = Field(1000, env="CHUNK_SIZE")  # characters per regulation passage
+    
+    # Diff settings
+    DIFF_ALGORITHM: str = Field("histogram", env="DIFF_ALGORITHM")  # difflib, myers, histogram
+    DIFF_WINDOW_SIZE: int = Field(500, env="DIFF_WINDOW_SIZE")  # clauses per side in streaming diff
+    STREAMING_DIFF_THRESHOLD: int = Field(1000000, env="STREAMING_DIFF_THRESHOLD")  # total characters
+    
+    # Triage settings (rule-based fast path before the LLM)
+    TRIAGE_ENABLED: bool = Field(True, env="TRIAGE_ENABLED")
+    TRIAGE_RULES_PATH: str = Field("app/core/triage_rules.yaml", env="TRIAGE_RULES_PATH")
+    CLUSTERING_ENABLED: bool = Field(True, env="CLUSTERING_ENABLED")  # one LLM analysis per group of repeated changes
+    
+    # Regulation matching settings
+    REGULATION_SEARCH: str = Field("chunks", env="REGULATION_SEARCH")  # chunks (passages in PostgreSQL) or index (in-memory BM25)
+    REGULATION_MATCH_LIMIT: int = Field(5, env="REGULATION_MATCH_LIMIT")  # regulations per change
+    REGULATION_TITLE_WEIGHT: float = Field(3.0, env="REGULATION_TITLE_WEIGHT")  # title matches vs content matches
+    REGULATION_INDEX_LISTEN: bool = Field(True, env="REGULATION_INDEX_LISTEN")  # re-chunk or re-index on NOTIFY regulations_changed
     
     # LLM analysis settings
-    ANALYSIS_BATCH_SIZE: int = Field(10, env="ANALYSIS_BATCH_SIZE")
-    RETRY_ATTEMPTS: int = Field(3, env="RETRY_ATTEMPTS")
+    ANALYSIS_BATCH_SIZE: int = Field(10, env="ANALYSIS_BATCH_SIZE")  # changes per LLM request, 1 - no batching
+    ANALYSIS_ITEM_MAX_TOKENS: int = Field(400, env="ANALYSIS_ITEM_MAX_TOKENS")  # response tokens reserved per change
+    LLM_PROMPT_CLAUSE_MAX_TOKENS: int = Field(600, env="LLM_PROMPT_CLAUSE_MAX_TOKENS")  # longer clauses are trimmed
+    LLM_PROMPT_CONTEXT_CHARS: int = Field(300, env="LLM_PROMPT_CONTEXT_CHARS")  # context around each changed region
+    LLM_PROMPT_REGULATIONS_TOKENS: int = Field(400, env="LLM_PROMPT_REGULATIONS_TOKENS")  # regulation budget per change
+    LLM_PROMPT_REGULATION_CHARS: int = Field(200, env="LLM_PROMPT_REGULATION_CHARS")  # snippet length
+    LLM_STREAMING_ENABLED: bool = Field(False, env="LLM_STREAMING_ENABLED")  # stream single-change completions (no hedging)
+    LLM_STREAM_REASONING_MAX_CHARS: int = Field(0, env="LLM_STREAM_REASONING_MAX_CHARS")  # stop generation after, 0 - no cap
+    LLM_ROUTING_ENABLED: bool = Field(False, env="LLM_ROUTING_ENABLED")  # route low-risk changes to a smaller model
+    LLM_MODEL_TIERS_PATH: str = Field("app/core/model_tiers.yaml", env="LLM_MODEL_TIERS_PATH")
+    LLM_PRICES_PATH: str = Field("app/core/model_prices.yaml", env="LLM_PRICES_PATH")  # estimated cost per 1000 tokens
+    LLM_CONTEXT_TOKENS: int = Field(32768, env="LLM_CONTEXT_TOKENS")  # model context limit
+    RETRY_ATTEMPTS: int = Field(3, env="RETRY_ATTEMPTS")  # LLM request attempts, including the first
+    LLM_RETRY_BASE_DELAY: float = Field(0.5, env="LLM_RETRY_BASE_DELAY")  # seconds, doubled per attempt
+    LLM_RETRY_MAX_DELAY: float = Field(10.0, env="LLM_RETRY_MAX_DELAY")  # seconds
+    LLM_HEDGE_ENABLED: bool = Field(False, env="LLM_HEDGE_ENABLED")  # duplicate requests slower than p95
+    LLM_HEDGE_MIN_DELAY: float = Field(1.0, env="LLM_HEDGE_MIN_DELAY")  # seconds
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = Field(5, env="LLM_CIRCUIT_FAILURE_THRESHOLD")  # consecutive failures
+    LLM_CIRCUIT_RECOVERY_TIMEOUT: float = Field(30.0, env="LLM_CIRCUIT_RECOVERY_TIMEOUT")  # seconds
     RATE_LIMIT_REQUESTS: int = Field(100, env="RATE_LIMIT_REQUESTS")
     RATE_LIMIT_WINDOW: int = Field(60, env="RATE_LIMIT_WINDOW")
+    LLM_RATE_LIMIT_REQUESTS: int = Field(0, env="LLM_RATE_LIMIT_REQUESTS")  # LLM requests per window, 0 - unlimited
+    LLM_RATE_LIMIT_TOKENS: int = Field(0, env="LLM_RATE_LIMIT_TOKENS")  # LLM prompt + completion tokens per window, 0 - unlimited
+    LLM_RATE_LIMIT_WINDOW: int = Field(60, env="LLM_RATE_LIMIT_WINDOW")  # seconds
+    LLM_ADAPTIVE_CONCURRENCY: bool = Field(True, env="LLM_ADAPTIVE_CONCURRENCY")  # AIMD up to LLM_MAX_CONNECTIONS
+    LLM_INITIAL_CONCURRENCY: int = Field(8, env="LLM_INITIAL_CONCURRENCY")
+    LLM_MIN_CONCURRENCY: int = Field(1, env="LLM_MIN_CONCURRENCY")
+    LLM_LATENCY_TOLERANCE: float = Field(2.0, env="LLM_LATENCY_TOLERANCE")  # healthy latency, times the baseline
+    LLM_QUEUE_BACKEND: str = Field("memory", env="LLM_QUEUE_BACKEND")  # memory, redis (shared by replicas)
+    LLM_QUEUE_WEIGHT_INTERACTIVE: float = Field(8.0, env="LLM_QUEUE_WEIGHT_INTERACTIVE")
+    LLM_QUEUE_WEIGHT_BATCH: float = Field(2.0, env="LLM_QUEUE_WEIGHT_BATCH")
+    LLM_QUEUE_WEIGHT_REANALYSIS: float = Field(1.0, env="LLM_QUEUE_WEIGHT_REANALYSIS")
     
     # Logging settings
     LOG_FILE: str = Field("/app/logs/app.log", env="LOG_FILE")
@@ -56,8 +56,11 @@ async def init_db():
         async with engine.begin() as conn:
             # Import all models here to ensure they are registered
             from app.models.regulation import Regulation
+            from app.models.regulation_chunk import RegulationChunk
             from app.models.service import Service
             from app.models.analysis_result import AnalysisResult
+            from app.models.analysis import Analysis
+            from app.models.llm_cache import LLMCacheEntry
             
             await conn.run_sync(Base.metadata.create_all)
         logger.info("Database initialized successfully")
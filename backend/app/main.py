@@ -9,7 +9,7 @@ import time
 from typing import AsyncGenerator
 
 from app.core.config import settings
-from app.api.routes import router
+from app.api.routes import router, llm_analyzer, regulatory_matcher
 from app.database.connection import init_db, close_db
 
 # Configure logging
@@ -25,9 +25,12 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     # Startup
     logger.info("Starting up application...")
     await init_db()
+    await regulatory_matcher.start()
     yield
     # Shutdown
     logger.info("Shutting down application...")
+    await regulatory_matcher.stop()
+    await llm_analyzer.aclose()
     await close_db()
 
 # Create FastAPI app
@@ -0,0 +1,45 @@
+from sqlalchemy import Column, String, Text, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+
+from app.database.connection import Base
+
+
+class Analysis(Base):
+    """Analysis model for storing compared document drafts"""
+    
+    __tablename__ = "analyses"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    reference_filename = Column(String(500), nullable=True)
+    client_filename = Column(String(500), nullable=True)
+    
+    # Processed document texts, needed to diff the next negotiation round
+    reference_text = Column(Text, nullable=False)
+    client_text = Column(Text, nullable=False)
+    
+    # Analysis this one was incrementally derived from
+    previous_analysis_id = Column(UUID(as_uuid=True), nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Create indexes
+    __table_args__ = (
+        Index('ix_analyses_previous_analysis_id', 'previous_analysis_id'),
+        Index('ix_analyses_created_at', 'created_at'),
+    )
+    
+    def to_dict(self):
+        """Convert model to dictionary"""
+        return {
+            'id': str(self.id),
+            'reference_filename': self.reference_filename,
+            'client_filename': self.client_filename,
+            'previous_analysis_id': str(self.previous_analysis_id) if self.previous_analysis_id else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+    
+    def __repr__(self):
+        return f"<Analysis(id='{self.id}', client_filename='{self.client_filename}')>"
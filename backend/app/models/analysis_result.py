@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Text, DateTime, Numeric, Index
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Text, DateTime, Numeric, Integer, Boolean, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 from datetime import datetime
 import uuid
@@ -19,6 +19,20 @@ class AnalysisResult(Base):
     change_type = Column(String(50), nullable=False)
     severity = Column(String(50), nullable=False)
     confidence = Column(Numeric(3, 2), nullable=False)
+    required_services = Column(JSONB, nullable=True)
+    reasoning = Column(Text, nullable=True)
+    
+    # Diff details
+    context = Column(String(500), nullable=True)
+    position = Column(Integer, nullable=True)
+    original_spans = Column(JSONB, nullable=True)
+    modified_spans = Column(JSONB, nullable=True)
+    
+    # Negotiation round status: new, carried_over, resolved
+    revision_status = Column(String(20), nullable=False, default='new')
+    
+    # LLM endpoint was unavailable, the change has to be analyzed again
+    pending_reanalysis = Column(Boolean, nullable=False, default=False)
     
     # Analysis metadata
     analysis_id = Column(UUID(as_uuid=True), nullable=False)
@@ -46,6 +60,14 @@ class AnalysisResult(Base):
             'change_type': self.change_type,
             'severity': self.severity,
             'confidence': float(self.confidence),
+            'required_services': self.required_services or [],
+            'reasoning': self.reasoning,
+            'context': self.context,
+            'position': self.position,
+            'original_spans': self.original_spans or [],
+            'modified_spans': self.modified_spans or [],
+            'revision_status': self.revision_status,
+            'pending_reanalysis': self.pending_reanalysis,
             'analysis_id': str(self.analysis_id),
             'document_pair_reference': self.document_pair_reference,
             'document_pair_client': self.document_pair_client,
@@ -0,0 +1,48 @@
+from sqlalchemy import Column, String, DateTime, Integer, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from app.database.connection import Base
+
+
+class LLMCacheEntry(Base):
+    """Cached LLM analysis of a change, keyed by a hash of the prompt inputs"""
+
+    __tablename__ = "llm_cache"
+
+    # SHA-256 of normalized change text, regulation ids, model, temperature and prompt version
+    key = Column(String(64), primary_key=True)
+    model = Column(String(200), nullable=False)
+    prompt_version = Column(String(20), nullable=False)
+
+    # LLMAnalysisResult fields
+    result = Column(JSONB, nullable=False)
+
+    # Usage statistics for eviction
+    hit_count = Column(Integer, nullable=False, default=0)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_hit_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Create indexes
+    __table_args__ = (
+        Index('ix_llm_cache_model_prompt_version', 'model', 'prompt_version'),
+        Index('ix_llm_cache_created_at', 'created_at'),
+        Index('ix_llm_cache_last_hit_at', 'last_hit_at'),
+    )
+
+    def to_dict(self):
+        """Convert model to dictionary"""
+        return {
+            'key': self.key,
+            'model': self.model,
+            'prompt_version': self.prompt_version,
+            'result': self.result,
+            'hit_count': self.hit_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_hit_at': self.last_hit_at.isoformat() if self.last_hit_at else None,
+        }
+
+    def __repr__(self):
+        return f"<LLMCacheEntry(key='{self.key}', model='{self.model}')>"
@@ -92,51 +92,5 @@ class Regulation(Base):
         }
         return service_mapping.get(self.category.lower(), ['Юридическая служба'])
     
-    def calculate_relevance(self, query_text: str) -> float:
-        """Calculate relevance score for a given query"""
-        # Simple relevance calculation based on keyword matching
-        # In production, this would use more sophisticated NLP techniques
-        query_words = set(query_text.lower().split())
-        content_words = set(self.content.lower().split())
-        title_words = set(self.title.lower().split())
-        
-        # Calculate overlap
-        content_overlap = len(query_words.intersection(content_words))
-        title_overlap = len(query_words.intersection(title_words))
-        
-        # Weight title matches higher
-        relevance = (content_overlap + title_overlap * 2) / len(query_words)
-        return min(relevance, 1.0)
-    
-    def get_excerpt(self, query_text: str, max_length: int = 200) -> str:
-        """Get relevant excerpt from content"""
-        # Simple excerpt extraction
-        # In production, this would use more sophisticated text processing
-        query_words = query_text.lower().split()
-        content_lower = self.content.lower()
-        
-        # Find first occurrence of any query word
-        best_pos = len(self.content)
-        for word in query_words:
-            pos = content_lower.find(word)
-            if pos != -1 and pos < best_pos:
-                best_pos = pos
-        
-        if best_pos == len(self.content):
-            # No matches found, return beginning
-            return self.content[:max_length] + ('...' if len(self.content) > max_length else '')
-        
-        # Extract excerpt around the match
-        start = max(0, best_pos - max_length // 2)
-        end = min(len(self.content), start + max_length)
-        
-        excerpt = self.content[start:end]
-        if start > 0:
-            excerpt = '...' + excerpt
-        if end < len(self.content):
-            excerpt = excerpt + '...'
-        
-        return excerpt
-    
     def __repr__(self):
         return f"<Regulation(id='{self.id}', title='{self.title[:50]}...')>" 
\ No newline at end of file
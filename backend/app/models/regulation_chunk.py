@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Text, DateTime, Integer, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy.sql import func
+import uuid
+
+from app.database.connection import Base
+
+
+class RegulationChunk(Base):
+    """Passage of a regulation, the unit of regulation search and of LLM context"""
+
+    __tablename__ = "regulation_chunks"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    regulation_id = Column(
+        UUID(as_uuid=True), ForeignKey("regulations.id", ondelete="CASCADE"), nullable=False
+    )
+    position = Column(Integer, nullable=False)
+    # Character offset of the passage in the regulation content
+    start_offset = Column(Integer, nullable=False)
+    content = Column(Text, nullable=False)
+    # CHUNK_SIZE the passage was cut with: a changed setting re-chunks regulations
+    chunk_size = Column(Integer, nullable=False)
+
+    # Regulation title (weight A) and passage (weight B)
+    search_vector = Column(TSVECTOR)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Create indexes (the trigram index on content is created in db/init.sql)
+    __table_args__ = (
+        Index('ix_regulation_chunks_regulation_id_position', 'regulation_id', 'position'),
+        Index('ix_regulation_chunks_search', search_vector, postgresql_using='gin'),
+    )
+
+    def __repr__(self):
+        return f"<RegulationChunk(regulation_id='{self.regulation_id}', position={self.position})>"
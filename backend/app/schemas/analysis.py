@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 from enum import Enum
 
@@ -11,6 +11,20 @@ class ChangeType(str, Enum):
     MODIFICATION = "modification"
 
 
+class RevisionStatus(str, Enum):
+    """Status of a change relative to the previous negotiation round"""
+    NEW = "new"
+    CARRIED_OVER = "carried_over"
+    RESOLVED = "resolved"
+
+
+class RoundStatus(str, Enum):
+    """Three-way comparison label of a change"""
+    NEW_IN_THIS_ROUND = "new_in_this_round"
+    UNCHANGED_SINCE_PREVIOUS = "unchanged_since_previous"
+    REVERTED_TO_REFERENCE = "reverted_to_reference"
+
+
 class Severity(str, Enum):
     """Severity levels for changes"""
     LOW = "low"
@@ -26,6 +40,10 @@ class ExportFormat(str, Enum):
     WORD = "word"
 
 
+# Highlight span: [start, end, "-" | "+"] in characters of the clause text
+HighlightSpan = Tuple[int, int, str]
+
+
 class AnalysisResult(BaseModel):
     """Analysis result for a single change"""
     id: str = Field(..., description="Unique identifier for the change")
@@ -39,6 +57,47 @@ class AnalysisResult(BaseModel):
     createdAt: str = Field(..., description="Creation timestamp")
     highlightedOriginal: Optional[str] = Field(None, description="Original text with highlighted changes")
     highlightedModified: Optional[str] = Field(None, description="Modified text with highlighted changes")
+    originalSpans: Optional[List[HighlightSpan]] = Field(None, description="Deleted character spans [start, end, op] in originalText")
+    modifiedSpans: Optional[List[HighlightSpan]] = Field(None, description="Inserted character spans [start, end, op] in modifiedText")
+    revisionStatus: Optional[RevisionStatus] = Field(None, description="Status relative to the previous analysis")
+    roundStatus: Optional[RoundStatus] = Field(None, description="Three-way comparison label")
+    detailPending: Optional[bool] = Field(None, description="Word-level spans are computed on demand")
+    factDeltas: Optional[List[str]] = Field(None, description="Changed amounts, rates, dates and terms")
+    severityScore: Optional[float] = Field(None, ge=0.0, le=1.0, description="Deterministic severity pre-score from fact deltas")
+    pendingReanalysis: Optional[bool] = Field(None, description="LLM was unavailable, the change is to be analyzed again")
+    clusterId: Optional[str] = Field(None, description="Group of repeated changes sharing one LLM analysis")
+
+
+class ChangeDetail(BaseModel):
+    """Word-level highlight spans of a single change"""
+    changeId: str = Field(..., description="Change identifier")
+    originalSpans: List[HighlightSpan] = Field(..., description="Deleted character spans [start, end, op] in originalText")
+    modifiedSpans: List[HighlightSpan] = Field(..., description="Inserted character spans [start, end, op] in modifiedText")
+
+
+class LLMModelUsage(BaseModel):
+    """LLM requests of an analysis to one model"""
+    calls: int = Field(..., description="Answered requests, retries and hedged duplicates included")
+    promptTokens: int = Field(..., description="Prompt tokens")
+    completionTokens: int = Field(..., description="Completion tokens")
+    estimatedCost: float = Field(..., description="Estimated cost from the model price table")
+    queueSeconds: float = Field(..., description="Total time requests waited for a scheduler slot")
+    networkSeconds: float = Field(..., description="Total time from the granted slot to the response")
+    meanTimeToFirstToken: Optional[float] = Field(None, description="Mean time to the first token of streamed requests")
+    parseFailures: int = Field(..., description="Answers without the required fields and missing batch items")
+
+
+class LLMUsageSummary(LLMModelUsage):
+    """LLM requests of an analysis, in total and per model"""
+    models: Dict[str, LLMModelUsage] = Field(..., description="Usage per model")
+
+
+class ReanalysisResponse(BaseModel):
+    """Result of reanalyzing changes left pending while the LLM was unavailable"""
+    analysisId: str = Field(..., description="Analysis identifier")
+    changes: List[AnalysisResult] = Field(..., description="Reanalyzed changes")
+    pendingChanges: int = Field(..., description="Changes still pending reanalysis")
+    llmUsage: Optional[LLMUsageSummary] = Field(None, description="LLM tokens, cost and timings of the reanalysis")
 
 
 class DocumentPair(BaseModel):
@@ -53,11 +112,19 @@ class AnalysisSummary(BaseModel):
     criticalChanges: int = Field(..., description="Number of critical changes")
     processingTime: str = Field(..., description="Processing time in seconds")
     documentPair: DocumentPair = Field(..., description="Document pair information")
+    newChanges: Optional[int] = Field(None, description="Changes analyzed in this round")
+    carriedOverChanges: Optional[int] = Field(None, description="Changes carried over from the previous analysis")
+    resolvedChanges: Optional[int] = Field(None, description="Changes of the previous analysis no longer present")
+    roundStatuses: Optional[Dict[str, int]] = Field(None, description="Number of changes per three-way round status")
+    pendingReanalysisChanges: Optional[int] = Field(None, description="Changes left for reanalysis while the LLM was unavailable")
+    clusteredChanges: Optional[int] = Field(None, description="Changes that reused the LLM analysis of a repeated change")
+    llmUsage: Optional[LLMUsageSummary] = Field(None, description="LLM tokens, cost and timings of the analysis")
 
 
 class AnalysisResponse(BaseModel):
     """Complete analysis response"""
     analysisId: str = Field(..., description="Unique analysis identifier")
+    previousAnalysisId: Optional[str] = Field(None, description="Analysis this one was derived from")
     changes: List[AnalysisResult] = Field(..., description="List of detected changes")
     summary: AnalysisSummary = Field(..., description="Analysis summary")
 
@@ -0,0 +1,163 @@
+import logging
+import uuid
+from typing import List, Dict, Any, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.models.analysis import Analysis
+from app.models.analysis_result import AnalysisResult
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisStore:
+    """Service for persisting analyses and their per-change results"""
+    
+    def __init__(self):
+        pass
+    
+    async def get_analysis(self, db: AsyncSession, analysis_id: str) -> Optional[Analysis]:
+        """Get stored analysis by id"""
+        result = await db.execute(
+            select(Analysis).where(Analysis.id == uuid.UUID(analysis_id))
+        )
+        return result.scalar_one_or_none()
+    
+    async def get_results(self, db: AsyncSession, analysis_id: str,
+                          include_resolved: bool = False) -> List[AnalysisResult]:
+        """Get stored change rows of an analysis in document order"""
+        query = select(AnalysisResult).where(
+            AnalysisResult.analysis_id == uuid.UUID(analysis_id)
+        )
+        if not include_resolved:
+            query = query.where(AnalysisResult.revision_status != 'resolved')
+        query = query.order_by(AnalysisResult.position, AnalysisResult.created_at)
+        
+        result = await db.execute(query)
+        return list(result.scalars().all())
+    
+    async def get_result(self, db: AsyncSession, analysis_id: str,
+                         result_id: str) -> Optional[AnalysisResult]:
+        """Get a single stored change row of an analysis"""
+        result = await db.execute(
+            select(AnalysisResult).where(
+                AnalysisResult.analysis_id == uuid.UUID(analysis_id),
+                AnalysisResult.id == uuid.UUID(result_id),
+            )
+        )
+        return result.scalar_one_or_none()
+    
+    async def get_pending_results(self, db: AsyncSession, analysis_id: str) -> List[AnalysisResult]:
+        """Get change rows of an analysis left for reanalysis"""
+        result = await db.execute(
+            select(AnalysisResult).where(
+                AnalysisResult.analysis_id == uuid.UUID(analysis_id),
+                AnalysisResult.pending_reanalysis == True
+            ).order_by(AnalysisResult.position, AnalysisResult.created_at)
+        )
+        return list(result.scalars().all())
+    
+    async def save_llm_results(self, db: AsyncSession, rows: List[AnalysisResult],
+                               llm_results: List[Any]) -> bool:
+        """Persist new LLM analysis results of change rows"""
+        try:
+            for row, llm_result in zip(rows, llm_results):
+                row.llm_comment = llm_result.comment
+                row.required_services = llm_result.required_services
+                row.severity = llm_result.severity
+                row.confidence = round(float(llm_result.confidence), 2)
+                row.reasoning = llm_result.reasoning
+                row.pending_reanalysis = llm_result.pending_reanalysis
+            await db.commit()
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error saving reanalysis results: {e}")
+            await db.rollback()
+            return False
+    
+    async def save_spans(self, db: AsyncSession, row: AnalysisResult,
+                         original_spans: List, modified_spans: List) -> bool:
+        """Persist lazily computed highlight spans of a change row"""
+        try:
+            row.original_spans = [list(span) for span in original_spans]
+            row.modified_spans = [list(span) for span in modified_spans]
+            await db.commit()
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error saving spans for result {row.id}: {e}")
+            await db.rollback()
+            return False
+    
+    async def save_analysis(self, db: AsyncSession, analysis_id: str,
+                            reference_doc: str, client_doc: str,
+                            reference_text: str, client_text: str,
+                            results: List[Dict[str, Any]],
+                            previous_analysis_id: Optional[str] = None) -> bool:
+        """Persist an analysis together with its change rows (API result dicts)"""
+        try:
+            db.add(Analysis(
+                id=uuid.UUID(analysis_id),
+                reference_filename=reference_doc,
+                client_filename=client_doc,
+                reference_text=reference_text,
+                client_text=client_text,
+                previous_analysis_id=uuid.UUID(previous_analysis_id) if previous_analysis_id else None,
+            ))
+            db.add_all([
+                self._result_to_row(result, analysis_id, reference_doc, client_doc)
+                for result in results
+            ])
+            await db.commit()
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error saving analysis {analysis_id}: {e}")
+            await db.rollback()
+            return False
+    
+    def _result_to_row(self, result: Dict[str, Any], analysis_id: str,
+                       reference_doc: str, client_doc: str) -> AnalysisResult:
+        """Convert API result dict into an AnalysisResult row"""
+        return AnalysisResult(
+            id=uuid.UUID(result["id"]),
+            original_text=result["originalText"],
+            modified_text=result["modifiedText"],
+            llm_comment=result["llmComment"],
+            change_type=result["changeType"],
+            severity=result["severity"],
+            confidence=round(float(result["confidence"]), 2),
+            required_services=result.get("requiredServices") or [],
+            reasoning=result.get("reasoning"),
+            context=result.get("context"),
+            position=result.get("position"),
+            original_spans=[list(span) for span in result.get("originalSpans") or []],
+            modified_spans=[list(span) for span in result.get("modifiedSpans") or []],
+            revision_status=result.get("revisionStatus") or 'new',
+            pending_reanalysis=bool(result.get("pendingReanalysis")),
+            analysis_id=uuid.UUID(analysis_id),
+            document_pair_reference=reference_doc,
+            document_pair_client=client_doc,
+        )
+    
+    def row_to_result(self, row: AnalysisResult, revision_status: str) -> Dict[str, Any]:
+        """Convert stored row into an API result dict for the current round"""
+        return {
+            "id": str(uuid.uuid4()),
+            "originalText": row.original_text,
+            "modifiedText": row.modified_text,
+            "llmComment": row.llm_comment,
+            "requiredServices": row.required_services or [],
+            "changeType": row.change_type,
+            "severity": row.severity,
+            "confidence": float(row.confidence),
+            "createdAt": row.created_at.isoformat() if row.created_at else None,
+            "originalSpans": [tuple(span) for span in row.original_spans or []],
+            "modifiedSpans": [tuple(span) for span in row.modified_spans or []],
+            "reasoning": row.reasoning,
+            "context": row.context,
+            "position": row.position,
+            "revisionStatus": revision_status,
+            "pendingReanalysis": row.pending_reanalysis or None,
+        }
@@ -0,0 +1,82 @@
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.services.russian_stemmer import WORD_PATTERN, stem
+
+
+def _normalize(text: str) -> str:
+    """Lower-cased word stems without punctuation and spacing"""
+    return ' '.join(stem(word) for word in WORD_PATTERN.findall(text))
+
+
+def _span_delta(text: str, spans: Sequence[Tuple]) -> List[str]:
+    return [_normalize(text[start:end]) for start, end, *_ in spans]
+
+
+def _word_delta(original: str, modified: str) -> Tuple[List[str], List[str]]:
+    """Words between the common prefix and suffix of two clauses"""
+    words1 = [stem(word) for word in WORD_PATTERN.findall(original)]
+    words2 = [stem(word) for word in WORD_PATTERN.findall(modified)]
+    prefix = 0
+    limit = min(len(words1), len(words2))
+    while prefix < limit and words1[prefix] == words2[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and words1[-1 - suffix] == words2[-1 - suffix]:
+        suffix += 1
+    return (
+        [' '.join(words1[prefix:len(words1) - suffix])],
+        [' '.join(words2[prefix:len(words2) - suffix])],
+    )
+
+
+def delta_signature(change) -> Optional[str]:
+    """
+    Hash of the normalized word-level delta of a change
+
+    Changes made by one global replacement share the signature whatever
+    the rest of their clauses. Added and deleted clauses are keyed by their
+    whole normalized text. Changes of amounts, rates, dates and terms are
+    never grouped: the same numeric edit means different things in
+    different clauses. Returns None for changes that are not grouped.
+    """
+    if getattr(change, 'fact_deltas', None):
+        return None
+
+    original_text = change.original_text or ''
+    modified_text = change.modified_text or ''
+    if change.change_type != 'modification':
+        removed, added = [_normalize(original_text)], [_normalize(modified_text)]
+    elif change.original_spans or change.modified_spans:
+        removed = _span_delta(original_text, change.original_spans)
+        added = _span_delta(modified_text, change.modified_spans)
+    else:
+        # Spans not computed (lazy_detail): the difference between the common prefix and suffix
+        removed, added = _word_delta(original_text, modified_text)
+    if not any(removed) and not any(added):
+        return None
+
+    key = '\x1f'.join((change.change_type, '\x1e'.join(removed), '\x1e'.join(added)))
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def cluster_changes(changes: Sequence) -> List[Tuple[Optional[str], List[int]]]:
+    """
+    Group changes with the same delta signature in one pass
+
+    Returns (cluster id, member indexes) in the order of the first member;
+    the first member is the one to analyze. The id is None for changes
+    without a repeat.
+    """
+    clusters: Dict[str, List[int]] = {}
+    groups = []
+    for k, change in enumerate(changes):
+        signature = delta_signature(change)
+        if signature is None:
+            groups.append((None, [k]))
+        elif signature in clusters:
+            clusters[signature].append(k)
+        else:
+            clusters[signature] = [k]
+            groups.append((signature, clusters[signature]))
+    return [(signature if len(members) > 1 else None, members) for signature, members in groups]
@@ -0,0 +1,238 @@
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.services.fact_extractor import FactDelta, fact_extractor, diff_facts
+
+# Операции интервалов подсветки: удаленный и вставленный текст
+DELETED = "-"
+INSERTED = "+"
+
+HighlightSpan = Tuple[int, int, str]
+
+# Типы изменений в порядке их кодов в колонке ChangeSet.kinds
+CHANGE_TYPES = ("deletion", "addition", "modification")
+DELETION, ADDITION, MODIFICATION = range(len(CHANGE_TYPES))
+
+# Отсутствующий подпункт в колонках индексов
+NO_CLAUSE = -1
+
+
+class ClauseTable:
+    """
+    Подпункты документа как смещения в исходном тексте.
+
+    Текст документа хранится один раз; для каждого подпункта в массивах
+    хранятся начало, конец (без пробелов по краям) и конец номера.
+    Строки создаются только при обращении к подпункту.
+    """
+
+    __slots__ = ('text', 'starts', 'ends', 'number_ends', 'numbered')
+
+    def __init__(self, text: str, numbered: bool = True):
+        self.text = text
+        self.starts = array('l')
+        self.ends = array('l')
+        self.number_ends = array('l')
+        # Без нумерации (разбиение на предложения) номер подпункта - его порядковый номер
+        self.numbered = numbered
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def append(self, start: int, end: int, number_end: int) -> None:
+        """Добавляет подпункт [start, end), номер которого занимает [start, number_end)"""
+        self.starts.append(start)
+        self.ends.append(end)
+        self.number_ends.append(number_end)
+
+    def full_text(self, index: int) -> str:
+        """Полный текст подпункта с номером"""
+        return self.text[self.starts[index]:self.ends[index]]
+
+    def number(self, index: int) -> str:
+        """Номер подпункта"""
+        if not self.numbered:
+            return f"{index + 1}."
+        return self.text[self.starts[index]:self.number_ends[index]]
+
+    def content(self, index: int) -> str:
+        """Текст подпункта без номера"""
+        return self.text[self.number_ends[index]:self.ends[index]].strip()
+
+    def length(self, index: int) -> int:
+        """Длина полного текста подпункта"""
+        return self.ends[index] - self.starts[index]
+
+    def iter_full_texts(self) -> Iterator[str]:
+        """Лениво перебирает полные тексты подпунктов"""
+        text = self.text
+        for start, end in zip(self.starts, self.ends):
+            yield text[start:end]
+
+
+class ChangeSet:
+    """
+    Колоночное хранилище изменений между двумя таблицами подпунктов.
+
+    Вместо объекта с копиями текстов каждое изменение - строка в массивах:
+    тип, индексы подпунктов в обеих редакциях и позиция. Интервалы подсветки
+    хранятся плоскими массивами со смещениями на изменение. Тексты
+    материализуются в строки только при обращении через ChangeView.
+    """
+
+    __slots__ = (
+        'reference', 'client', 'context',
+        'kinds', 'ref_indices', 'client_indices', 'positions', 'scores',
+        'original_bounds', 'original_starts', 'original_ends',
+        'modified_bounds', 'modified_starts', 'modified_ends',
+        'facts',
+    )
+
+    def __init__(self, reference: ClauseTable, client: ClauseTable, context: str = "Документ"):
+        self.reference = reference
+        self.client = client
+        self.context = context
+        self.kinds = array('b')
+        self.ref_indices = array('l')
+        self.client_indices = array('l')
+        self.positions = array('l')
+        # Предварительная оценка критичности по изменениям фактов
+        self.scores = array('d')
+        # Интервалы изменения k: [bounds[k], bounds[k + 1]) в массивах starts/ends
+        self.original_bounds = array('l', [0])
+        self.original_starts = array('l')
+        self.original_ends = array('l')
+        self.modified_bounds = array('l', [0])
+        self.modified_starts = array('l')
+        self.modified_ends = array('l')
+        # Изменения фактов по номеру изменения: вычисляются один раз
+        self.facts: Dict[int, List[FactDelta]] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index: int) -> 'ChangeView':
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ChangeSet index out of range")
+        return ChangeView(self, index)
+
+    def __iter__(self) -> Iterator['ChangeView']:
+        for index in range(len(self)):
+            yield ChangeView(self, index)
+
+    def append(self, kind: int, ref_index: Optional[int], client_index: Optional[int],
+               position: int, original_spans: Sequence[HighlightSpan] = (),
+               modified_spans: Sequence[HighlightSpan] = (),
+               severity_score: float = 0.0,
+               fact_deltas: Optional[List[FactDelta]] = None) -> None:
+        """Добавляет изменение; интервалы задаются относительно полных текстов подпунктов"""
+        if fact_deltas is not None:
+            self.facts[len(self.kinds)] = fact_deltas
+        self.kinds.append(kind)
+        self.ref_indices.append(NO_CLAUSE if ref_index is None else ref_index)
+        self.client_indices.append(NO_CLAUSE if client_index is None else client_index)
+        self.positions.append(position)
+        self.scores.append(severity_score)
+
+        for start, end, _ in original_spans:
+            self.original_starts.append(start)
+            self.original_ends.append(end)
+        self.original_bounds.append(len(self.original_starts))
+        for start, end, _ in modified_spans:
+            self.modified_starts.append(start)
+            self.modified_ends.append(end)
+        self.modified_bounds.append(len(self.modified_starts))
+
+    def fact_deltas(self, index: int) -> List[FactDelta]:
+        """Изменения фактов изменения index; без переданных при добавлении вычисляются при первом обращении"""
+        deltas = self.facts.get(index)
+        if deltas is None:
+            view = ChangeView(self, index)
+            deltas = self.facts[index] = diff_facts(
+                fact_extractor.extract(view.original_text),
+                fact_extractor.extract(view.modified_text)
+            )
+        return deltas
+
+
+class ChangeView:
+    """
+    Легковесное представление одного изменения ChangeSet.
+
+    Повторяет атрибуты DiffChange, поэтому может передаваться туда же,
+    где ожидается DiffChange; строки создаются при каждом обращении.
+    """
+
+    __slots__ = ('_changes', '_index')
+
+    # Атрибуты DiffChange, которые колоночное хранилище не поддерживает
+    highlighted_original = ""
+    highlighted_modified = ""
+    round_status = ""
+    detail_pending = False
+
+    def __init__(self, changes: ChangeSet, index: int):
+        self._changes = changes
+        self._index = index
+
+    @property
+    def change_type(self) -> str:
+        return CHANGE_TYPES[self._changes.kinds[self._index]]
+
+    @property
+    def position(self) -> int:
+        return self._changes.positions[self._index]
+
+    @property
+    def severity_score(self) -> float:
+        return self._changes.scores[self._index]
+
+    @property
+    def fact_deltas(self) -> List[FactDelta]:
+        """Изменения фактов; хранятся в ChangeSet, а не вычисляются при каждом обращении"""
+        return self._changes.fact_deltas(self._index)
+
+    @property
+    def original_text(self) -> str:
+        ref_index = self._changes.ref_indices[self._index]
+        return "" if ref_index == NO_CLAUSE else self._changes.reference.full_text(ref_index)
+
+    @property
+    def modified_text(self) -> str:
+        client_index = self._changes.client_indices[self._index]
+        return "" if client_index == NO_CLAUSE else self._changes.client.full_text(client_index)
+
+    @property
+    def text(self) -> str:
+        """Текст изменения: текст клиента, для удаления - текст эталона"""
+        return self.modified_text or self.original_text
+
+    @property
+    def context(self) -> str:
+        changes = self._changes
+        ref_index = changes.ref_indices[self._index]
+        if ref_index != NO_CLAUSE:
+            number = changes.reference.number(ref_index)
+        else:
+            number = changes.client.number(changes.client_indices[self._index])
+        return f"{changes.context}, подпункт {number}"
+
+    @property
+    def original_spans(self) -> List[HighlightSpan]:
+        changes = self._changes
+        lo, hi = changes.original_bounds[self._index], changes.original_bounds[self._index + 1]
+        return [
+            (start, end, DELETED)
+            for start, end in zip(changes.original_starts[lo:hi], changes.original_ends[lo:hi])
+        ]
+
+    @property
+    def modified_spans(self) -> List[HighlightSpan]:
+        changes = self._changes
+        lo, hi = changes.modified_bounds[self._index], changes.modified_bounds[self._index + 1]
+        return [
+            (start, end, INSERTED)
+            for start, end in zip(changes.modified_starts[lo:hi], changes.modified_ends[lo:hi])
+        ]
@@ -1,11 +1,118 @@
-import difflib
+import asyncio
 import logging
 import re
-from typing import List, Dict, Any, Tuple
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import List, Dict, Any, Tuple, Optional, Set, Iterator, AsyncIterator
+from dataclasses import dataclass, field
+
+from app.services.word_diff import WordDiffEngine, TokenInterner
+from app.services.sentence_segmenter import sentence_segmenter
+from app.services.fact_extractor import Fact, FactDelta, fact_extractor, diff_facts, severity_score
+from app.services.change_set import (
+    ChangeSet, ClauseTable, DELETED, INSERTED, DELETION, ADDITION, MODIFICATION, HighlightSpan
+)
 
 logger = logging.getLogger(__name__)
 
+# Статусы изменений при трехстороннем сравнении
+NEW_IN_THIS_ROUND = "new_in_this_round"
+UNCHANGED_SINCE_PREVIOUS = "unchanged_since_previous"
+REVERTED_TO_REFERENCE = "reverted_to_reference"
+
+_WORD_PATTERN = re.compile(r'\S+')
+
+
+# Паттерн для поиска подпунктов: цифра с точкой или скобкой в начале строки
+# Поддерживаем различные форматы: 1., 1), 1.1., 1.1), и т.д.
+# Также поддерживаем римские цифры и буквы: I., II., a), б), и т.д.
+_SUBPARAGRAPH_PATTERN = re.compile(
+    r'^([0-9]+(?:\.\d+)*[\.\)]|[IVX]+[\.\)]|[а-яё][\.\)]|[a-z][\.\)])\s*(.*?)'
+    r'(?=\n\s*([0-9]+(?:\.\d+)*[\.\)]|[IVX]+[\.\)]|[а-яё][\.\)]|[a-z][\.\)])|\Z)',
+    re.MULTILINE | re.DOTALL
+)
+
+# Число изменений, передаваемых из потока сравнения за один шаг исполнителя
+STREAM_BATCH_SIZE = 32
+
+# Во сколько раз окно потокового сравнения может вырасти, пока в нем нет
+# ни одного совпавшего подпункта (вставка или удаление длиннее окна)
+STREAM_WINDOW_GROWTH = 16
+
+# Число мемоизированных детальных сравнений подпунктов
+DETAIL_CACHE_SIZE = 2048
+
+# Число подпунктов с мемоизированными фактами
+FACT_CACHE_SIZE = 8192
+
+
+def _tokenize_with_offsets(text: str) -> Tuple[List[str], List[int], List[int]]:
+    """Разбивает текст на слова (как str.split) с позициями начала и конца"""
+    words, starts, ends = [], [], []
+    for match in _WORD_PATTERN.finditer(text):
+        words.append(match.group())
+        starts.append(match.start())
+        ends.append(match.end())
+    return words, starts, ends
+
+
+def _merge_spans(text: str, spans: List[HighlightSpan]) -> List[HighlightSpan]:
+    """Сливает соседние интервалы одной операции, разделенные только пробелами"""
+    merged: List[HighlightSpan] = []
+    for start, end, op in spans:
+        if merged:
+            prev_start, prev_end, prev_op = merged[-1]
+            if prev_op == op and not text[prev_end:start].strip():
+                merged[-1] = (prev_start, end, op)
+                continue
+        merged.append((start, end, op))
+    return merged
+
+
+def _group_sections(subparagraphs: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    """
+    Группирует подпункты в разделы по номеру верхнего уровня (3., 3.1., 3.2. -> 3).
+    Буквенные подпункты относятся к текущему разделу.
+    Возвращает диапазоны индексов подпунктов [start, end).
+    """
+    sections: List[Tuple[int, int]] = []
+    current_key = None
+    for index, subpara in enumerate(subparagraphs):
+        number = subpara['number']
+        if number[0].isdigit() or number[0] in 'IVX':
+            key = re.split(r'[.)]', number, maxsplit=1)[0]
+        else:
+            key = current_key
+        if not sections or key != current_key:
+            sections.append((index, index + 1))
+            current_key = key
+        else:
+            sections[-1] = (sections[-1][0], index + 1)
+    return sections
+
+
+def _section_bounds(sections: List[Tuple[int, int]], s1: int, s2: int, total: int) -> Tuple[int, int]:
+    """Диапазон подпунктов, покрываемый разделами [s1, s2)"""
+    if s1 < s2:
+        return sections[s1][0], sections[s2 - 1][1]
+    position = sections[s1][0] if s1 < len(sections) else total
+    return position, position
+
+
+def _take(iterator: Iterator, count: int) -> list:
+    """Забирает из итератора до count элементов"""
+    return list(islice(iterator, count))
+
+
+def _equal_indices(opcodes, first: bool) -> Set[int]:
+    """Индексы первой (или второй) последовательности в равных опкодах"""
+    indices = set()
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            indices.update(range(i1, i2) if first else range(j1, j2))
+    return indices
+
 
 @dataclass
 class DiffChange:
@@ -18,79 +125,123 @@ class DiffChange:
     context: str = ""
     highlighted_original: str = ""  # Редакция СБЛ с подсветкой
     highlighted_modified: str = ""  # Редакция лизингополучателя с подсветкой
+    original_spans: List[HighlightSpan] = field(default_factory=list)
+    modified_spans: List[HighlightSpan] = field(default_factory=list)
+    round_status: str = ""  # Статус при трехстороннем сравнении
+    detail_pending: bool = False  # Пословная подсветка еще не вычислена
+    fact_deltas: List[FactDelta] = field(default_factory=list)  # Изменения сумм, ставок, дат, сроков
+    severity_score: float = 0.0  # Предварительная оценка критичности по фактам
     
 
 class DiffAnalyzer:
     """Service for analyzing differences between documents"""
     
-    def __init__(self):
-        self.sequence_matcher = difflib.SequenceMatcher()
+    def __init__(self, algorithm: str = "histogram"):
+        self.word_diff = WordDiffEngine(algorithm)
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        # Мемоизация детального (предложения -> слова) сравнения подпунктов
+        self.change_detail = lru_cache(maxsize=DETAIL_CACHE_SIZE)(self._compute_change_detail)
+        # Мемоизация извлечения фактов из подпунктов
+        self.clause_facts = lru_cache(maxsize=FACT_CACHE_SIZE)(self._extract_clause_facts)
+    
+    def _extract_clause_facts(self, text: str) -> Tuple[Fact, ...]:
+        """Суммы, ставки, даты и сроки подпункта"""
+        return tuple(fact_extractor.extract(text))
+    
+    def fact_deltas(self, original_text: str, modified_text: str) -> List[FactDelta]:
+        """Изменения фактов между редакциями подпункта"""
+        return diff_facts(self.clause_facts(original_text), self.clause_facts(modified_text))
+    
+    def with_facts(self, change: DiffChange) -> DiffChange:
+        """Добавляет к изменению изменения фактов и предварительную оценку критичности"""
+        change.fact_deltas = self.fact_deltas(change.original_text, change.modified_text)
+        change.severity_score = severity_score(change.fact_deltas)
+        return change
     
     def _split_into_sentences(self, text: str) -> List[str]:
         """Разделяет текст на предложения"""
+        return list(self._iter_sentences(text))
+    
+    def _iter_sentences(self, text: str) -> Iterator[str]:
+        """Лениво перебирает предложения текста"""
         if not text:
-            return []
-        
-        # Разделяем по точкам, восклицательным и вопросительным знакам
-        sentences = re.split(r'[.!?]+', text)
+            return
         
-        # Убираем пустые предложения и очищаем пробелы
-        sentences = [s.strip() for s in sentences if s.strip()]
-        
-        return sentences
+        # Сокращения (п., ст., т.е.) и числа (1.5, 3.2) не разрывают предложение
+        for start, end in sentence_segmenter.iter_spans(text):
+            yield text[start:end]
     
     def _split_into_subparagraphs(self, text: str) -> List[Dict[str, Any]]:
         """
         Разделяет текст на подпункты (от цифры с номером подпункта до следующей цифры)
         Возвращает список словарей с информацией о подпунктах
         """
+        return list(self._iter_subparagraphs(text))
+    
+    def _iter_subparagraphs(self, text: str) -> Iterator[Dict[str, Any]]:
+        """
+        Лениво перебирает подпункты текста: следующий подпункт ищется
+        только тогда, когда нужен очередной элемент
+        """
         if not text:
-            return []
-        
-        # Паттерн для поиска подпунктов: цифра с точкой или скобкой в начале строки
-        # Поддерживаем различные форматы: 1., 1), 1.1., 1.1), и т.д.
-        # Также поддерживаем римские цифры и буквы: I., II., a), б), и т.д.
-        subparagraph_pattern = r'^([0-9]+(?:\.\d+)*[\.\)]|[IVX]+[\.\)]|[а-яё][\.\)]|[a-z][\.\)])\s*(.*?)(?=\n\s*([0-9]+(?:\.\d+)*[\.\)]|[IVX]+[\.\)]|[а-яё][\.\)]|[a-z][\.\)])|\Z)'
+            return
         
-        # Ищем все подпункты в тексте
-        matches = list(re.finditer(subparagraph_pattern, text, re.MULTILINE | re.DOTALL))
+        # Ищем подпункты в тексте; граница подпункта - начало следующего
+        matches = _SUBPARAGRAPH_PATTERN.finditer(text)
+        match = next(matches, None)
         
-        subparagraphs = []
-        
-        if matches:
-            for i, match in enumerate(matches):
-                number = match.group(1)
-                content = match.group(2).strip()
-                
-                # Определяем границы подпункта
-                start_pos = match.start()
-                if i < len(matches) - 1:
-                    end_pos = matches[i + 1].start()
-                else:
-                    end_pos = len(text)
-                
-                full_subparagraph = text[start_pos:end_pos].strip()
-                
-                subparagraphs.append({
-                    'number': number,
-                    'content': content,
-                    'full_text': full_subparagraph,
-                    'start_pos': start_pos,
-                    'end_pos': end_pos
-                })
-        else:
+        if match is None:
             # Если подпункты не найдены, разбиваем на предложения
-            sentences = self._split_into_sentences(text)
-            for i, sentence in enumerate(sentences):
-                subparagraphs.append({
+            for i, sentence in enumerate(self._iter_sentences(text)):
+                yield {
                     'number': f"{i+1}.",
                     'content': sentence,
                     'full_text': sentence,
                     'start_pos': 0,
                     'end_pos': len(sentence)
-                })
+                }
+            return
+        
+        while match is not None:
+            next_match = next(matches, None)
+            
+            # Определяем границы подпункта
+            start_pos = match.start()
+            end_pos = next_match.start() if next_match is not None else len(text)
+            
+            yield {
+                'number': match.group(1),
+                'content': match.group(2).strip(),
+                'full_text': text[start_pos:end_pos].strip(),
+                'start_pos': start_pos,
+                'end_pos': end_pos
+            }
+            match = next_match
+    
+    def _clause_table(self, text: str) -> ClauseTable:
+        """
+        Разбивает текст на подпункты без копирования их текстов:
+        подпункты хранятся как смещения в исходном тексте
+        """
+        matches = _SUBPARAGRAPH_PATTERN.finditer(text)
+        match = next(matches, None)
         
-        return subparagraphs
+        if match is None:
+            # Если подпункты не найдены, разбиваем на предложения
+            table = ClauseTable(text, numbered=False)
+            for start, end in sentence_segmenter.iter_spans(text):
+                table.append(start, end, start)
+            return table
+        
+        table = ClauseTable(text)
+        while match is not None:
+            next_match = next(matches, None)
+            end = next_match.start() if next_match is not None else len(text)
+            while end > match.start() and text[end - 1].isspace():
+                end -= 1
+            table.append(match.start(), end, match.end(1))
+            match = next_match
+        return table
     
     def _find_subparagraph_for_position(self, subparagraphs: List[Dict[str, Any]], position: int) -> Dict[str, Any]:
         """
@@ -109,8 +260,46 @@ class DiffAnalyzer:
         # Если подпунктов нет, возвращаем пустой
         return {'number': '1.', 'content': '', 'full_text': ''}
     
-    def _highlight_differences(self, text1: str, text2: str) -> Tuple[str, str]:
-        """Подсвечивает различия между двумя текстами"""
+    def _diff_clause(self, text1: str, text2: str, algorithm: Optional[str] = None,
+                     include_markup: bool = False,
+                     interner: Optional[TokenInterner] = None) -> Tuple[List[HighlightSpan], List[HighlightSpan], str, str]:
+        """
+        Сравнивает два подпункта на уровне слов.
+        Возвращает списки интервалов (start, end, op) для обоих текстов
+        и, по запросу, устаревшую разметку [-]/[+].
+        """
+        words1, starts1, ends1 = _tokenize_with_offsets(text1)
+        words2, starts2, ends2 = _tokenize_with_offsets(text2)
+        
+        opcodes = self.word_diff.get_opcodes(words1, words2, algorithm, interner)
+        
+        spans1: List[HighlightSpan] = []
+        spans2: List[HighlightSpan] = []
+        highlighted1 = []
+        highlighted2 = []
+        
+        for tag, i1, i2, j1, j2 in opcodes:
+            # Каждый опкод покрывает непрерывную серию слов, поэтому
+            # соседние измененные слова попадают в один интервал
+            if tag in ('delete', 'replace'):
+                spans1.append((starts1[i1], ends1[i2 - 1], DELETED))
+            if tag in ('insert', 'replace'):
+                spans2.append((starts2[j1], ends2[j2 - 1], INSERTED))
+            
+            if not include_markup:
+                continue
+            if tag == 'equal':
+                highlighted1.extend(words1[i1:i2])
+                highlighted2.extend(words2[j1:j2])
+            else:
+                highlighted1.extend([f"[-]{word}[/-]" for word in words1[i1:i2]])
+                highlighted2.extend([f"[+]{word}[/+]" for word in words2[j1:j2]])
+        
+        return spans1, spans2, ' '.join(highlighted1), ' '.join(highlighted2)
+    
+    def _highlight_differences(self, text1: str, text2: str,
+                               algorithm: Optional[str] = None) -> Tuple[str, str]:
+        """Подсвечивает различия между двумя текстами разметкой [-]/[+]"""
         if not text1 and not text2:
             return "", ""
         if not text1:
@@ -118,42 +307,75 @@ class DiffAnalyzer:
         if not text2:
             return f"[-]{text1}[/-]", ""
         
-        # Используем difflib для поиска различий на уровне слов
-        words1 = text1.split()
-        words2 = text2.split()
-        
-        self.sequence_matcher.set_seqs(words1, words2)
-        opcodes = self.sequence_matcher.get_opcodes()
+        _, _, highlighted1, highlighted2 = self._diff_clause(
+            text1, text2, algorithm, include_markup=True
+        )
+        return highlighted1, highlighted2
+    
+    def _compute_change_detail(self, original_text: str, modified_text: str,
+                               algorithm: Optional[str] = None) -> Tuple[Tuple[HighlightSpan, ...], Tuple[HighlightSpan, ...]]:
+        """
+        Детальное сравнение подпункта: сначала выравниваются предложения,
+        пословно сравниваются только измененные предложения.
+        Возвращает интервалы подсветки для обоих текстов.
+        """
+        sentences1 = list(sentence_segmenter.iter_spans(original_text))
+        sentences2 = list(sentence_segmenter.iter_spans(modified_text))
         
-        highlighted1 = []
-        highlighted2 = []
+        opcodes = self.word_diff.get_opcodes(
+            [original_text[a:b] for a, b in sentences1],
+            [modified_text[a:b] for a, b in sentences2],
+            algorithm
+        )
         
+        spans1: List[HighlightSpan] = []
+        spans2: List[HighlightSpan] = []
         for tag, i1, i2, j1, j2 in opcodes:
             if tag == 'equal':
-                # Одинаковые части
-                equal_words1 = words1[i1:i2]
-                equal_words2 = words2[j1:j2]
-                highlighted1.extend(equal_words1)
-                highlighted2.extend(equal_words2)
-            elif tag == 'delete':
-                # Удаленные слова
-                deleted_words = words1[i1:i2]
-                highlighted1.extend([f"[-]{word}[/-]" for word in deleted_words])
-            elif tag == 'insert':
-                # Добавленные слова
-                inserted_words = words2[j1:j2]
-                highlighted2.extend([f"[+]{word}[/+]" for word in inserted_words])
-            elif tag == 'replace':
-                # Замененные слова
-                old_words = words1[i1:i2]
-                new_words = words2[j1:j2]
-                highlighted1.extend([f"[-]{word}[/-]" for word in old_words])
-                highlighted2.extend([f"[+]{word}[/+]" for word in new_words])
+                continue
+            start1 = sentences1[i1][0] if i1 < i2 else 0
+            end1 = sentences1[i2 - 1][1] if i1 < i2 else 0
+            start2 = sentences2[j1][0] if j1 < j2 else 0
+            end2 = sentences2[j2 - 1][1] if j1 < j2 else 0
+            
+            region1, region2, _, _ = self._diff_clause(
+                original_text[start1:end1], modified_text[start2:end2], algorithm
+            )
+            spans1.extend((start1 + a, start1 + b, op) for a, b, op in region1)
+            spans2.extend((start2 + a, start2 + b, op) for a, b, op in region2)
         
-        return ' '.join(highlighted1), ' '.join(highlighted2)
+        return tuple(_merge_spans(original_text, spans1)), tuple(_merge_spans(modified_text, spans2))
+    
+    def ensure_detail(self, change: DiffChange, algorithm: Optional[str] = None) -> DiffChange:
+        """Вычисляет отложенную пословную подсветку изменения (с мемоизацией)"""
+        if change.detail_pending:
+            original_spans, modified_spans = self.change_detail(
+                change.original_text, change.modified_text, algorithm
+            )
+            change.original_spans = list(original_spans)
+            change.modified_spans = list(modified_spans)
+            change.detail_pending = False
+        return change
+    
+    def ensure_details(self, changes: List[DiffChange], algorithm: Optional[str] = None) -> List[DiffChange]:
+        """Вычисляет отложенную подсветку нескольких изменений (для запуска в executor)"""
+        return [self.ensure_detail(change, algorithm) for change in changes]
     
-    async def analyze_differences(self, reference_text: Dict, client_text: Dict) -> List[DiffChange]:
-        """Analyze differences between two document texts"""
+    async def analyze_differences(self, reference_text: Dict, client_text: Dict,
+                                  algorithm: Optional[str] = None,
+                                  include_markup: bool = False,
+                                  known_pairs: Optional[Set[Tuple[str, str]]] = None) -> List[DiffChange]:
+        """
+        Analyze differences between two document texts
+
+        Args:
+            reference_text: Processed reference document
+            client_text: Processed client document
+            algorithm: Diff algorithm override ("difflib", "myers", "histogram")
+            include_markup: Also build legacy [-]/[+] highlighted strings
+            known_pairs: (original, modified) clause pairs already analyzed in a
+                previous round; word-level diff is skipped for them
+        """
         try:
             # Всегда работаем с полным текстом и разбиваем его на подпункты
             ref_text = reference_text.get('text', '')
@@ -171,7 +393,8 @@ class DiffAnalyzer:
             
             # Сравниваем подпункты целиком
             changes = self._compare_subparagraphs(
-                ref_subparagraphs, client_subparagraphs, "Документ"
+                ref_subparagraphs, client_subparagraphs, "Документ", algorithm, include_markup,
+                known_pairs
             )
             
             logger.info(f"Found {len(changes)} subparagraph-level changes")
@@ -181,20 +404,338 @@ class DiffAnalyzer:
             logger.error(f"Error analyzing differences: {e}")
             return []
     
-    def _compare_subparagraphs(self, ref_subparagraphs: List[Dict[str, Any]], 
-                              client_subparagraphs: List[Dict[str, Any]], 
-                              context: str) -> List[DiffChange]:
-        """Сравнивает подпункты целиком и возвращает изменения"""
-        changes = []
+    async def analyze_change_set(self, reference_text: Dict, client_text: Dict,
+                                 algorithm: Optional[str] = None,
+                                 known_pairs: Optional[Set[Tuple[str, str]]] = None) -> ChangeSet:
+        """
+        Analyze differences into a compact columnar ChangeSet
+
+        Produces the same changes as analyze_differences (without legacy markup),
+        but clauses are kept as offsets into the source texts and changes as
+        array rows; texts are materialized only when a change is read.
+        """
+        reference = self._clause_table(reference_text.get('text', ''))
+        client = self._clause_table(client_text.get('text', ''))
+        changes = ChangeSet(reference, client)
         
-        # Создаем списки текстов подпунктов для сравнения
-        ref_texts = [subpara['full_text'] for subpara in ref_subparagraphs]
-        client_texts = [subpara['full_text'] for subpara in client_subparagraphs]
+        try:
+            clause_ids = TokenInterner()
+            opcodes = self.word_diff.get_opcodes_for_ids(
+                clause_ids.intern(reference.iter_full_texts()),
+                clause_ids.intern(client.iter_full_texts()),
+                algorithm
+            )
+            del clause_ids
+            
+            for i, j in self._iter_clause_pairs(opcodes):
+                if i is not None and j is not None:
+                    original_text = reference.full_text(i)
+                    modified_text = client.full_text(j)
+                    original_spans, modified_spans = [], []
+                    # Пару, проанализированную в предыдущем раунде, не сравниваем пословно
+                    if not known_pairs or (original_text, modified_text) not in known_pairs:
+                        original_spans, modified_spans, _, _ = self._diff_clause(
+                            original_text, modified_text, algorithm
+                        )
+                    deltas = self.fact_deltas(original_text, modified_text)
+                    changes.append(
+                        MODIFICATION, i, j, i, original_spans, modified_spans,
+                        severity_score(deltas), deltas
+                    )
+                elif i is not None:
+                    deltas = self.fact_deltas(reference.full_text(i), "")
+                    changes.append(
+                        DELETION, i, None, i, [(0, reference.length(i), DELETED)], (),
+                        severity_score(deltas), deltas
+                    )
+                else:
+                    deltas = self.fact_deltas("", client.full_text(j))
+                    changes.append(
+                        ADDITION, None, j, j, (), [(0, client.length(j), INSERTED)],
+                        severity_score(deltas), deltas
+                    )
+            
+            logger.info(
+                f"Change set: {len(reference)}/{len(client)} subparagraphs, {len(changes)} changes"
+            )
+            
+        except Exception as e:
+            logger.error(f"Error building change set: {e}")
+        
+        return changes
+    
+    def iter_differences(self, reference_text: Dict, client_text: Dict,
+                         algorithm: Optional[str] = None,
+                         include_markup: bool = False,
+                         window_size: int = 500) -> Iterator[DiffChange]:
+        """
+        Windowed diff for very large documents, yielding changes as they are found
+
+        Both documents are segmented lazily. Up to window_size clauses of each
+        side are aligned at a time; everything up to the last equal block of the
+        window (the anchor) is committed and yielded, the tail is carried over
+        into the next window. A window without any equal clause (an insertion
+        or deletion longer than the window) is doubled, up to
+        STREAM_WINDOW_GROWTH times, until the sides line up again. Memory is
+        proportional to the window, not the document.
+        """
+        ref_clauses = self._iter_subparagraphs(reference_text.get('text', ''))
+        client_clauses = self._iter_subparagraphs(client_text.get('text', ''))
+        
+        ref_window: List[Dict[str, Any]] = []
+        client_window: List[Dict[str, Any]] = []
+        ref_offset = client_offset = 0
+        ref_done = client_done = False
+        limit = window_size
+        
+        while True:
+            # Дополняем окна до текущего размера
+            while not ref_done and len(ref_window) < limit:
+                clause = next(ref_clauses, None)
+                if clause is None:
+                    ref_done = True
+                else:
+                    ref_window.append(clause)
+            while not client_done and len(client_window) < limit:
+                clause = next(client_clauses, None)
+                if clause is None:
+                    client_done = True
+                else:
+                    client_window.append(clause)
+            
+            if not ref_window and not client_window:
+                return
+            
+            # Идентификаторы подпунктов локальны для окна
+            clause_ids = TokenInterner()
+            opcodes = self.word_diff.get_opcodes_for_ids(
+                clause_ids.intern(c['full_text'] for c in ref_window),
+                clause_ids.intern(c['full_text'] for c in client_window),
+                algorithm
+            )
+            
+            # Фиксируем окно до конца последнего равного блока; в конце
+            # документов фиксируем окно целиком. Без якоря окно растет: иначе
+            # несовпавшие подпункты ушли бы в пары замен, и следующие окна
+            # остались бы сдвинутыми
+            commit_ref, commit_client = len(ref_window), len(client_window)
+            if not (ref_done and client_done):
+                anchors = [op for op in opcodes if op[0] == 'equal']
+                if anchors:
+                    commit_ref, commit_client = anchors[-1][2], anchors[-1][4]
+                elif limit < window_size * STREAM_WINDOW_GROWTH:
+                    limit *= 2
+                    continue
+            limit = window_size
+            committed = [op for op in opcodes if op[1] < commit_ref or op[3] < commit_client]
+            
+            for i, j in self._iter_clause_pairs(committed):
+                change = self._change_for_pair(
+                    ref_window, client_window, i, j, "Документ", algorithm, include_markup
+                )
+                change.position += ref_offset if i is not None else client_offset
+                yield change
+            
+            del ref_window[:commit_ref]
+            del client_window[:commit_client]
+            ref_offset += commit_ref
+            client_offset += commit_client
+    
+    async def stream_differences(self, reference_text: Dict, client_text: Dict,
+                                 algorithm: Optional[str] = None,
+                                 include_markup: bool = False,
+                                 window_size: int = 500) -> AsyncIterator[DiffChange]:
+        """
+        Async stream of changes from iter_differences
+
+        Diffing runs in the analyzer's executor and is prefetched into a small
+        queue, so callers can start analyzing the first changes while the rest
+        of the document is still being compared.
+        """
+        loop = asyncio.get_running_loop()
+        changes = self.iter_differences(
+            reference_text, client_text, algorithm, include_markup, window_size
+        )
+        queue: asyncio.Queue = asyncio.Queue(maxsize=2)
         
-        # Используем difflib для сравнения списков подпунктов
-        self.sequence_matcher.set_seqs(ref_texts, client_texts)
-        opcodes = self.sequence_matcher.get_opcodes()
+        async def produce():
+            try:
+                while True:
+                    batch = await loop.run_in_executor(
+                        self.executor, _take, changes, STREAM_BATCH_SIZE
+                    )
+                    await queue.put(batch)
+                    if not batch:
+                        return
+            except Exception as e:
+                logger.error(f"Error in streaming diff: {e}")
+                await queue.put(e)
         
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                batch = await queue.get()
+                if isinstance(batch, Exception):
+                    raise batch
+                if not batch:
+                    return
+                for change in batch:
+                    yield change
+        finally:
+            producer.cancel()
+    
+    def analyze_hierarchical(self, reference_text: Dict, client_text: Dict,
+                             algorithm: Optional[str] = None) -> List[DiffChange]:
+        """
+        Cheap first pass of a hierarchical diff: section and clause alignment only
+
+        Clauses are grouped into sections by their top-level number and every
+        section is hashed from its clause ids. Identical sections are skipped,
+        clauses are aligned only inside differing sections. Modified clauses are
+        returned with detail_pending=True; sentence- and word-level highlights
+        are computed on demand by ensure_detail/change_detail.
+        """
+        try:
+            ref_subparagraphs = self._split_into_subparagraphs(reference_text.get('text', ''))
+            client_subparagraphs = self._split_into_subparagraphs(client_text.get('text', ''))
+            
+            clause_ids = TokenInterner()
+            ref_ids = clause_ids.intern(s['full_text'] for s in ref_subparagraphs)
+            client_ids = clause_ids.intern(s['full_text'] for s in client_subparagraphs)
+            
+            ref_sections = _group_sections(ref_subparagraphs)
+            client_sections = _group_sections(client_subparagraphs)
+            
+            section_ids = TokenInterner()
+            section_opcodes = self.word_diff.get_opcodes_for_ids(
+                section_ids.intern(tuple(ref_ids[a:b]) for a, b in ref_sections),
+                section_ids.intern(tuple(client_ids[a:b]) for a, b in client_sections),
+                algorithm
+            )
+            
+            changes = []
+            for tag, s1, s2, t1, t2 in section_opcodes:
+                if tag == 'equal':
+                    continue
+                
+                # Подпункты отличающихся разделов
+                ref_lo, ref_hi = _section_bounds(ref_sections, s1, s2, len(ref_subparagraphs))
+                client_lo, client_hi = _section_bounds(client_sections, t1, t2, len(client_subparagraphs))
+                clause_opcodes = self.word_diff.get_opcodes_for_ids(
+                    ref_ids[ref_lo:ref_hi], client_ids[client_lo:client_hi], algorithm
+                )
+                
+                for i, j in self._iter_clause_pairs(clause_opcodes):
+                    change = self._change_for_pair(
+                        ref_subparagraphs[ref_lo:ref_hi], client_subparagraphs[client_lo:client_hi],
+                        i, j, "Документ", algorithm, detailed=False
+                    )
+                    change.position += ref_lo if i is not None else client_lo
+                    change.detail_pending = change.change_type == "modification"
+                    changes.append(change)
+            
+            logger.info(
+                f"Hierarchical diff: {len(ref_sections)}/{len(client_sections)} sections, "
+                f"{len(changes)} changes"
+            )
+            return changes
+            
+        except Exception as e:
+            logger.error(f"Error in hierarchical analysis: {e}")
+            return []
+    
+    async def analyze_three_way(self, reference_text: Dict, previous_text: Dict, client_text: Dict,
+                                algorithm: Optional[str] = None,
+                                include_markup: bool = False,
+                                known_pairs: Optional[Set[Tuple[str, str]]] = None) -> List[DiffChange]:
+        """
+        Three-way comparison: reference, previous client draft and current client draft
+
+        All three texts share one clause index, so clause hashes are computed once
+        and every alignment compares integer ids. Each change relative to the
+        reference is labeled with round_status: new_in_this_round,
+        unchanged_since_previous or reverted_to_reference.
+        """
+        try:
+            ref_subparagraphs = self._split_into_subparagraphs(reference_text.get('text', ''))
+            previous_subparagraphs = self._split_into_subparagraphs(previous_text.get('text', ''))
+            client_subparagraphs = self._split_into_subparagraphs(client_text.get('text', ''))
+            
+            logger.info(
+                f"Three-way subparagraphs: reference {len(ref_subparagraphs)}, "
+                f"previous {len(previous_subparagraphs)}, client {len(client_subparagraphs)}"
+            )
+            
+            # Общий индекс подпунктов для всех трех редакций
+            clause_ids = TokenInterner()
+            ref_ids = clause_ids.intern(s['full_text'] for s in ref_subparagraphs)
+            previous_ids = clause_ids.intern(s['full_text'] for s in previous_subparagraphs)
+            client_ids = clause_ids.intern(s['full_text'] for s in client_subparagraphs)
+            
+            ref_client = self.word_diff.get_opcodes_for_ids(ref_ids, client_ids, algorithm)
+            ref_previous = self.word_diff.get_opcodes_for_ids(ref_ids, previous_ids, algorithm)
+            previous_client = self.word_diff.get_opcodes_for_ids(previous_ids, client_ids, algorithm)
+            
+            # Подпункты, совпадающие между парами редакций
+            ref_in_client = _equal_indices(ref_client, first=True)
+            client_in_previous = _equal_indices(previous_client, first=False)
+            ref_previous_pairs = list(self._iter_clause_pairs(ref_previous))
+            # Подпункты эталона, удаленные уже в предыдущей редакции
+            ref_deleted_in_previous = {i for i, j in ref_previous_pairs if j is None}
+            # Подпункты предыдущей редакции, удаленные в текущей
+            previous_deleted_in_client = {i for i, j in self._iter_clause_pairs(previous_client) if j is None}
+            
+            # Общий словарь идентификаторов слов для пословного сравнения
+            word_ids = TokenInterner()
+            changes = []
+            
+            for i, j in self._iter_clause_pairs(ref_client):
+                change = self._change_for_pair(
+                    ref_subparagraphs, client_subparagraphs, i, j, "Документ",
+                    algorithm, include_markup, known_pairs, word_ids
+                )
+                if j is not None:
+                    unchanged = j in client_in_previous
+                else:
+                    # Удаление уже было в предыдущей редакции; подпункт, измененный
+                    # в предыдущей редакции и удаленный теперь, - новое изменение
+                    unchanged = i in ref_deleted_in_previous
+                change.round_status = UNCHANGED_SINCE_PREVIOUS if unchanged else NEW_IN_THIS_ROUND
+                changes.append(change)
+            
+            # Подпункты, где клиент вернулся к редакции СБЛ
+            for i, j in ref_previous_pairs:
+                if i is None:
+                    # Подпункт, добавленный в предыдущей редакции, удален клиентом
+                    if j not in previous_deleted_in_client:
+                        continue
+                    change = self._deletion_change(previous_subparagraphs[j], j, "Документ", include_markup)
+                elif i not in ref_in_client:
+                    continue
+                elif j is None:
+                    change = self._addition_change(ref_subparagraphs[i], i, "Документ", include_markup)
+                else:
+                    change = self._modification_change(
+                        previous_subparagraphs[j], ref_subparagraphs[i], i, "Документ",
+                        algorithm, include_markup, interner=word_ids
+                    )
+                change.context += " (возвращено к редакции СБЛ)"
+                change.round_status = REVERTED_TO_REFERENCE
+                changes.append(change)
+            
+            changes.sort(key=lambda change: change.position)
+            logger.info(f"Found {len(changes)} three-way subparagraph-level changes")
+            return changes
+            
+        except Exception as e:
+            logger.error(f"Error in three-way analysis: {e}")
+            return []
+    
+    def _iter_clause_pairs(self, opcodes) -> Iterator[Tuple[Optional[int], Optional[int]]]:
+        """
+        Перебирает пары индексов (подпункт эталона, подпункт клиента) для
+        неравных опкодов; None означает отсутствие подпункта в редакции
+        """
         for tag, i1, i2, j1, j2 in opcodes:
             if tag == 'equal':
                 # Одинаковые подпункты - пропускаем
@@ -202,86 +743,114 @@ class DiffAnalyzer:
             elif tag == 'delete':
                 # Удаленные подпункты
                 for i in range(i1, i2):
-                    subpara = ref_subparagraphs[i]
-                    
-                    change = DiffChange(
-                        original_text=subpara['full_text'],  # Полный текст подпункта с номером
-                        modified_text="",
-                        change_type="deletion",
-                        position=i,
-                        text=subpara['full_text'],
-                        context=f"{context}, подпункт {subpara['number']}",
-                        highlighted_original=f"[-]{subpara['full_text']}[/-]",
-                        highlighted_modified=""
-                    )
-                    changes.append(change)
+                    yield i, None
             elif tag == 'insert':
                 # Добавленные подпункты
                 for j in range(j1, j2):
-                    subpara = client_subparagraphs[j]
-                    
-                    change = DiffChange(
-                        original_text="",
-                        modified_text=subpara['full_text'],  # Полный текст подпункта с номером
-                        change_type="addition",
-                        position=j,
-                        text=subpara['full_text'],
-                        context=f"{context}, подпункт {subpara['number']}",
-                        highlighted_original="",
-                        highlighted_modified=f"[+]{subpara['full_text']}[/+]"
-                    )
-                    changes.append(change)
+                    yield None, j
             elif tag == 'replace':
                 # Замененные подпункты
                 # Берем более длинный диапазон для сравнения
                 max_range = max(i2 - i1, j2 - j1)
-                
                 for idx in range(max_range):
-                    ref_subpara = ref_subparagraphs[i1 + idx] if (i1 + idx) < i2 else None
-                    client_subpara = client_subparagraphs[j1 + idx] if (j1 + idx) < j2 else None
-                    
-                    if ref_subpara and client_subpara:
-                        # Модификация подпункта
-                        highlighted_orig, highlighted_mod = self._highlight_differences(
-                            ref_subpara['full_text'], client_subpara['full_text']  # Полный текст с номером
-                        )
-                        
-                        change = DiffChange(
-                            original_text=ref_subpara['full_text'],  # Полный текст подпункта с номером
-                            modified_text=client_subpara['full_text'],
-                            change_type="modification",
-                            position=i1 + idx,
-                            text=client_subpara['full_text'],
-                            context=f"{context}, подпункт {ref_subpara['number']}",
-                            highlighted_original=highlighted_orig,
-                            highlighted_modified=highlighted_mod
-                        )
-                        changes.append(change)
-                    elif ref_subpara:
-                        # Удаление подпункта
-                        change = DiffChange(
-                            original_text=ref_subpara['full_text'],  # Полный текст подпункта с номером
-                            modified_text="",
-                            change_type="deletion",
-                            position=i1 + idx,
-                            text=ref_subpara['full_text'],
-                            context=f"{context}, подпункт {ref_subpara['number']}",
-                            highlighted_original=f"[-]{ref_subpara['full_text']}[/-]",
-                            highlighted_modified=""
-                        )
-                        changes.append(change)
-                    elif client_subpara:
-                        # Добавление подпункта
-                        change = DiffChange(
-                            original_text="",
-                            modified_text=client_subpara['full_text'],  # Полный текст подпункта с номером
-                            change_type="addition",
-                            position=j1 + idx,
-                            text=client_subpara['full_text'],
-                            context=f"{context}, подпункт {client_subpara['number']}",
-                            highlighted_original="",
-                            highlighted_modified=f"[+]{client_subpara['full_text']}[/+]"
-                        )
-                        changes.append(change)
+                    yield (i1 + idx if (i1 + idx) < i2 else None,
+                           j1 + idx if (j1 + idx) < j2 else None)
+    
+    def _change_for_pair(self, ref_subparagraphs: List[Dict[str, Any]],
+                         client_subparagraphs: List[Dict[str, Any]],
+                         i: Optional[int], j: Optional[int], context: str,
+                         algorithm: Optional[str] = None, include_markup: bool = False,
+                         known_pairs: Optional[Set[Tuple[str, str]]] = None,
+                         interner: Optional[TokenInterner] = None,
+                         detailed: bool = True) -> DiffChange:
+        """Создает изменение для пары подпунктов"""
+        if i is not None and j is not None:
+            ref_subpara = ref_subparagraphs[i]
+            client_subpara = client_subparagraphs[j]
+            # Пару, проанализированную в предыдущем раунде, не сравниваем пословно
+            detailed = detailed and (not known_pairs or
+                (ref_subpara['full_text'], client_subpara['full_text']) not in known_pairs)
+            return self._modification_change(
+                ref_subpara, client_subpara, i, context,
+                algorithm, include_markup, detailed, interner
+            )
+        if i is not None:
+            return self._deletion_change(ref_subparagraphs[i], i, context, include_markup)
+        return self._addition_change(client_subparagraphs[j], j, context, include_markup)
+    
+    def _compare_subparagraphs(self, ref_subparagraphs: List[Dict[str, Any]], 
+                              client_subparagraphs: List[Dict[str, Any]], 
+                              context: str, algorithm: Optional[str] = None,
+                              include_markup: bool = False,
+                              known_pairs: Optional[Set[Tuple[str, str]]] = None) -> List[DiffChange]:
+        """Сравнивает подпункты целиком и возвращает изменения"""
+        # Создаем списки текстов подпунктов для сравнения
+        ref_texts = [subpara['full_text'] for subpara in ref_subparagraphs]
+        client_texts = [subpara['full_text'] for subpara in client_subparagraphs]
+        
+        # Сравниваем списки подпунктов
+        opcodes = self.word_diff.get_opcodes(ref_texts, client_texts, algorithm)
         
-        return changes 
\ No newline at end of file
+        return [
+            self._change_for_pair(
+                ref_subparagraphs, client_subparagraphs, i, j, context,
+                algorithm, include_markup, known_pairs
+            )
+            for i, j in self._iter_clause_pairs(opcodes)
+        ]
+    
+    def _deletion_change(self, subpara: Dict[str, Any], position: int, context: str,
+                         include_markup: bool = False) -> DiffChange:
+        """Изменение для удаленного подпункта"""
+        full_text = subpara['full_text']  # Полный текст подпункта с номером
+        return self.with_facts(DiffChange(
+            original_text=full_text,
+            modified_text="",
+            change_type="deletion",
+            position=position,
+            text=full_text,
+            context=f"{context}, подпункт {subpara['number']}",
+            highlighted_original=f"[-]{full_text}[/-]" if include_markup else "",
+            highlighted_modified="",
+            original_spans=[(0, len(full_text), DELETED)],
+        ))
+    
+    def _addition_change(self, subpara: Dict[str, Any], position: int, context: str,
+                         include_markup: bool = False) -> DiffChange:
+        """Изменение для добавленного подпункта"""
+        full_text = subpara['full_text']  # Полный текст подпункта с номером
+        return self.with_facts(DiffChange(
+            original_text="",
+            modified_text=full_text,
+            change_type="addition",
+            position=position,
+            text=full_text,
+            context=f"{context}, подпункт {subpara['number']}",
+            highlighted_original="",
+            highlighted_modified=f"[+]{full_text}[/+]" if include_markup else "",
+            modified_spans=[(0, len(full_text), INSERTED)],
+        ))
+    
+    def _modification_change(self, ref_subpara: Dict[str, Any], client_subpara: Dict[str, Any],
+                             position: int, context: str, algorithm: Optional[str] = None,
+                             include_markup: bool = False, detailed: bool = True,
+                             interner: Optional[TokenInterner] = None) -> DiffChange:
+        """Изменение для модифицированного подпункта с пословной подсветкой"""
+        original_spans, modified_spans, highlighted_orig, highlighted_mod = [], [], "", ""
+        if detailed:
+            original_spans, modified_spans, highlighted_orig, highlighted_mod = self._diff_clause(
+                ref_subpara['full_text'], client_subpara['full_text'], algorithm, include_markup,
+                interner
+            )
+        return self.with_facts(DiffChange(
+            original_text=ref_subpara['full_text'],
+            modified_text=client_subpara['full_text'],
+            change_type="modification",
+            position=position,
+            text=client_subpara['full_text'],
+            context=f"{context}, подпункт {ref_subpara['number']}",
+            highlighted_original=highlighted_orig,
+            highlighted_modified=highlighted_mod,
+            original_spans=original_spans,
+            modified_spans=modified_spans,
+        ))
@@ -14,6 +14,7 @@ from pdfminer.layout import LAParams
 import re
 
 from app.core.config import settings
+from app.services.sentence_segmenter import sentence_segmenter
 
 logger = logging.getLogger(__name__)
 
@@ -295,7 +296,8 @@ class DocumentProcessor:
                 paragraphs.extend(single_newline_split)
             else:
                 # Strategy 3: Split by sentences if no line breaks
-                sentence_split = re.split(r'[.!?]+\s+', text)
+                # (abbreviations and decimal numbers do not end a sentence)
+                sentence_split = sentence_segmenter.split(text)
                 paragraphs.extend(sentence_split)
         
         # Clean up paragraphs
@@ -0,0 +1,240 @@
+import re
+import logging
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Виды фактов
+MONEY = "money"
+PERCENT = "percent"
+DATE = "date"
+DURATION = "duration"
+
+FACT_LABELS = {
+    MONEY: "сумма",
+    PERCENT: "ставка",
+    DATE: "дата",
+    DURATION: "срок",
+}
+
+# Вес вида факта в предварительной оценке критичности изменения
+FACT_WEIGHTS = {
+    MONEY: 1.0,
+    PERCENT: 1.0,
+    DATE: 0.7,
+    DURATION: 0.8,
+}
+
+_MONTHS = {
+    "января": 1, "февраля": 2, "марта": 3, "апреля": 4, "мая": 5, "июня": 6,
+    "июля": 7, "августа": 8, "сентября": 9, "октября": 10, "ноября": 11, "декабря": 12,
+}
+
+_SCALES = {"тыс": 1e3, "млн": 1e6, "млрд": 1e9}
+
+_CURRENCIES = (
+    ("руб", "RUB"), ("₽", "RUB"), ("rub", "RUB"),
+    ("долл", "USD"), ("$", "USD"), ("usd", "USD"),
+    ("евро", "EUR"), ("€", "EUR"), ("eur", "EUR"),
+)
+
+# Длительность единицы срока в днях
+_DURATION_UNITS = (("дн", 1), ("ден", 1), ("недел", 7), ("мес", 30), ("лет", 365), ("год", 365))
+
+# Число: 1 500 000,50 / 1500000.50 / 12
+_NUMBER = r'\d{1,3}(?:[  ]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?'
+_SCALE = r'(?:\s*(?:тыс|млн|млрд)\.?)?'
+# Число прописью в скобках после цифр: 1 500 000 (один миллион пятьсот тысяч) рублей
+_SPELLED = r'(?:\s*\([^()\d]{1,120}\))?'
+
+# Все виды фактов ищутся одним проходом одного регулярного выражения
+_FACT_PATTERN = re.compile(
+    r'(?<![\w.,])(?:'
+    r'(?P<date>(?P<day>\d{1,2})\.(?P<month>\d{1,2})\.(?P<year>\d{4})'
+    r'|«?(?P<text_day>\d{1,2})»?\s+(?P<text_month>' + '|'.join(_MONTHS) + r')\s+(?P<text_year>\d{4}))'
+    r'|(?P<money>(?P<money_number>' + _NUMBER + r')' + _SPELLED + r'(?P<money_scale>' + _SCALE + r')\s*'
+    r'(?P<currency>руб(?:л[а-я]*)?\.?|₽|RUB|долл(?:ар[а-я]*)?\.?|USD|\$|евро|EUR|€)'
+    r'|(?P<prefix_currency>[$€₽]|RUB|USD|EUR)\s*(?P<prefix_number>' + _NUMBER + r'))'
+    r'|(?P<percent>(?P<percent_number>' + _NUMBER + r')' + _SPELLED + r'\s*(?:%|процент[а-я]*))'
+    # Год календаря ("в 2024 году", "до 2025 года") - не срок: четырехзначное число лет
+    # не считается, годы - только в формах после количества (1 год, 2 года, 5 лет)
+    r'|(?P<duration>(?!\d{4}(?!\d)' + _SPELLED + r'\s+(?:год|лет))(?P<duration_number>\d+)' + _SPELLED
+    + r'\s+(?P<working>(?:рабоч|банковск)[а-я]*\s+)?'
+    r'(?:календарн[а-я]*\s+)?(?P<duration_unit>дн[а-я]*|день|недел[а-я]*|месяц[а-я]*|мес\.|лет|года?)(?!\w))'
+    r')',
+    re.IGNORECASE
+)
+
+
+@dataclass(frozen=True)
+class Fact:
+    """Числовой факт подпункта: сумма, ставка, дата или срок"""
+    kind: str
+    value: float  # Сумма, проценты, порядковый номер дня даты или срок в днях
+    unit: str  # Валюта, "%", "date", "days" или "working_days"
+    text: str
+    start: int
+    end: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'kind': self.kind,
+            'value': self.value,
+            'unit': self.unit,
+            'text': self.text,
+            'start': self.start,
+            'end': self.end,
+        }
+
+
+@dataclass(frozen=True)
+class FactDelta:
+    """Изменение факта между редакциями; old или new отсутствует при удалении/добавлении"""
+    kind: str
+    unit: str
+    old: Optional[Fact] = None
+    new: Optional[Fact] = None
+
+    def describe(self) -> str:
+        """Описание изменения, например "ставка 12% → 15%" """
+        label = FACT_LABELS[self.kind]
+        if self.old is None:
+            return f"{label}: добавлено {self.new.text}"
+        if self.new is None:
+            return f"{label}: удалено {self.old.text}"
+        return f"{label} {self.old.text} → {self.new.text}"
+
+    def magnitude(self) -> float:
+        """Величина изменения от 0 до 1"""
+        if self.old is None or self.new is None:
+            return 1.0
+        old, new = self.old.value, self.new.value
+        relative = abs(new - old) / max(abs(old), 1e-9)
+        if self.kind == MONEY:
+            return min(1.0, 2 * relative)
+        if self.kind == PERCENT:
+            # 5 процентных пунктов - максимальная величина
+            return min(1.0, max(abs(new - old) / 5, relative))
+        if self.kind == DATE:
+            # Сдвиг на квартал - максимальная величина
+            return min(1.0, abs(new - old) / 90)
+        return min(1.0, relative)
+
+
+class FactExtractor:
+    """
+    Извлечение сумм (с валютой), процентов, дат и сроков из текста
+    одним проходом предварительно скомпилированного выражения
+    """
+
+    def extract(self, text: str) -> List[Fact]:
+        """Возвращает факты текста в порядке появления"""
+        facts = []
+        if not text:
+            return facts
+
+        for match in _FACT_PATTERN.finditer(text):
+            try:
+                fact = self._to_fact(match)
+            except (ValueError, OverflowError) as e:
+                logger.debug(f"Skipping fact {match.group()!r}: {e}")
+                continue
+            if fact is not None:
+                facts.append(fact)
+        return facts
+
+    def _to_fact(self, match: re.Match) -> Optional[Fact]:
+        text = match.group().strip()
+        start, end = match.start(), match.end()
+
+        if match.group('date'):
+            if match.group('day'):
+                day, month, year = int(match.group('day')), int(match.group('month')), int(match.group('year'))
+            else:
+                day = int(match.group('text_day'))
+                month = _MONTHS[match.group('text_month').lower()]
+                year = int(match.group('text_year'))
+            return Fact(DATE, float(date(year, month, day).toordinal()), "date", text, start, end)
+
+        if match.group('money'):
+            if match.group('prefix_currency'):
+                value = _parse_number(match.group('prefix_number'))
+                currency = match.group('prefix_currency').lower()
+            else:
+                value = _parse_number(match.group('money_number'))
+                scale = match.group('money_scale').strip().rstrip('.').lower()
+                value *= _SCALES.get(scale, 1.0)
+                currency = match.group('currency').lower()
+            unit = next(code for prefix, code in _CURRENCIES if currency.startswith(prefix))
+            return Fact(MONEY, value, unit, text, start, end)
+
+        if match.group('percent'):
+            return Fact(PERCENT, _parse_number(match.group('percent_number')), "%", text, start, end)
+
+        if match.group('duration'):
+            unit_text = match.group('duration_unit').lower()
+            days = next(days for prefix, days in _DURATION_UNITS if unit_text.startswith(prefix))
+            unit = "working_days" if match.group('working') else "days"
+            return Fact(DURATION, float(int(match.group('duration_number')) * days), unit, text, start, end)
+
+        return None
+
+
+def _parse_number(number: str) -> float:
+    """Разбирает число с пробелами-разделителями разрядов и десятичной запятой"""
+    return float(number.replace(' ', '').replace(' ', '').replace(',', '.'))
+
+
+def diff_facts(old_facts: Sequence[Fact], new_facts: Sequence[Fact]) -> List[FactDelta]:
+    """
+    Сравнивает факты двух редакций подпункта.
+    Совпадающие значения одного вида и единицы не считаются изменением;
+    оставшиеся факты сопоставляются по порядку появления.
+    """
+    deltas = []
+    for key in _ordered_keys(old_facts, new_facts):
+        removed = [fact for fact in old_facts if (fact.kind, fact.unit) == key]
+        added = [fact for fact in new_facts if (fact.kind, fact.unit) == key]
+
+        # Убираем факты с одинаковыми значениями (как мультимножество)
+        remaining = []
+        for fact in removed:
+            same = next((other for other in added if other.value == fact.value), None)
+            if same is None:
+                remaining.append(fact)
+            else:
+                added.remove(same)
+
+        for index in range(max(len(remaining), len(added))):
+            deltas.append(FactDelta(
+                kind=key[0],
+                unit=key[1],
+                old=remaining[index] if index < len(remaining) else None,
+                new=added[index] if index < len(added) else None,
+            ))
+    return deltas
+
+
+def _ordered_keys(*fact_lists: Iterable[Fact]) -> List[Tuple[str, str]]:
+    keys = {}
+    for facts in fact_lists:
+        for fact in facts:
+            keys.setdefault((fact.kind, fact.unit), None)
+    return list(keys)
+
+
+def severity_score(deltas: Iterable[FactDelta]) -> float:
+    """
+    Детерминированная предварительная оценка критичности от 0 до 1.
+    Вклады изменений фактов объединяются как независимые вероятности.
+    """
+    remaining = 1.0
+    for delta in deltas:
+        remaining *= 1.0 - FACT_WEIGHTS[delta.kind] * delta.magnitude()
+    return round(1.0 - remaining, 3)
+
+
+# Общий экземпляр
+fact_extractor = FactExtractor()
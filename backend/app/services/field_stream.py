@@ -0,0 +1,88 @@
+from typing import Dict, Set
+
+# Line prefixes of the single-change analysis format
+FIELD_PREFIXES = (
+    ('КОММЕНТАРИЙ:', 'comment'),
+    ('СОГЛАСОВАНИЯ:', 'required_services'),
+    ('КРИТИЧНОСТЬ:', 'severity'),
+    ('УВЕРЕННОСТЬ:', 'confidence'),
+    ('ОБОСНОВАНИЕ:', 'reasoning'),
+)
+FIELDS = tuple(name for _, name in FIELD_PREFIXES)
+
+# Fields shown first; once they are complete the result is usable
+REQUIRED_FIELDS = ('comment', 'required_services', 'severity')
+
+# Free text fields are exposed while their line is still being received
+_GROWING_FIELDS = ('comment', 'reasoning')
+
+_THINK_START = '<think>'
+_THINK_END = '</think>'
+
+
+class AnalysisFieldStream:
+    """
+    Incremental parser of the line-per-field analysis format
+
+    Chunks of a streamed completion are fed as they arrive. A field is
+    complete when its line ends; the comment and the reasoning are also
+    exposed while their line is still growing. Thoughts of reasoning models
+    (<think>...</think>) at the start of the output are skipped.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, str] = {}
+        self.completed: Set[str] = set()
+        self._line = ''
+        # None until the start of the output shows whether it is a thought block
+        self._thinking = None
+
+    @property
+    def required_complete(self) -> bool:
+        return all(name in self.completed for name in REQUIRED_FIELDS)
+
+    @property
+    def all_complete(self) -> bool:
+        return all(name in self.completed for name in FIELDS)
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk of text; True if any field value changed"""
+        self._line += chunk
+        if self._thinking is None:
+            start = self._line.lstrip()
+            if len(start) < len(_THINK_START) and _THINK_START.startswith(start):
+                return False
+            self._thinking = start.startswith(_THINK_START)
+        if self._thinking:
+            end = self._line.find(_THINK_END)
+            if end < 0:
+                # The tail is kept in case a closing tag is split between chunks
+                self._line = self._line[-len(_THINK_END):]
+                return False
+            self._line = self._line[end + len(_THINK_END):]
+            self._thinking = False
+
+        changed = False
+        while '\n' in self._line:
+            line, self._line = self._line.split('\n', 1)
+            changed |= self._take(line, complete=True)
+        return self._take(self._line, complete=False) or changed
+
+    def close(self) -> bool:
+        """End of output: the last line is complete"""
+        line, self._line = self._line, ''
+        return self._take(line, complete=True)
+
+    def _take(self, line: str, complete: bool) -> bool:
+        line = line.strip()
+        for prefix, name in FIELD_PREFIXES:
+            if line.startswith(prefix):
+                if not complete and name not in _GROWING_FIELDS:
+                    return False
+                value = line[len(prefix):].strip()
+                changed = self.values.get(name) != value or (complete and name not in self.completed)
+                self.values[name] = value
+                if complete:
+                    self.completed.add(name)
+                return changed
+        return False
@@ -0,0 +1,79 @@
+import re
+import json
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Trailing commas before a closing bracket, common in model output
+_TRAILING_COMMA_PATTERN = re.compile(r',\s*([}\]])')
+
+
+class JsonObjectStream:
+    """
+    Incremental, tolerant parser of JSON objects in LLM output
+
+    Chunks of text are fed as they arrive; every top-level JSON object is
+    returned as soon as its closing brace is seen. Text outside objects
+    (markdown fences, prose, the enclosing array brackets) is ignored, an
+    object that still fails to parse after repair is skipped, and an object
+    left unfinished by truncated output is never returned.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.skipped = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of text and return the objects completed by it"""
+        objects = []
+        start = 0 if self._depth else None
+        for position, char in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '{':
+                if self._depth == 0:
+                    start = position
+                self._depth += 1
+            elif self._depth == 0:
+                # Quotes outside objects (in the model's commentary) are ignored
+                continue
+            elif char == '"':
+                self._in_string = True
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[start:position + 1])
+                    parsed = self._parse(''.join(self._parts))
+                    self._parts = []
+                    start = None
+                    if parsed is not None:
+                        objects.append(parsed)
+        if self._depth and start is not None:
+            self._parts.append(chunk[start:])
+        return objects
+
+    def _parse(self, text: str):
+        for candidate in (text, _TRAILING_COMMA_PATTERN.sub(r'\1', text)):
+            try:
+                value = json.loads(candidate, strict=False)
+            except ValueError:
+                continue
+            if isinstance(value, dict):
+                return value
+        self.skipped += 1
+        logger.warning(f"Skipped malformed JSON object in LLM output: {text[:100]}")
+        return None
+
+
+def parse_json_objects(text: str) -> List[Dict[str, Any]]:
+    """Parse all complete JSON objects from a whole response"""
+    return JsonObjectStream().feed(text)
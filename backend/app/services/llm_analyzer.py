@@ -1,13 +1,97 @@
-import logging
+import time
 import asyncio
-from typing import List, Dict, Any
-from dataclasses import dataclass
-from openai import OpenAI
+import logging
+import importlib.util
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, asdict
+import httpx
+from openai import AsyncOpenAI
 
 from app.core.config import settings
+from app.services.field_stream import AnalysisFieldStream
+from app.services.json_stream import JsonObjectStream
+from app.services.llm_cache import LLMResponseCache
+from app.services.semantic_cache import MinHashIndex, change_type_code, minhash_signature
+from app.services.llm_resilience import CircuitBreaker, LLMUnavailableError, ResilientCaller
+from app.services.llm_scheduler import AdaptiveConcurrencyLimiter, LLMScheduler, TokenBucket
+from app.services.llm_usage import ModelPrices
+from app.services.llm_work_queue import BATCH, INTERACTIVE, REANALYSIS, FairWorkQueue, LLMJob, make_backend
+from app.services.model_router import ModelRouter, ModelTier
+from app.services.prompt_compiler import (
+    compile_list, compile_template, estimate_tokens, pack_regulations, trim_clause
+)
+from app.services.metrics import metrics_service
 
 logger = logging.getLogger(__name__)
 
+# Bump when prompt templates or response parsing change: cached results of
+# older versions are no longer used
+PROMPT_VERSION = "2"
+
+SEVERITIES = ('low', 'medium', 'high', 'critical')
+
+SERVICES_LIST = compile_list("""
+    ЮрУ - юридическое управление,
+    ДСКБ - Департамент сопровождения клиентов и бизнеса,
+    ПА - проблемные активы,
+    ФС - финансовая служба,
+    УСДС - управление страхования,
+    РД/УБУ - управление бухгалтерского учета,
+    КД - кредитный департамент.
+""")
+
+# Templates are dedented once here: indentation is not sent as tokens
+ANALYSIS_TEMPLATE = compile_template("""
+    Проанализируйте изменение в документе и определите необходимые согласования.{change_info}
+
+    ИСХОДНЫЙ ТЕКСТ:
+    {original_text}
+
+    РЕДАКЦИЯ ЛИЗИНГОПОЛУЧАТЕЛЯ:
+    {modified_text}
+
+    НОРМАТИВНАЯ БАЗА:
+    {regulations_context}
+
+    Пожалуйста, предоставьте анализ в следующем формате:
+    КОММЕНТАРИЙ: [Краткое описание изменения и его последствий]
+    СОГЛАСОВАНИЯ: [Список необходимых служб через запятую, надо выбрать из списка:
+    {services}
+    В ответе должны быть только названия служб, без пробелов и других символов и без описания]
+    КРИТИЧНОСТЬ: [low/medium/high]
+    УВЕРЕННОСТЬ: [число от 0 до 1]
+    ОБОСНОВАНИЕ: [Подробное объяснение решения. Объясни что и почему нужно проверить]
+""")
+
+CHANGE_BLOCK_TEMPLATE = compile_template("""
+    ИЗМЕНЕНИЕ {item_id}{change_info}
+    ИСХОДНЫЙ ТЕКСТ:
+    {original_text}
+    РЕДАКЦИЯ ЛИЗИНГОПОЛУЧАТЕЛЯ:
+    {modified_text}
+""")
+
+BATCH_TEMPLATE = compile_template("""
+    Проанализируйте каждое изменение в документе и определите необходимые согласования.
+
+    НОРМАТИВНАЯ БАЗА:
+    {regulations_context}
+
+    {change_blocks}
+
+    Ответ дайте только в виде JSON-массива, по одному объекту на каждое изменение, без текста вне массива:
+    [{{"id": "номер изменения", "comment": "краткое описание изменения и его последствий",
+      "services": ["службы из списка"], "severity": "low/medium/high",
+      "confidence": число от 0 до 1, "reasoning": "что и почему нужно проверить"}}]
+    Службы для согласования (только сокращенные названия):
+    {services}
+""")
+
+
+def _severity(changes: List[Any]) -> float:
+    """Pre-scored severity of a request: its most severe change"""
+    return max((getattr(change, 'severity_score', 0.0) or 0.0 for change in changes), default=0.0)
+
 
 @dataclass
 class LLMAnalysisResult:
@@ -17,43 +101,199 @@ class LLMAnalysisResult:
     severity: str
     confidence: float
     reasoning: str = ""
+    # Fallback result after an LLM or parsing error, never cached
+    failed: bool = False
+    # LLM endpoint was unavailable, the change has to be analyzed again later
+    pending_reanalysis: bool = False
+    # Update streamed before the completion is finished
+    partial: bool = False
+    # Model that answered, empty for results made without the LLM
+    model: str = ""
 
 
 class LLMAnalyzer:
     """Service for LLM-powered analysis of document changes"""
     
     def __init__(self):
-        self.client = OpenAI(
+        # Shared connection pool: keep-alive connections, HTTP/2 when h2 is installed
+        self.http_client = httpx.AsyncClient(
+            http2=settings.LLM_HTTP2 and importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                settings.LLM_READ_TIMEOUT,
+                connect=settings.LLM_CONNECT_TIMEOUT,
+                pool=settings.LLM_POOL_TIMEOUT,
+            ),
+        )
+        self.client = AsyncOpenAI(
             api_key=settings.OPENAI_API_KEY,
-            base_url=settings.OPENAI_BASE_URL
+            base_url=settings.OPENAI_BASE_URL,
+            http_client=self.http_client,
+            # Retries are done by the resilience layer
+            max_retries=0
+        )
+        self.resilience = ResilientCaller(
+            CircuitBreaker(
+                failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+                recovery_timeout=settings.LLM_CIRCUIT_RECOVERY_TIMEOUT,
+            ),
+            attempts=settings.RETRY_ATTEMPTS,
+            base_delay=settings.LLM_RETRY_BASE_DELAY,
+            max_delay=settings.LLM_RETRY_MAX_DELAY,
+            hedge_enabled=settings.LLM_HEDGE_ENABLED,
+            hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY,
+        )
+        # Calls beyond the concurrency limit wait here, fairly shared between
+        # analyses, instead of in the connection pool queue, which is rescanned
+        # for every pooled request
+        self.work_queue = FairWorkQueue(
+            make_backend(settings.LLM_QUEUE_BACKEND, settings.REDIS_URL),
+            weights={
+                INTERACTIVE: settings.LLM_QUEUE_WEIGHT_INTERACTIVE,
+                BATCH: settings.LLM_QUEUE_WEIGHT_BATCH,
+                REANALYSIS: settings.LLM_QUEUE_WEIGHT_REANALYSIS,
+            }
+        )
+        self.scheduler = LLMScheduler(
+            AdaptiveConcurrencyLimiter(
+                initial=settings.LLM_INITIAL_CONCURRENCY,
+                minimum=settings.LLM_MIN_CONCURRENCY,
+                maximum=settings.LLM_MAX_CONNECTIONS,
+                tolerance=settings.LLM_LATENCY_TOLERANCE,
+                adaptive=settings.LLM_ADAPTIVE_CONCURRENCY,
+                queue=self.work_queue,
+            ),
+            requests=TokenBucket(
+                settings.LLM_RATE_LIMIT_REQUESTS, settings.LLM_RATE_LIMIT_REQUESTS / settings.LLM_RATE_LIMIT_WINDOW
+            ) if settings.LLM_RATE_LIMIT_REQUESTS else None,
+            tokens=TokenBucket(
+                settings.LLM_RATE_LIMIT_TOKENS, settings.LLM_RATE_LIMIT_TOKENS / settings.LLM_RATE_LIMIT_WINDOW
+            ) if settings.LLM_RATE_LIMIT_TOKENS else None,
         )
         self.model = settings.OPENAI_MODEL
+        # Low-risk changes go to a smaller model, unsure answers come back to the large one
+        self.router = ModelRouter.from_yaml(
+            settings.LLM_MODEL_TIERS_PATH, self.model
+        ) if settings.LLM_ROUTING_ENABLED else ModelRouter.single(self.model)
+        self.prices = ModelPrices.from_yaml(settings.LLM_PRICES_PATH)
+        self.cache = LLMResponseCache(
+            memory_size=settings.LLM_CACHE_MEMORY_SIZE,
+            ttl=settings.LLM_CACHE_TTL,
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        ) if settings.LLM_CACHE_ENABLED else None
+        # Near-duplicate changes reuse cached results of their nearest neighbour
+        self.semantic_index = MinHashIndex.load(
+            settings.LLM_SEMANTIC_CACHE_PATH, self._cache_scope()
+        ) if self.cache is not None and settings.LLM_SEMANTIC_CACHE_ENABLED else None
+    
+    async def aclose(self):
+        """Close pooled HTTP connections and persist the semantic cache index"""
+        await self.http_client.aclose()
+        await self.work_queue.backend.aclose()
+        if self.semantic_index is not None:
+            try:
+                self.semantic_index.save(settings.LLM_SEMANTIC_CACHE_PATH)
+            except Exception as e:
+                logger.error(f"Error saving semantic cache index: {e}")
     
-    async def analyze_change(self, change, regulations: List[Dict]) -> LLMAnalysisResult:
+    async def analyze_change(self, change, regulations: List[Dict], job: Optional[LLMJob] = None,
+                             on_update: Optional[Callable[[LLMAnalysisResult], None]] = None) -> LLMAnalysisResult:
         """
         Analyze a specific change using LLM
         
         Args:
             change: The change object containing original and modified text
             regulations: List of relevant regulations
+            job: Analysis and priority class the request is queued under
+            on_update: Called with partial results while the completion streams
             
         Returns:
             LLMAnalysisResult: Analysis result
         """
+        key = self._cache_key(change, regulations)
+        cached = await self._get_cached(key, change)
+        if cached is not None:
+            return cached
+        
+        started = time.monotonic()
+        result = await self._request_analysis(change, regulations, job, on_update)
+        self._record_analysis(result, time.monotonic() - started)
+        await self._store_cached(key, result, change)
+        return result
+    
+    async def stream_change_analysis(self, change, regulations: List[Dict],
+                                     job: Optional[LLMJob] = None) -> AsyncIterator[LLMAnalysisResult]:
+        """Partial results of a change analysis as fields arrive, then the final result"""
+        updates: asyncio.Queue = asyncio.Queue()
+        
+        async def run():
+            try:
+                updates.put_nowait(await self.analyze_change(change, regulations, job, updates.put_nowait))
+            except BaseException as e:
+                updates.put_nowait(e)
+                raise
+        
+        task = asyncio.ensure_future(run())
+        try:
+            while True:
+                update = await updates.get()
+                if isinstance(update, BaseException):
+                    raise update
+                yield update
+                if not update.partial:
+                    return
+        finally:
+            task.cancel()
+    
+    async def _request_analysis(self, change, regulations: List[Dict], job: Optional[LLMJob] = None,
+                                on_update: Optional[Callable[[LLMAnalysisResult], None]] = None) -> LLMAnalysisResult:
+        """Analyze a change with a single-change request, bypassing the cache"""
+        tier = self.router.route(change)
+        metrics_service.record_llm_route(tier.model)
+        while True:
+            result = await self._request_on_tier(change, regulations, tier, job, on_update)
+            next_tier = self.router.escalate(tier, result)
+            if next_tier is None:
+                return result
+            metrics_service.record_llm_escalation(tier.model, next_tier.model)
+            tier = next_tier
+    
+    async def _request_on_tier(self, change, regulations: List[Dict], tier: ModelTier,
+                               job: Optional[LLMJob] = None,
+                               on_update: Optional[Callable[[LLMAnalysisResult], None]] = None) -> LLMAnalysisResult:
+        """Analyze a change with a single-change request to the model of a tier"""
         try:
             # Create context from regulations
-            regulations_context = self._create_regulations_context(regulations)
+            regulations_context = self._create_regulations_context(regulations, record=True)
             
             # Create prompt for LLM
-            prompt = self._create_analysis_prompt(change, regulations_context)
+            prompt = self._create_analysis_prompt(change, regulations_context, record=True)
+            metrics_service.record_llm_prompt('single', estimate_tokens(prompt))
             
             # Make request to OpenAI API using the library
-            response = await self._make_api_request(prompt)
-            
-            # Parse response
-            content = response.choices[0].message.content
-            return self._parse_llm_response(content)
+            if settings.LLM_STREAMING_ENABLED:
+                # Fields are parsed as they arrive
+                result = await self._make_streaming_request(
+                    prompt, job, _severity([change]), on_update, tier.model
+                )
+            else:
+                response = await self._make_api_request(
+                    prompt, job=job, severity=_severity([change]), model=tier.model
+                )
+                
+                # Parse response
+                content = response.choices[0].message.content
+                result = self._parse_llm_response(content, tier.model, job)
+            result.model = tier.model
+            return result
             
+        except LLMUnavailableError as e:
+            logger.error(f"LLM unavailable, change marked for reanalysis: {str(e)}")
+            return self._pending_result()
         except Exception as e:
             logger.error(f"Error in LLM analysis: {str(e)}")
             # Return fallback analysis
@@ -62,127 +302,536 @@ class LLMAnalyzer:
                 required_services=["Общий анализ"],
                 severity="medium",
                 confidence=0.1,
-                reasoning="Ошибка при обращении к LLM"
+                reasoning="Ошибка при обращении к LLM",
+                failed=True
             )
     
-    async def _make_api_request(self, prompt: str):
-        """Make request to OpenAI API using the library"""
-        def sync_request():
-            return self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=settings.OPENAI_TEMPERATURE,
-                max_tokens=settings.OPENAI_MAX_TOKENS,
+    async def analyze_changes(self, changes: List[Any], regulations: List[List[Dict]],
+                              job: Optional[LLMJob] = None) -> List[LLMAnalysisResult]:
+        """
+        Analyze several changes, packing them into batched requests
+        
+        Changes are grouped into requests of up to ANALYSIS_BATCH_SIZE changes
+        that fit into the model context (LLM_CONTEXT_TOKENS). Items missing or
+        malformed in a batched response are re-asked individually. With model
+        routing the changes are batched per model tier, and unsure answers of a
+        smaller model are asked again on the next tier. All requests are queued
+        at once; the work queue sends them most severe first.
+        
+        Args:
+            changes: Change objects in the order they should be analyzed
+            regulations: Relevant regulations for each change
+            job: Analysis and priority class the requests are queued under
+            
+        Returns:
+            List[LLMAnalysisResult]: Results in the order of changes
+        """
+        results = [None] * len(changes)
+        keys = [self._cache_key(change, change_regulations)
+                for change, change_regulations in zip(changes, regulations)]
+        misses = []
+        for k, key in enumerate(keys):
+            results[k] = await self._get_cached(key, changes[k])
+            if results[k] is None:
+                misses.append(k)
+        
+        # Changes are batched separately for each model tier
+        tiers: Dict[ModelTier, List[int]] = {}
+        for k in misses:
+            tiers.setdefault(self.router.route(changes[k]), []).append(k)
+        
+        async def analyze_tier(tier: ModelTier, indexes: List[int]):
+            metrics_service.record_llm_route(tier.model, len(indexes))
+            started = time.monotonic()
+            tier_results = await self._analyze_on_tier(
+                [changes[k] for k in indexes], [regulations[k] for k in indexes], tier, job
             )
+            for k, result in zip(indexes, tier_results):
+                results[k] = result
+                self._record_analysis(result, time.monotonic() - started)
+                await self._store_cached(keys[k], result, changes[k])
+        
+        await asyncio.gather(*(analyze_tier(tier, indexes) for tier, indexes in tiers.items()))
+        return results
+    
+    async def _analyze_on_tier(self, changes: List[Any], regulations: List[List[Dict]], tier: ModelTier,
+                               job: Optional[LLMJob] = None) -> List[LLMAnalysisResult]:
+        """Analyze changes on the model of a tier, escalating unsure answers to the next tier"""
+        results = [None] * len(changes)
+        
+        async def analyze_batch(batch: List[int]):
+            if len(batch) == 1:
+                batch_results = [await self._request_on_tier(
+                    changes[batch[0]], regulations[batch[0]], tier, job
+                )]
+            else:
+                batch_results = await self._analyze_batch(
+                    [changes[k] for k in batch], [regulations[k] for k in batch], job, tier
+                )
+            for k, result in zip(batch, batch_results):
+                results[k] = result
+        
+        await asyncio.gather(*(
+            analyze_batch(batch) for batch in self._pack_batches(changes, regulations)
+        ))
+        
+        escalated = [k for k, result in enumerate(results) if self.router.escalate(tier, result)]
+        if escalated:
+            next_tier = self.router.escalate(tier, results[escalated[0]])
+            metrics_service.record_llm_escalation(tier.model, next_tier.model, len(escalated))
+            escalated_results = await self._analyze_on_tier(
+                [changes[k] for k in escalated], [regulations[k] for k in escalated], next_tier, job
+            )
+            for k, result in zip(escalated, escalated_results):
+                results[k] = result
+        return results
+    
+    def _cache_key(self, change, regulations: List[Dict]) -> Optional[str]:
+        if self.cache is None:
+            return None
+        # With routing the answer depends on the whole tier table
+        return self.cache.make_key(
+            change, regulations, self.router.signature, settings.OPENAI_TEMPERATURE, PROMPT_VERSION
+        )
+    
+    def _cache_scope(self) -> str:
+        return f"{self.router.signature}:{settings.OPENAI_TEMPERATURE}:{PROMPT_VERSION}"
+    
+    async def _get_cached(self, key: Optional[str], change) -> Optional[LLMAnalysisResult]:
+        """Cached result of the same change, or adapted result of a near-duplicate"""
+        if key is None:
+            return None
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return LLMAnalysisResult(**cached)
+        if self.semantic_index is None:
+            return None
+        
+        signature = minhash_signature(change)
+        # Neighbours are only searched among changes of the same type
+        nearest = self.semantic_index.query(signature, change_type_code(change)) if signature is not None else None
+        if nearest is None or nearest[1] < settings.LLM_SEMANTIC_CACHE_THRESHOLD:
+            metrics_service.record_semantic_cache("miss" if signature is not None else "skipped")
+            return None
+        cached = await self.cache.get(nearest[0], record=False)
+        if cached is None:
+            # The neighbour's result was evicted from the cache
+            metrics_service.record_semantic_cache("evicted")
+            return None
         
-        # Run synchronous OpenAI client in thread pool
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, sync_request)
+        metrics_service.record_semantic_cache("hit")
+        result = LLMAnalysisResult(**cached)
+        result.confidence = round(result.confidence * settings.LLM_SEMANTIC_CACHE_CONFIDENCE_FACTOR, 2)
+        result.reasoning = (
+            f"{result.reasoning} [Результат анализа похожего изменения "
+            f"(сходство {nearest[1]:.2f}), анализ LLM не выполнялся]"
+        )
+        return result
+    
+    async def _store_cached(self, key: Optional[str], result: LLMAnalysisResult, change):
+        if key is None or result.failed:
+            return
+        await self.cache.put(key, result.model or self.model, PROMPT_VERSION, asdict(result))
+        if self.semantic_index is not None:
+            signature = minhash_signature(change)
+            if signature is not None:
+                self.semantic_index.add(signature, key, change_type_code(change))
     
-    def _create_regulations_context(self, regulations: List[Dict]) -> str:
-        """Create context string from regulations"""
+    def _pack_batches(self, changes: List[Any], regulations: List[List[Dict]]) -> List[List[int]]:
+        """Group change indexes into batches within the size and token budget"""
+        budget = settings.LLM_CONTEXT_TOKENS - estimate_tokens(self._create_batch_prompt([], ""))
+        batches = []
+        batch, used = [], 0
+        for k, change in enumerate(changes):
+            # Regulations are deduplicated within a batch, so the cost is an upper bound
+            cost = estimate_tokens(self._create_change_block(str(len(batch) + 1), change)) \
+                + estimate_tokens(self._create_regulations_context(regulations[k])) \
+                + settings.ANALYSIS_ITEM_MAX_TOKENS
+            if batch and (len(batch) >= settings.ANALYSIS_BATCH_SIZE or used + cost > budget):
+                batches.append(batch)
+                batch, used = [], 0
+            batch.append(k)
+            used += cost
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    async def _analyze_batch(self, changes: List[Any], regulations: List[List[Dict]],
+                             job: Optional[LLMJob] = None, tier: Optional[ModelTier] = None) -> List[LLMAnalysisResult]:
+        """Analyze a batch of changes with one request"""
+        tier = tier or self.router.tiers[-1]
+        item_ids = [str(k + 1) for k in range(len(changes))]
+        # Regulations found for several changes are sent once
+        prompt = self._create_batch_prompt(
+            [self._create_change_block(item_id, change, record=True)
+             for item_id, change in zip(item_ids, changes)],
+            self._create_regulations_context(
+                [reg for change_regulations in regulations for reg in change_regulations],
+                budget=len(changes) * settings.LLM_PROMPT_REGULATIONS_TOKENS,
+                record=True
+            )
+        )
+        metrics_service.record_llm_prompt('batch', estimate_tokens(prompt))
+        
+        parsed = {}
+        unavailable = False
+        try:
+            response = await self._make_api_request(
+                prompt, max_tokens=len(changes) * settings.ANALYSIS_ITEM_MAX_TOKENS,
+                job=job, severity=_severity(changes), model=tier.model
+            )
+            content = response.choices[0].message.content or ""
+            # Reasoning models may prepend their thoughts
+            content = content.rpartition('</think>')[2]
+            for item in JsonObjectStream().feed(content):
+                result = self._result_from_json(item)
+                if result is not None:
+                    result.model = tier.model
+                    parsed[str(item.get('id', '')).strip()] = result
+            missing = sum(1 for item_id in item_ids if item_id not in parsed)
+            if missing:
+                self._record_parse_failure(job, tier.model, 'batch', missing)
+        except LLMUnavailableError as e:
+            # Per-change retries are not sent to an unavailable endpoint
+            logger.error(f"LLM unavailable, {len(changes)} changes marked for reanalysis: {str(e)}")
+            unavailable = True
+        except Exception as e:
+            logger.error(f"Error in batched LLM analysis of {len(changes)} changes: {str(e)}")
+        
+        if unavailable:
+            return [self._pending_result() for _ in changes]
+        
+        results = []
+        reasked = reasked_tokens = 0
+        for item_id, change, change_regulations in zip(item_ids, changes, regulations):
+            if item_id in parsed:
+                results.append(parsed[item_id])
+                continue
+            # A missing or malformed item is asked for on its own
+            reasked += 1
+            reasked_tokens += estimate_tokens(self._create_analysis_prompt(
+                change, self._create_regulations_context(change_regulations)
+            ))
+            results.append(await self._request_on_tier(change, change_regulations, tier, job))
+        
+        single_tokens = sum(
+            estimate_tokens(self._create_analysis_prompt(
+                change, self._create_regulations_context(change_regulations)
+            ))
+            for change, change_regulations in zip(changes, regulations)
+        )
+        metrics_service.record_llm_batch(
+            items=len(changes),
+            reasked=reasked,
+            calls_saved=len(changes) - 1 - reasked,
+            tokens_saved=single_tokens - estimate_tokens(prompt) - reasked_tokens
+        )
+        return results
+    
+    def _request_body(self, prompt: str, max_tokens: Optional[int] = None,
+                      model: Optional[str] = None) -> Dict[str, Any]:
+        """Parameters of a chat completion request"""
+        return {
+            "model": model or self.model,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": settings.OPENAI_TEMPERATURE,
+            "max_tokens": max_tokens or settings.OPENAI_MAX_TOKENS,
+        }
+    
+    async def _make_api_request(self, prompt: str, max_tokens: Optional[int] = None,
+                                job: Optional[LLMJob] = None, severity: float = 0.0,
+                                model: Optional[str] = None):
+        """Make request to OpenAI API with retries, hedging and circuit breaking"""
+        body = self._request_body(prompt, max_tokens, model)
+        prompt_tokens = estimate_tokens(prompt)
+        estimated_tokens = prompt_tokens + body["max_tokens"]
+        
+        async def request():
+            queued = time.monotonic()
+            async with self.scheduler.slot(estimated_tokens, job, severity):
+                start = time.monotonic()
+                response = await self.client.chat.completions.create(**body)
+                usage = response.usage
+                if usage is not None:
+                    tokens = (usage.prompt_tokens, usage.completion_tokens)
+                else:
+                    content = response.choices[0].message.content if response.choices else None
+                    tokens = (prompt_tokens, estimate_tokens(content or ""))
+                self._record_call(job, body["model"], start - queued, time.monotonic() - start, *tokens)
+                return response
+        
+        return await self.resilience.call(request)
+    
+    async def _make_streaming_request(self, prompt: str, job: Optional[LLMJob], severity: float,
+                                      on_update: Optional[Callable[[LLMAnalysisResult], None]],
+                                      model: Optional[str] = None) -> LLMAnalysisResult:
+        """
+        Stream a single-change completion, parsing fields as they arrive
+        
+        Partial results are passed to on_update whenever a field changes. The
+        stream is closed, which stops generation, as soon as all fields are
+        complete, or once the required ones are and the reasoning exceeds
+        LLM_STREAM_REASONING_MAX_CHARS. Hedging is not used: two streams
+        would interleave their updates.
+        """
+        # The final chunk carries token usage; a stream closed early is estimated
+        body = {**self._request_body(prompt, model=model), "stream": True,
+                "stream_options": {"include_usage": True}}
+        prompt_tokens = estimate_tokens(prompt)
+        estimated_tokens = prompt_tokens + body["max_tokens"]
+        reasoning_cap = settings.LLM_STREAM_REASONING_MAX_CHARS
+        
+        async def request() -> AnalysisFieldStream:
+            fields = AnalysisFieldStream()
+            received, usage, first_token = [], None, None
+            queued = time.monotonic()
+            async with self.scheduler.slot(estimated_tokens, job, severity):
+                start = time.monotonic()
+                stream = await self.client.chat.completions.create(**body)
+                try:
+                    async for chunk in stream:
+                        usage = chunk.usage or usage
+                        delta = chunk.choices[0].delta if chunk.choices else None
+                        content = delta.content if delta is not None else None
+                        # reasoning_content is an extension of Qwen/DeepSeek servers, kept as an extra field
+                        if first_token is None and (content or getattr(delta, 'reasoning_content', None)):
+                            first_token = time.monotonic() - start
+                        if not content:
+                            continue
+                        received.append(content)
+                        required_before = fields.required_complete
+                        if not fields.feed(content):
+                            continue
+                        if fields.required_complete and not required_before:
+                            metrics_service.record_llm_stream_fields(time.monotonic() - start)
+                        if on_update is not None:
+                            on_update(self._result_from_fields(fields, partial=True))
+                        if fields.all_complete:
+                            metrics_service.record_llm_stream_stop("fields_complete")
+                            break
+                        if reasoning_cap and fields.required_complete \
+                                and len(fields.values.get('reasoning', '')) >= reasoning_cap:
+                            metrics_service.record_llm_stream_stop("reasoning_cap")
+                            break
+                finally:
+                    await stream.close()
+                self._record_call(
+                    job, body["model"], start - queued, time.monotonic() - start,
+                    usage.prompt_tokens if usage else prompt_tokens,
+                    usage.completion_tokens if usage else estimate_tokens("".join(received)),
+                    first_token
+                )
+            fields.close()
+            if not fields.required_complete:
+                self._record_parse_failure(job, body["model"], 'single')
+            return fields
+        
+        fields = await self.resilience.call(request, hedge=False)
+        result = self._result_from_fields(fields)
+        if reasoning_cap and len(result.reasoning) > reasoning_cap:
+            result.reasoning = result.reasoning[:reasoning_cap].rstrip() + "…"
+        return result
+    
+    def _record_call(self, job: Optional[LLMJob], model: str, queue_seconds: float, network_seconds: float,
+                     prompt_tokens: int, completion_tokens: int, first_token_seconds: Optional[float] = None):
+        """Record usage of an answered request in the metrics and in the usage of its analysis"""
+        cost = self.prices.cost(model, prompt_tokens, completion_tokens)
+        metrics_service.record_llm_model_call(
+            model, network_seconds, prompt_tokens, completion_tokens,
+            queue_seconds=queue_seconds, cost=cost, first_token_seconds=first_token_seconds
+        )
+        if job is not None:
+            job.usage.record_call(
+                model, prompt_tokens, completion_tokens, cost,
+                queue_seconds, network_seconds, first_token_seconds
+            )
+    
+    def _record_parse_failure(self, job: Optional[LLMJob], model: str, response_format: str, items: int = 1):
+        """Record answers without the required fields (single) or batch items missing or malformed"""
+        metrics_service.record_llm_parse_failure(model, response_format, items)
+        if job is not None:
+            job.usage.record_parse_failure(model, items)
+    
+    def _record_analysis(self, result: LLMAnalysisResult, seconds: float):
+        if result.pending_reanalysis:
+            status = 'pending'
+        elif result.failed:
+            status = 'failed'
+        else:
+            status = 'success'
+        metrics_service.record_llm_analysis(status, seconds)
+    
+    def _pending_result(self) -> LLMAnalysisResult:
+        """Placeholder result for a change left for reanalysis"""
+        return LLMAnalysisResult(
+            comment="Анализ отложен: сервис LLM временно недоступен",
+            required_services=[],
+            severity="medium",
+            confidence=0.0,
+            reasoning="Изменение будет проанализировано повторно",
+            failed=True,
+            pending_reanalysis=True
+        )
+    
+    def _create_regulations_context(self, regulations: List[Dict], budget: Optional[int] = None,
+                                    record: bool = False) -> str:
+        """Create context string from regulations, packed by relevance within a token budget"""
         if not regulations:
             return "Нет доступных нормативных документов для анализа."
         
-        context = "Релевантные нормативные документы:\n"
-        for reg in regulations:
-            context += f"- {reg.get('title', 'Без названия')}: {reg.get('content', '')[:200]}...\n"
-        
-        return context
+        lines, left_out = pack_regulations(
+            regulations,
+            budget=budget or settings.LLM_PROMPT_REGULATIONS_TOKENS,
+            snippet_chars=settings.LLM_PROMPT_REGULATION_CHARS
+        )
+        if record:
+            metrics_service.record_llm_prompt_trimmed('regulations', left_out)
+        return "Релевантные нормативные документы:\n" + "\n".join(lines)
     
-    def _create_analysis_prompt(self, change, regulations_context: str) -> str:
-        """Create analysis prompt for LLM"""
-        original_text = getattr(change, 'original_text', '')
-        modified_text = getattr(change, 'modified_text', '')
+    def _create_change_texts(self, change, record: bool = False) -> Tuple[str, str]:
+        """Original and modified clause texts, long clauses trimmed around the changes"""
+        original_text = getattr(change, 'original_text', '') or ''
+        modified_text = getattr(change, 'modified_text', '') or ''
+        trimmed = (
+            trim_clause(original_text, getattr(change, 'original_spans', None) or (), modified_text,
+                        settings.LLM_PROMPT_CLAUSE_MAX_TOKENS, settings.LLM_PROMPT_CONTEXT_CHARS),
+            trim_clause(modified_text, getattr(change, 'modified_spans', None) or (), original_text,
+                        settings.LLM_PROMPT_CLAUSE_MAX_TOKENS, settings.LLM_PROMPT_CONTEXT_CHARS),
+        )
+        if record:
+            for text, trimmed_text in zip((original_text, modified_text), trimmed):
+                if trimmed_text is not text:
+                    metrics_service.record_llm_prompt_trimmed(
+                        'clause', estimate_tokens(text) - estimate_tokens(trimmed_text)
+                    )
+        return trimmed
+    
+    def _create_change_info(self, change) -> str:
+        """Clause context and fact deltas of a change for the prompt"""
         context = getattr(change, 'context', '')
         
-        # Извлекаем информацию о подпункте из контекста
+        # Clause information is taken from the context
         subparagraph_info = ""
         if "подпункт" in context:
             subparagraph_info = f"\nКОНТЕКСТ ИЗМЕНЕНИЯ: {context}"
         
-        prompt = f"""
-            Проанализируйте изменение в документе и определите необходимые согласования.
-            {subparagraph_info}
-
-            ИСХОДНЫЙ ТЕКСТ:
-            {original_text}
-
-            РЕДАКЦИЯ ЛИЗИНГОПОЛУЧАТЕЛЯ:
-            {modified_text}
-
-            НОРМАТИВНАЯ БАЗА:
-            {regulations_context}
-
-            Пожалуйста, предоставьте анализ в следующем формате:
-            КОММЕНТАРИЙ: [Краткое описание изменения и его последствий]
-            СОГЛАСОВАНИЯ: [Список необходимых служб через запятую, надо выбрать из списка: 
-                    ЮрУ - юридическое управление,
-                    ДСКБ - Департамент сопровождения клиентов и бизнеса,
-                    ПА - проблемные активы,
-                    ФС - финансовая служба,
-                    УСДС - управление страхования,
-                    РД/УБУ - управление бухгалтерского учета,
-                    КД - кредитный департамент.
-                    В ответе должны быть только названия служб, без пробелов и других символов и без описания]
-            КРИТИЧНОСТЬ: [low/medium/high]
-            УВЕРЕННОСТЬ: [число от 0 до 1]
-            ОБОСНОВАНИЕ: [Подробное объяснение решения. Объясни что и почему нужно проверить]
-            """
-        return prompt
-    
-    def _parse_llm_response(self, content: str) -> LLMAnalysisResult:
-        """Parse LLM response and extract structured data"""
+        # Changes of amounts, rates, dates and terms found without the LLM
+        fact_deltas = getattr(change, 'fact_deltas', None) or []
+        if fact_deltas:
+            subparagraph_info += "\nИЗМЕНЕНИЯ ЧИСЛОВЫХ УСЛОВИЙ: " + "; ".join(
+                delta.describe() for delta in fact_deltas
+            )
+        return subparagraph_info
+    
+    def _create_analysis_prompt(self, change, regulations_context: str, record: bool = False) -> str:
+        """Create analysis prompt for LLM"""
+        original_text, modified_text = self._create_change_texts(change, record)
+        return ANALYSIS_TEMPLATE.format(
+            change_info=self._create_change_info(change),
+            original_text=original_text,
+            modified_text=modified_text,
+            regulations_context=regulations_context,
+            services=SERVICES_LIST
+        )
+    
+    def _create_change_block(self, item_id: str, change, record: bool = False) -> str:
+        """Section of a batched prompt describing one change"""
+        original_text, modified_text = self._create_change_texts(change, record)
+        return CHANGE_BLOCK_TEMPLATE.format(
+            item_id=item_id,
+            change_info=self._create_change_info(change),
+            original_text=original_text,
+            modified_text=modified_text
+        )
+    
+    def _create_batch_prompt(self, change_blocks: List[str], regulations_context: str) -> str:
+        """Create prompt for a batch of changes with shared instructions"""
+        return BATCH_TEMPLATE.format(
+            regulations_context=regulations_context,
+            change_blocks="\n\n".join(change_blocks),
+            services=SERVICES_LIST
+        )
+    
+    def _result_from_json(self, item: Dict[str, Any]) -> Optional[LLMAnalysisResult]:
+        """Convert an item of a batched response, None if it is malformed"""
+        comment = item.get('comment')
+        if not isinstance(comment, str) or not comment.strip():
+            return None
+        
+        services = item.get('services') or []
+        if isinstance(services, str):
+            services = services.split(',')
+        if not isinstance(services, list):
+            return None
+        
+        severity = str(item.get('severity', 'medium')).strip('[] ').lower()
+        if severity not in SEVERITIES:
+            severity = 'medium'
+        
         try:
-            # Default values
-            comment = "Изменение требует проверки"
-            required_services = ["Общий анализ"]
-            severity = "medium"
+            confidence = min(max(float(item.get('confidence', 0.5)), 0.0), 1.0)
+        except (TypeError, ValueError):
             confidence = 0.5
-            reasoning = "Стандартный анализ"
-            
-            # Simple parsing logic
-            lines = content.split('\n')
-            for line in lines:
-                line = line.strip()
-                if line.startswith('КОММЕНТАРИЙ:'):
-                    comment = line.replace('КОММЕНТАРИЙ:', '').strip()
-                elif line.startswith('СОГЛАСОВАНИЯ:'):
-                    services_str = line.replace('СОГЛАСОВАНИЯ:', '').strip()
-                    required_services = [s.strip() for s in services_str.split(',') if s.strip()]
-                elif line.startswith('КРИТИЧНОСТЬ:'):
-                    severity = line.replace('КРИТИЧНОСТЬ:', '').strip().lower()
-                    # Remove square brackets if present
-                    severity = severity.strip('[]')
-                    # Validate severity value
-                    if severity not in ['low', 'medium', 'high', 'critical']:
-                        severity = 'medium'  # default fallback
-                elif line.startswith('УВЕРЕННОСТЬ:'):
-                    try:
-                        confidence = float(line.replace('УВЕРЕННОСТЬ:', '').strip())
-                    except ValueError:
-                        confidence = 0.5
-                elif line.startswith('ОБОСНОВАНИЕ:'):
-                    reasoning = line.replace('ОБОСНОВАНИЕ:', '').strip()
-            
-            return LLMAnalysisResult(
-                comment=comment,
-                required_services=required_services,
-                severity=severity,
-                confidence=confidence,
-                reasoning=reasoning
-            )
+        
+        return LLMAnalysisResult(
+            comment=comment.strip(),
+            required_services=[str(s).strip() for s in services if str(s).strip()],
+            severity=severity,
+            confidence=confidence,
+            reasoning=str(item.get('reasoning') or "Стандартный анализ").strip()
+        )
+    
+    def _result_from_fields(self, fields: AnalysisFieldStream, partial: bool = False) -> LLMAnalysisResult:
+        """Convert parsed fields of the single-change format, with defaults for missing ones"""
+        values = fields.values
+        
+        services_str = values.get('required_services')
+        required_services = [s.strip() for s in services_str.split(',') if s.strip()] \
+            if services_str is not None else ["Общий анализ"]
+        
+        # Remove square brackets if present
+        severity = values.get('severity', 'medium').lower().strip('[]')
+        # Validate severity value
+        if severity not in SEVERITIES:
+            severity = 'medium'  # default fallback
+        
+        try:
+            confidence = float(values.get('confidence', 0.5))
+        except ValueError:
+            confidence = 0.5
+        
+        return LLMAnalysisResult(
+            comment=values.get('comment', "Изменение требует проверки"),
+            required_services=required_services,
+            severity=severity,
+            confidence=confidence,
+            reasoning=values.get('reasoning', "Стандартный анализ"),
+            partial=partial
+        )
+    
+    def _parse_llm_response(self, content: str, model: Optional[str] = None,
+                            job: Optional[LLMJob] = None) -> LLMAnalysisResult:
+        """Parse LLM response and extract structured data"""
+        try:
+            fields = AnalysisFieldStream()
+            fields.feed(content)
+            fields.close()
+            if not fields.required_complete:
+                self._record_parse_failure(job, model or self.model, 'single')
+            return self._result_from_fields(fields)
             
         except Exception as e:
             logger.error(f"Error parsing LLM response: {str(e)}")
+            self._record_parse_failure(job, model or self.model, 'single')
             return LLMAnalysisResult(
                 comment="Ошибка при разборе ответа LLM",
                 required_services=["Общий анализ"],
                 severity="medium",
                 confidence=0.1,
-                reasoning=f"Ошибка парсинга: {str(e)}"
+                reasoning=f"Ошибка парсинга: {str(e)}",
+                failed=True
             )
     
     async def mock_analyze_change(self, change, regulations: List[Dict]) -> LLMAnalysisResult:
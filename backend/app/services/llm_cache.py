@@ -0,0 +1,163 @@
+import re
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database.connection import AsyncSessionLocal
+from app.models.llm_cache import LLMCacheEntry
+from app.services.metrics import metrics_service
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_QUOTES_PATTERN = re.compile(r'[«»“”„‟]')
+
+# Size-based eviction runs once per this many stored entries
+EVICTION_INTERVAL = 100
+
+
+def normalize_text(text: str) -> str:
+    """Normalize whitespace and quotes so formatting differences share a cache entry"""
+    return _WHITESPACE_PATTERN.sub(' ', _QUOTES_PATTERN.sub('"', text or '')).strip()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of LLM analysis results
+
+    The hot tier is an in-process LRU, the persistent tier is the llm_cache
+    table shared by all workers. Entries expire after `ttl` seconds; the table
+    is trimmed to `max_entries` least recently hit rows. Database errors are
+    logged and treated as misses, so the cache never fails an analysis.
+    """
+
+    def __init__(self, memory_size: int, ttl: int, max_entries: int):
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (stored_at, model, prompt_version, result)
+        self._memory: OrderedDict = OrderedDict()
+        self._stored_since_eviction = 0
+
+    @staticmethod
+    def make_key(change, regulations: List[Dict], model: str, temperature: float,
+                 prompt_version: str) -> str:
+        """Hash of everything that determines the LLM answer for a change"""
+        payload = json.dumps([
+            prompt_version,
+            model,
+            temperature,
+            getattr(change, 'change_type', ''),
+            normalize_text(getattr(change, 'original_text', '')),
+            normalize_text(getattr(change, 'modified_text', '')),
+            # The context is part of the prompt: the same texts in another context get another answer
+            hashlib.sha256(normalize_text(getattr(change, 'context', '') or '').encode('utf-8')).hexdigest(),
+            sorted(str(reg.get('id') or reg.get('title')) for reg in regulations),
+        ], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    async def get(self, key: str, record: bool = True) -> Optional[Dict[str, Any]]:
+        """Cached result fields, None on miss; `record` counts the lookup in metrics"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            if time.time() - entry[0] < self.ttl:
+                self._memory.move_to_end(key)
+                if record:
+                    metrics_service.record_llm_cache('memory_hit')
+                return entry[3]
+            del self._memory[key]
+
+        try:
+            async with AsyncSessionLocal() as session:
+                row = (await session.execute(
+                    select(LLMCacheEntry).where(
+                        LLMCacheEntry.key == key,
+                        LLMCacheEntry.created_at > self._expiry_threshold()
+                    )
+                )).scalar_one_or_none()
+                if row is not None:
+                    await session.execute(
+                        update(LLMCacheEntry).where(LLMCacheEntry.key == key).values(
+                            hit_count=LLMCacheEntry.hit_count + 1,
+                            last_hit_at=datetime.now(timezone.utc)
+                        )
+                    )
+                    await session.commit()
+        except Exception as e:
+            logger.error(f"Error reading LLM cache: {e}")
+            row = None
+
+        if record:
+            metrics_service.record_llm_cache('db_hit' if row is not None else 'miss')
+        if row is None:
+            return None
+        stored_at = row.created_at.timestamp() if row.created_at else time.time()
+        self._remember(key, stored_at, row.model, row.prompt_version, row.result)
+        return row.result
+
+    async def put(self, key: str, model: str, prompt_version: str, result: Dict[str, Any]):
+        """Store a result in both tiers"""
+        self._remember(key, time.time(), model, prompt_version, result)
+        try:
+            async with AsyncSessionLocal() as session:
+                now = datetime.now(timezone.utc)
+                statement = insert(LLMCacheEntry).values(
+                    key=key, model=model, prompt_version=prompt_version,
+                    result=result, hit_count=0, created_at=now, last_hit_at=now
+                )
+                await session.execute(statement.on_conflict_do_update(
+                    index_elements=[LLMCacheEntry.key],
+                    set_={'result': result, 'created_at': now, 'last_hit_at': now}
+                ))
+                self._stored_since_eviction += 1
+                if self._stored_since_eviction >= EVICTION_INTERVAL:
+                    self._stored_since_eviction = 0
+                    await self._evict(session)
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Error writing LLM cache: {e}")
+
+    async def purge(self, model: Optional[str] = None, prompt_version: Optional[str] = None) -> int:
+        """Delete entries of a model and/or prompt version (all entries without filters)"""
+        for key, (_, entry_model, entry_version, _) in list(self._memory.items()):
+            if (model is None or entry_model == model) and \
+                    (prompt_version is None or entry_version == prompt_version):
+                del self._memory[key]
+
+        statement = delete(LLMCacheEntry)
+        if model is not None:
+            statement = statement.where(LLMCacheEntry.model == model)
+        if prompt_version is not None:
+            statement = statement.where(LLMCacheEntry.prompt_version == prompt_version)
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(statement)
+            await session.commit()
+        logger.info(f"Purged {result.rowcount} LLM cache entries (model={model}, prompt_version={prompt_version})")
+        return result.rowcount
+
+    async def _evict(self, session):
+        """Delete expired entries and trim the table to the least recently hit max_entries"""
+        await session.execute(
+            delete(LLMCacheEntry).where(LLMCacheEntry.created_at <= self._expiry_threshold())
+        )
+        stale = select(LLMCacheEntry.key).order_by(
+            LLMCacheEntry.last_hit_at.desc()
+        ).offset(self.max_entries)
+        await session.execute(delete(LLMCacheEntry).where(LLMCacheEntry.key.in_(stale)))
+
+    def _expiry_threshold(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+
+    def _remember(self, key: str, stored_at: float, model: str, prompt_version: str,
+                  result: Dict[str, Any]):
+        self._memory[key] = (stored_at, model, prompt_version, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
@@ -0,0 +1,199 @@
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+import openai
+
+from app.services.metrics import metrics_service
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+
+# Latency samples needed before hedging starts
+HEDGE_MIN_SAMPLES = 20
+
+
+class LLMUnavailableError(Exception):
+    """The inference endpoint is unhealthy: retries exhausted or circuit open"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Request rejected without calling the endpoint"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection errors, rate limiting and 5xx responses"""
+    if isinstance(error, (openai.APIConnectionError, httpx.TimeoutException, httpx.TransportError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _retry_after(error: Exception) -> float:
+    """Delay requested by the server in a Retry-After header (seconds)"""
+    response = getattr(error, 'response', None)
+    try:
+        return float(response.headers.get('retry-after', 0)) if response is not None else 0.0
+    except ValueError:
+        return 0.0
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    After `failure_threshold` failures in a row the circuit opens and requests
+    fail fast for `recovery_timeout` seconds; then a single trial request is
+    let through (half-open) and its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self):
+        """Raise CircuitOpenError if a request may not be sent now"""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                metrics_service.record_circuit_rejection()
+                raise CircuitOpenError("LLM endpoint circuit is open")
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._trial_in_flight:
+                metrics_service.record_circuit_rejection()
+                raise CircuitOpenError("LLM endpoint circuit is half-open, trial request in flight")
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self.failures = 0
+        self._trial_in_flight = False
+        if self.state != CLOSED:
+            logger.info("LLM endpoint recovered, circuit closed")
+            self._set_state(CLOSED)
+
+    def record_neutral(self):
+        """Outcome that says nothing about the endpoint: throttled, rejected or cancelled request"""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning(f"LLM endpoint failing ({self.failures} failures), circuit opened")
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def _set_state(self, state: str):
+        self.state = state
+        metrics_service.set_circuit_state(state)
+
+
+class LatencyTracker:
+    """Sliding window of successful request latencies"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def add(self, latency: float):
+        self.samples.append(latency)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class ResilientCaller:
+    """
+    Retries, hedging and circuit breaking around an LLM request
+
+    Retryable failures are retried up to `attempts` times with full-jitter
+    exponential backoff. With hedging enabled, a duplicate request is sent
+    when the first one is slower than the recent p95 latency and the faster
+    answer wins. Exhausted retries and an open circuit raise
+    LLMUnavailableError.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, attempts: int, base_delay: float,
+                 max_delay: float, hedge_enabled: bool = False, hedge_min_delay: float = 1.0):
+        self.breaker = breaker
+        self.attempts = max(attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay = hedge_min_delay
+        self.latencies = LatencyTracker()
+
+    async def call(self, request: Callable[[], Awaitable[T]], hedge: bool = True) -> T:
+        for attempt in range(self.attempts):
+            self.breaker.allow()
+            start = time.monotonic()
+            try:
+                result = await (self._send(request) if hedge else request())
+            except Exception as e:
+                if not is_retryable(e):
+                    # A bad request, not an unavailable endpoint
+                    self.breaker.record_neutral()
+                    raise
+                if isinstance(e, openai.RateLimitError):
+                    # Throttling is not a sign of an unhealthy endpoint
+                    self.breaker.record_neutral()
+                else:
+                    self.breaker.record_failure()
+                if attempt == self.attempts - 1:
+                    raise LLMUnavailableError(f"LLM request failed after {self.attempts} attempts: {e}") from e
+                delay = max(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)),
+                            _retry_after(e))
+                metrics_service.record_llm_retry(type(e).__name__)
+                logger.warning(f"LLM request failed ({e}), retry {attempt + 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled (hedge loser, client disconnect): a half-open trial must not stay in flight
+                self.breaker.record_neutral()
+                raise
+            self.breaker.record_success()
+            self.latencies.add(time.monotonic() - start)
+            return result
+
+    async def _send(self, request: Callable[[], Awaitable[T]]) -> T:
+        hedge_delay = self.latencies.percentile(0.95) if self.hedge_enabled else None
+        if hedge_delay is None:
+            return await request()
+
+        primary = asyncio.ensure_future(request())
+        done, _ = await asyncio.wait({primary}, timeout=max(hedge_delay, self.hedge_min_delay))
+        if done:
+            return primary.result()
+
+        hedge = asyncio.ensure_future(request())
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        metrics_service.record_llm_hedge('hedge' if task is hedge else 'primary')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,205 @@
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+import openai
+
+from app.services.llm_work_queue import (
+    PRIORITIES, FairWorkQueue, LLMJob, MemoryQueueBackend, WorkTicket
+)
+from app.services.metrics import metrics_service
+
+logger = logging.getLogger(__name__)
+
+# Weight of a new latency sample in the baseline latency
+BASELINE_SMOOTHING = 0.05
+
+
+def is_overload(error: Exception) -> bool:
+    """Rate limiting or a timeout: the endpoint is asked for more than it can serve"""
+    if isinstance(error, (openai.APITimeoutError, httpx.TimeoutException)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code == 429
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate` tokens per second
+
+    Waiters are served in FIFO order; a request larger than the capacity
+    waits for a full bucket.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float):
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit
+
+    Every success with latency within `tolerance` times the baseline latency
+    adds 1/limit, i.e. the limit grows by one per window of requests. A rate
+    limit response or a timeout halves the limit, at most once per baseline
+    latency so that one overload episode is counted once. Waiters are served
+    in the order of the fair work queue.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, tolerance: float,
+                 adaptive: bool = True, queue: Optional[FairWorkQueue] = None):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self.adaptive = adaptive
+        self.limit = float(max(minimum, min(initial if adaptive else maximum, maximum)))
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self._last_decrease = 0.0
+        self.queue = queue if queue is not None else FairWorkQueue(MemoryQueueBackend(), {})
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.queue)
+
+    async def acquire(self, ticket: WorkTicket):
+        await self.queue.assign(ticket)
+        if not len(self.queue) and self.in_flight < int(self.limit):
+            self.in_flight += 1
+        else:
+            ticket.future = asyncio.get_running_loop().create_future()
+            self.queue.push(ticket)
+            try:
+                await ticket.future
+            except asyncio.CancelledError:
+                if ticket.future.done() and not ticket.future.cancelled():
+                    # The slot was already granted to the cancelled call
+                    self.release()
+                else:
+                    self.queue.remove(ticket)
+                raise
+        try:
+            await self.queue.dispatched(ticket)
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def record_success(self, latency: float):
+        if not self.adaptive:
+            return
+        if self.baseline is None:
+            self.baseline = latency
+        if latency <= self.tolerance * self.baseline:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self.baseline += BASELINE_SMOOTHING * (latency - self.baseline)
+        self._wake()
+
+    def record_overload(self):
+        if not self.adaptive:
+            return
+        now = time.monotonic()
+        if now - self._last_decrease < (self.baseline or 1.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit / 2)
+        logger.warning(f"LLM endpoint overloaded, concurrency limit lowered to {int(self.limit)}")
+
+    def _wake(self):
+        while len(self.queue) and self.in_flight < int(self.limit):
+            ticket = self.queue.pop()
+            if not ticket.future.done():
+                self.in_flight += 1
+                ticket.future.set_result(None)
+
+
+class LLMScheduler:
+    """
+    Process-wide admission control for LLM requests
+
+    A request first takes a concurrency slot in fair queue order of its
+    analysis, priority class and severity, then one token from the request
+    bucket and its estimated prompt and completion tokens from the token
+    bucket, so requests leave at the provider's RPM/TPM quota instead of
+    bursting into rate limit errors.
+    """
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter,
+                 requests: Optional[TokenBucket] = None, tokens: Optional[TokenBucket] = None):
+        self.limiter = limiter
+        self.requests = requests
+        self.tokens = tokens
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int, job: Optional[LLMJob] = None, severity: float = 0.0):
+        """Admit one request; the body of the block sends it"""
+        ticket = WorkTicket.for_job(job, severity, estimated_tokens)
+        self.waiting += 1
+        self._update_metrics()
+        try:
+            await self.limiter.acquire(ticket)
+            try:
+                if self.requests is not None:
+                    await self.requests.acquire(1)
+                if self.tokens is not None:
+                    await self.tokens.acquire(estimated_tokens)
+            except BaseException:
+                self.limiter.release()
+                raise
+        finally:
+            self.waiting -= 1
+        self._update_metrics()
+
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_overload(e):
+                self.limiter.record_overload()
+            raise
+        else:
+            self.limiter.record_success(time.monotonic() - start)
+        finally:
+            self.limiter.release()
+            self._update_metrics()
+
+    def _update_metrics(self):
+        metrics_service.update_llm_scheduler(
+            limit=int(self.limiter.limit),
+            in_flight=self.limiter.in_flight,
+            queue_depth=self.waiting,
+            requests_available=self.requests.available if self.requests is not None else None,
+            tokens_available=self.tokens.available if self.tokens is not None else None,
+        )
+        metrics_service.update_llm_queue_depth({
+            priority: self.limiter.queue.depth(priority) for priority in PRIORITIES
+        })
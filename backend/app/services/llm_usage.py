@@ -0,0 +1,121 @@
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# Backend directory: relative paths to the price table are resolved against it
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+
+class ModelPrices:
+    """Estimated cost of prompt and completion tokens per model, per 1000 tokens"""
+
+    def __init__(self, default: Tuple[float, float] = (0.0, 0.0),
+                 models: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.default = default
+        self.models = models or {}
+
+    @classmethod
+    def from_yaml(cls, path: str) -> 'ModelPrices':
+        """Load the price table from a YAML file; on error every call costs nothing"""
+        prices_path = Path(path)
+        if not prices_path.is_absolute():
+            prices_path = BASE_DIR / prices_path
+
+        def price(entry: Dict[str, Any]) -> Tuple[float, float]:
+            return float(entry.get('prompt', 0.0)), float(entry.get('completion', 0.0))
+
+        try:
+            with open(prices_path, encoding='utf-8') as file:
+                config = yaml.safe_load(file) or {}
+            return cls(
+                price(config.get('default') or {}),
+                {model: price(entry or {}) for model, entry in (config.get('models') or {}).items()}
+            )
+        except Exception as e:
+            logger.error(f"Error loading LLM model prices from {prices_path}: {e}")
+            return cls()
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        prompt_price, completion_price = self.models.get(model, self.default)
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+@dataclass
+class ModelUsage:
+    """Requests of one analysis to one model"""
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    # Waiting for a scheduler slot and waiting for the endpoint
+    queue_seconds: float = 0.0
+    network_seconds: float = 0.0
+    streamed_calls: int = 0
+    first_token_seconds: float = 0.0
+    parse_failures: int = 0
+
+
+class LLMUsage:
+    """
+    Usage of the LLM by one analysis, summed per model
+
+    Every answered request is recorded, hedged duplicates and retries
+    included: they take endpoint capacity all the same.
+    """
+
+    def __init__(self):
+        self.models: Dict[str, ModelUsage] = {}
+
+    def _model(self, model: str) -> ModelUsage:
+        usage = self.models.get(model)
+        if usage is None:
+            usage = self.models[model] = ModelUsage()
+        return usage
+
+    def record_call(self, model: str, prompt_tokens: int, completion_tokens: int, cost: float,
+                    queue_seconds: float, network_seconds: float, first_token_seconds: Optional[float] = None):
+        usage = self._model(model)
+        usage.calls += 1
+        usage.prompt_tokens += prompt_tokens
+        usage.completion_tokens += completion_tokens
+        usage.cost += cost
+        usage.queue_seconds += queue_seconds
+        usage.network_seconds += network_seconds
+        if first_token_seconds is not None:
+            usage.streamed_calls += 1
+            usage.first_token_seconds += first_token_seconds
+
+    def record_parse_failure(self, model: str, items: int = 1):
+        self._model(model).parse_failures += items
+
+    def summary(self) -> Optional[Dict[str, Any]]:
+        """Totals and per-model usage for the analysis summary, None without requests"""
+        if not self.models:
+            return None
+
+        def totals(usages) -> Dict[str, Any]:
+            usages = list(usages)
+            calls = sum(usage.calls for usage in usages)
+            streamed = sum(usage.streamed_calls for usage in usages)
+            return {
+                "calls": calls,
+                "promptTokens": sum(usage.prompt_tokens for usage in usages),
+                "completionTokens": sum(usage.completion_tokens for usage in usages),
+                "estimatedCost": round(sum(usage.cost for usage in usages), 4),
+                "queueSeconds": round(sum(usage.queue_seconds for usage in usages), 3),
+                "networkSeconds": round(sum(usage.network_seconds for usage in usages), 3),
+                "meanTimeToFirstToken": round(
+                    sum(usage.first_token_seconds for usage in usages) / streamed, 3
+                ) if streamed else None,
+                "parseFailures": sum(usage.parse_failures for usage in usages),
+            }
+
+        return {
+            **totals(self.models.values()),
+            "models": {model: totals([usage]) for model, usage in self.models.items()},
+        }
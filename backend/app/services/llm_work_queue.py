@@ -0,0 +1,209 @@
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from app.services.llm_usage import LLMUsage
+from app.services.metrics import metrics_service
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+REANALYSIS = 'reanalysis'
+PRIORITIES = (INTERACTIVE, BATCH, REANALYSIS)
+
+# Requests made outside of an analysis share one flow
+DEFAULT_FLOW = 'default'
+
+# Accounting of an idle analysis is kept this long in the shared backend (seconds)
+FLOW_STATE_TTL = 3600
+
+
+@dataclass
+class LLMJob:
+    """Analysis on whose behalf LLM requests are made"""
+    analysis_id: str
+    priority: str = INTERACTIVE
+    # Tokens, cost and timings of the requests, for the analysis summary
+    usage: LLMUsage = field(default_factory=LLMUsage, repr=False, compare=False)
+
+
+@dataclass(eq=False)
+class WorkTicket:
+    """LLM request waiting for a concurrency slot"""
+    flow: str
+    priority: str
+    # Pre-scored severity of the change(s), higher goes first within the flow
+    severity: float
+    # Estimated tokens: requests are accounted by the work they cause
+    cost: float
+    start_tag: float = 0.0
+    enqueued_at: float = field(default_factory=time.monotonic)
+    future: Optional[asyncio.Future] = None
+
+    @classmethod
+    def for_job(cls, job: Optional[LLMJob], severity: float, cost: float) -> 'WorkTicket':
+        if job is None:
+            return cls(DEFAULT_FLOW, INTERACTIVE, severity, cost)
+        return cls(job.analysis_id, job.priority, severity, cost)
+
+
+class MemoryQueueBackend:
+    """Virtual time and per-analysis tags of a single process"""
+
+    def __init__(self):
+        self.virtual_time = 0.0
+        self.last_finish: Dict[str, float] = {}
+
+    async def start_tag(self, flow: str, cost: float, weight: float) -> float:
+        start = max(self.virtual_time, self.last_finish.get(flow, 0.0))
+        self.last_finish[flow] = start + cost / weight
+        return start
+
+    async def dispatched(self, start_tag: float):
+        if start_tag > self.virtual_time:
+            self.virtual_time = start_tag
+            # Flows behind the virtual time restart from it anyway
+            self.last_finish = {flow: tag for flow, tag in self.last_finish.items() if tag > start_tag}
+
+    async def aclose(self):
+        pass
+
+
+class RedisQueueBackend:
+    """
+    Virtual time and per-analysis tags shared by replicas through Redis
+
+    Every replica still dispatches only its own waiting requests, but tags
+    come from a common virtual clock, so the share of an analysis or a
+    priority class is kept across the deployment. When Redis is unreachable
+    the replica falls back to local accounting.
+    """
+
+    START_TAG_SCRIPT = """
+        local virtual_time = tonumber(redis.call('GET', KEYS[1]) or '0')
+        local last_finish = tonumber(redis.call('GET', KEYS[2]) or '0')
+        local start = math.max(virtual_time, last_finish)
+        redis.call('SET', KEYS[2], tostring(start + tonumber(ARGV[1])), 'EX', ARGV[2])
+        return tostring(start)
+    """
+
+    DISPATCHED_SCRIPT = """
+        local virtual_time = tonumber(redis.call('GET', KEYS[1]) or '0')
+        if tonumber(ARGV[1]) > virtual_time then
+            redis.call('SET', KEYS[1], ARGV[1])
+        end
+        return 0
+    """
+
+    def __init__(self, url: str, prefix: str = 'llm_queue'):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url)
+        self.prefix = prefix
+        self.fallback = MemoryQueueBackend()
+        self._start_tag = self.redis.register_script(self.START_TAG_SCRIPT)
+        self._dispatched = self.redis.register_script(self.DISPATCHED_SCRIPT)
+
+    async def start_tag(self, flow: str, cost: float, weight: float) -> float:
+        try:
+            return float(await self._start_tag(
+                keys=[f"{self.prefix}:virtual_time", f"{self.prefix}:flow:{flow}"],
+                args=[repr(cost / weight), FLOW_STATE_TTL]
+            ))
+        except Exception as e:
+            logger.warning(f"LLM queue backend unavailable, using local accounting: {e}")
+            return await self.fallback.start_tag(flow, cost, weight)
+
+    async def dispatched(self, start_tag: float):
+        try:
+            await self._dispatched(keys=[f"{self.prefix}:virtual_time"], args=[repr(start_tag)])
+        except Exception as e:
+            logger.warning(f"LLM queue backend unavailable, using local accounting: {e}")
+            await self.fallback.dispatched(start_tag)
+
+    async def aclose(self):
+        await self.redis.aclose()
+
+
+class FairWorkQueue:
+    """
+    Waiting LLM requests in weighted fair order
+
+    Start-time fair queuing over analyses: each request gets a start tag from
+    the backend's virtual clock, advanced by its cost divided by the weight
+    of the analysis' priority class, and the request with the smallest tag
+    goes next. A large analysis therefore cannot delay a small one submitted
+    later by more than one request per slot. Within an analysis the tags are
+    handed out by severity, so its most severe changes go first.
+    """
+
+    def __init__(self, backend, weights: Dict[str, float]):
+        self.backend = backend
+        self.weights = weights
+        # flow -> (heap of start tags, heap of (-severity, seq, ticket))
+        self._flows: Dict[str, tuple] = {}
+        self._seq = itertools.count()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def depth(self, priority: str) -> int:
+        return sum(
+            len(tickets) for tags, tickets in self._flows.values()
+            if tickets and tickets[0][2].priority == priority
+        )
+
+    async def assign(self, ticket: WorkTicket):
+        """Tag a new request"""
+        ticket.start_tag = await self.backend.start_tag(
+            ticket.flow, ticket.cost, self.weights.get(ticket.priority, 1.0)
+        )
+
+    async def dispatched(self, ticket: WorkTicket):
+        """Advance the virtual clock to a request that got its slot"""
+        metrics_service.record_llm_queue_wait(ticket.priority, time.monotonic() - ticket.enqueued_at)
+        await self.backend.dispatched(ticket.start_tag)
+
+    def push(self, ticket: WorkTicket):
+        tags, tickets = self._flows.setdefault(ticket.flow, ([], []))
+        heapq.heappush(tags, ticket.start_tag)
+        heapq.heappush(tickets, (-ticket.severity, next(self._seq), ticket))
+        self._size += 1
+
+    def pop(self) -> WorkTicket:
+        flow = min(self._flows, key=lambda name: self._flows[name][0][0])
+        tags, tickets = self._flows[flow]
+        tag = heapq.heappop(tags)
+        ticket = heapq.heappop(tickets)[2]
+        ticket.start_tag = tag
+        if not tickets:
+            del self._flows[flow]
+        self._size -= 1
+        return ticket
+
+    def remove(self, ticket: WorkTicket):
+        """Drop a cancelled request, giving up the latest tag of its flow"""
+        tags, tickets = self._flows.get(ticket.flow, ([], []))
+        if not any(entry[2] is ticket for entry in tickets):
+            # Already taken off the queue when slots were granted
+            return
+        tickets[:] = [entry for entry in tickets if entry[2] is not ticket]
+        heapq.heapify(tickets)
+        tags.remove(max(tags))
+        heapq.heapify(tags)
+        if not tickets:
+            del self._flows[ticket.flow]
+        self._size -= 1
+
+
+def make_backend(name: str, redis_url: str):
+    """Queue backend by name: memory (single process) or redis (shared by replicas)"""
+    if name == 'redis':
+        return RedisQueueBackend(redis_url)
+    return MemoryQueueBackend()
@@ -1,5 +1,5 @@
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, generate_latest
 from prometheus_client.core import REGISTRY
 import logging
@@ -42,6 +42,205 @@ llm_analysis_duration = Histogram(
     'LLM analysis duration in seconds'
 )
 
+llm_batch_items = Counter(
+    'llm_batch_items_total',
+    'Changes sent in batched LLM requests (status="reasked" - re-asked individually)',
+    ['status']
+)
+
+llm_batch_calls_saved = Counter(
+    'llm_batch_calls_saved_total',
+    'LLM calls saved by batching several changes into one request'
+)
+
+llm_batch_tokens_saved = Counter(
+    'llm_batch_prompt_tokens_saved_total',
+    'Estimated prompt tokens saved by sending shared instructions once per batch'
+)
+
+llm_cache_lookups = Counter(
+    'llm_cache_lookups_total',
+    'LLM response cache lookups',
+    ['result']
+)
+
+llm_semantic_cache_lookups = Counter(
+    'llm_semantic_cache_lookups_total',
+    'Near-duplicate lookups after an exact cache miss (skipped - change too short)',
+    ['result']
+)
+
+llm_retries = Counter(
+    'llm_retries_total',
+    'LLM requests retried after a transient failure',
+    ['error']
+)
+
+llm_hedged_requests = Counter(
+    'llm_hedged_requests_total',
+    'Hedged LLM requests by the request that answered first',
+    ['winner']
+)
+
+llm_circuit_state = Gauge(
+    'llm_circuit_state',
+    'LLM endpoint circuit breaker state (0 - closed, 1 - half-open, 2 - open)'
+)
+
+llm_circuit_rejections = Counter(
+    'llm_circuit_rejections_total',
+    'LLM requests rejected without calling the endpoint while the circuit is open'
+)
+
+llm_scheduler_concurrency_limit = Gauge(
+    'llm_scheduler_concurrency_limit',
+    'Current adaptive limit of concurrent LLM requests'
+)
+
+llm_scheduler_in_flight = Gauge(
+    'llm_scheduler_in_flight',
+    'LLM requests in flight'
+)
+
+llm_scheduler_queue_depth = Gauge(
+    'llm_scheduler_queue_depth',
+    'LLM requests waiting for a concurrency slot or rate limit tokens'
+)
+
+llm_scheduler_bucket_tokens = Gauge(
+    'llm_scheduler_bucket_tokens',
+    'Tokens available in the LLM rate limit buckets',
+    ['bucket']
+)
+
+llm_prompt_tokens = Histogram(
+    'llm_prompt_tokens',
+    'Estimated prompt tokens per LLM request',
+    ['kind'],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+)
+
+llm_prompt_tokens_trimmed = Counter(
+    'llm_prompt_tokens_trimmed_total',
+    'Estimated prompt tokens left out by clause trimming and regulation packing',
+    ['part']
+)
+
+llm_stream_fields = Histogram(
+    'llm_stream_fields_seconds',
+    'Time until the comment, services and severity of a streamed LLM analysis are complete',
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+)
+
+llm_stream_stops = Counter(
+    'llm_stream_early_stops_total',
+    'Streamed LLM completions stopped before the end of generation',
+    ['reason']
+)
+
+llm_model_requests = Histogram(
+    'llm_model_request_duration_seconds',
+    'Duration of LLM requests per model, from the granted slot to the parsed response',
+    ['model'],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+)
+
+llm_model_tokens = Counter(
+    'llm_model_tokens_total',
+    'LLM tokens per model (reported usage, otherwise estimated)',
+    ['model', 'kind']
+)
+
+llm_model_routed = Counter(
+    'llm_model_routed_total',
+    'Changes routed to a model tier for LLM analysis',
+    ['model']
+)
+
+llm_model_escalations = Counter(
+    'llm_model_escalations_total',
+    'Changes asked again on a larger model after a low-confidence or failed answer',
+    ['from_model', 'to_model']
+)
+
+llm_model_cost = Counter(
+    'llm_model_cost_total',
+    'Estimated cost of LLM requests per model',
+    ['model']
+)
+
+llm_model_queue_wait = Histogram(
+    'llm_model_queue_wait_seconds',
+    'Time LLM requests wait for a scheduler slot per model',
+    ['model'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+
+llm_model_first_token = Histogram(
+    'llm_model_time_to_first_token_seconds',
+    'Time to the first token of streamed LLM completions per model',
+    ['model'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+)
+
+llm_model_parse_failures = Counter(
+    'llm_model_parse_failures_total',
+    'LLM answers without the required fields (single) and missing or malformed batch items',
+    ['model', 'format']
+)
+
+llm_queue_wait = Histogram(
+    'llm_queue_wait_seconds',
+    'Time LLM requests waited in the fair work queue',
+    ['priority'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+
+llm_queue_depth = Gauge(
+    'llm_queue_depth',
+    'LLM requests waiting in the fair work queue',
+    ['priority']
+)
+
+triage_changes = Counter(
+    'triage_changes_total',
+    'Changes resolved by triage rules without LLM (rule="none" - sent to LLM)',
+    ['rule']
+)
+
+change_clusters = Counter(
+    'change_clusters_total',
+    'Groups of repeated changes analyzed once by the LLM'
+)
+
+changes_clustered = Counter(
+    'changes_clustered_total',
+    'Changes that reused the LLM analysis of a repeated change of their cluster'
+)
+
+regulation_index_documents = Gauge(
+    'regulation_index_documents',
+    'Active regulations in the in-memory search index'
+)
+
+regulation_index_refreshes = Counter(
+    'regulation_index_refreshes_total',
+    'Rebuilds and incremental updates of the regulation search index',
+    ['kind']
+)
+
+regulation_chunks_written = Counter(
+    'regulation_chunks_written_total',
+    'Regulation passages written to regulation_chunks',
+    ['kind']
+)
+
+regulation_search_duration = Histogram(
+    'regulation_search_duration_seconds',
+    'Duration of regulation searches, excerpts included',
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 0.25)
+)
+
 database_connection_pool = Gauge(
     'database_connection_pool_size',
     'Database connection pool size',
@@ -100,6 +299,122 @@ class MetricsService:
         llm_analysis_count.labels(status=status).inc()
         llm_analysis_duration.observe(duration)
         
+    def record_llm_batch(self, items: int, reasked: int, calls_saved: int, tokens_saved: int):
+        """Записать метрики пакетного LLM анализа"""
+        llm_batch_items.labels(status='answered').inc(items - reasked)
+        llm_batch_items.labels(status='reasked').inc(reasked)
+        # Счетчики не уменьшаются: пакет, в котором почти все элементы
+        # запрошены повторно, экономии не дает
+        llm_batch_calls_saved.inc(max(calls_saved, 0))
+        llm_batch_tokens_saved.inc(max(tokens_saved, 0))
+        
+    def record_llm_cache(self, result: str):
+        """Записать результат поиска в кэше ответов LLM (memory_hit, db_hit, miss)"""
+        llm_cache_lookups.labels(result=result).inc()
+        
+    def record_semantic_cache(self, result: str):
+        """Записать результат поиска похожего изменения (hit, miss, evicted, skipped)"""
+        llm_semantic_cache_lookups.labels(result=result).inc()
+        
+    def record_llm_retry(self, error: str):
+        """Записать повтор запроса к LLM"""
+        llm_retries.labels(error=error).inc()
+        
+    def record_llm_hedge(self, winner: str):
+        """Записать результат дублирующего запроса к LLM (primary, hedge)"""
+        llm_hedged_requests.labels(winner=winner).inc()
+        
+    def set_circuit_state(self, state: str):
+        """Обновить состояние автоматического выключателя LLM"""
+        llm_circuit_state.set({'closed': 0, 'half_open': 1, 'open': 2}.get(state, 0))
+        
+    def record_circuit_rejection(self):
+        """Записать запрос, отклоненный без обращения к LLM"""
+        llm_circuit_rejections.inc()
+        
+    def update_llm_scheduler(self, limit: int, in_flight: int, queue_depth: int,
+                             requests_available=None, tokens_available=None):
+        """Обновить метрики планировщика запросов к LLM"""
+        llm_scheduler_concurrency_limit.set(limit)
+        llm_scheduler_in_flight.set(in_flight)
+        llm_scheduler_queue_depth.set(queue_depth)
+        if requests_available is not None:
+            llm_scheduler_bucket_tokens.labels(bucket='requests').set(requests_available)
+        if tokens_available is not None:
+            llm_scheduler_bucket_tokens.labels(bucket='tokens').set(tokens_available)
+        
+    def record_llm_prompt(self, kind: str, tokens: int):
+        """Записать размер промпта запроса к LLM (single, batch)"""
+        llm_prompt_tokens.labels(kind=kind).observe(tokens)
+        
+    def record_llm_prompt_trimmed(self, part: str, tokens: int):
+        """Записать токены, не отправленные в LLM (clause, regulations)"""
+        if tokens > 0:
+            llm_prompt_tokens_trimmed.labels(part=part).inc(tokens)
+        
+    def record_llm_stream_fields(self, seconds: float):
+        """Записать время до получения основных полей потокового ответа LLM"""
+        llm_stream_fields.observe(seconds)
+        
+    def record_llm_stream_stop(self, reason: str):
+        """Записать досрочную остановку генерации (fields_complete, reasoning_cap)"""
+        llm_stream_stops.labels(reason=reason).inc()
+        
+    def record_llm_model_call(self, model: str, seconds: float, prompt_tokens: int, completion_tokens: int,
+                              queue_seconds: float = 0.0, cost: float = 0.0,
+                              first_token_seconds: Optional[float] = None):
+        """Записать длительность, ожидание в очереди, токены и стоимость запроса к модели"""
+        llm_model_requests.labels(model=model).observe(seconds)
+        llm_model_queue_wait.labels(model=model).observe(queue_seconds)
+        llm_model_tokens.labels(model=model, kind='prompt').inc(prompt_tokens)
+        llm_model_tokens.labels(model=model, kind='completion').inc(completion_tokens)
+        llm_model_cost.labels(model=model).inc(cost)
+        if first_token_seconds is not None:
+            llm_model_first_token.labels(model=model).observe(first_token_seconds)
+        
+    def record_llm_parse_failure(self, model: str, response_format: str, items: int = 1):
+        """Записать ответы модели, которые не удалось разобрать (single, batch)"""
+        llm_model_parse_failures.labels(model=model, format=response_format).inc(items)
+        
+    def record_llm_route(self, model: str, changes: int = 1):
+        """Записать изменения, направленные модели"""
+        llm_model_routed.labels(model=model).inc(changes)
+        
+    def record_llm_escalation(self, from_model: str, to_model: str, changes: int = 1):
+        """Записать повторный анализ изменений более крупной моделью"""
+        llm_model_escalations.labels(from_model=from_model, to_model=to_model).inc(changes)
+        
+    def record_llm_queue_wait(self, priority: str, seconds: float):
+        """Записать время ожидания запроса к LLM в очереди"""
+        llm_queue_wait.labels(priority=priority).observe(seconds)
+        
+    def update_llm_queue_depth(self, depths: dict):
+        """Обновить число ожидающих запросов к LLM по классам приоритета"""
+        for priority, depth in depths.items():
+            llm_queue_depth.labels(priority=priority).set(depth)
+        
+    def record_triage(self, rule: str):
+        """Записать результат предварительной обработки изменения"""
+        triage_changes.labels(rule=rule).inc()
+        
+    def record_change_clusters(self, clusters: int, reused: int):
+        """Записать группы повторяющихся изменений и изменения без отдельного анализа"""
+        change_clusters.inc(clusters)
+        changes_clustered.inc(reused)
+        
+    def record_regulation_index(self, kind: str, documents: int):
+        """Записать перестроение (full) или обновление (incremental) индекса нормативных документов"""
+        regulation_index_refreshes.labels(kind=kind).inc()
+        regulation_index_documents.set(documents)
+        
+    def record_regulation_chunks(self, kind: str, chunks: int):
+        """Записать отрывки нормативных документов, записанные при синхронизации (full) или обновлении (incremental)"""
+        regulation_chunks_written.labels(kind=kind).inc(chunks)
+        
+    def record_regulation_search(self, seconds: float):
+        """Записать длительность поиска нормативных документов"""
+        regulation_search_duration.observe(seconds)
+        
     def update_db_pool_size(self, active: int, idle: int):
         """Обновить метрики пула соединений БД"""
         database_connection_pool.labels(state='active').set(active)
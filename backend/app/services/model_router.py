@@ -0,0 +1,137 @@
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+
+from app.services.prompt_compiler import changed_chars, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Backend directory: relative paths to the model table are resolved against it
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+
+class ModelTier:
+    """Model of the routing table and the conditions of changes it takes"""
+
+    CONDITIONS = (
+        'change_types', 'max_changed_chars', 'max_clause_tokens',
+        'max_severity_score', 'max_fact_deltas',
+    )
+
+    def __init__(self, name: str, model: str, when: Optional[Dict[str, Any]] = None,
+                 escalate_below: float = 0.0):
+        self.name = name
+        self.model = model
+        # Answers with a lower confidence are asked again on the next tier
+        self.escalate_below = escalate_below
+        self.predicates = self._compile(when or {})
+
+    def _compile(self, when: Dict[str, Any]) -> List[Callable[[Any], bool]]:
+        unknown = set(when) - set(self.CONDITIONS)
+        if unknown:
+            raise ValueError(f"Model tier {self.name}: unknown conditions {sorted(unknown)}")
+
+        # Cheap checks go first: fact deltas are computed on access
+        predicates = []
+        if 'change_types' in when:
+            change_types = frozenset(when['change_types'])
+            predicates.append(lambda change: change.change_type in change_types)
+        if 'max_severity_score' in when:
+            max_severity_score = float(when['max_severity_score'])
+            predicates.append(lambda change: (change.severity_score or 0.0) <= max_severity_score)
+        if 'max_changed_chars' in when:
+            max_changed_chars = int(when['max_changed_chars'])
+            predicates.append(lambda change: changed_chars(change) <= max_changed_chars)
+        if 'max_clause_tokens' in when:
+            max_clause_tokens = int(when['max_clause_tokens'])
+            predicates.append(lambda change: estimate_tokens(
+                max(change.original_text or '', change.modified_text or '', key=len)
+            ) <= max_clause_tokens)
+        if 'max_fact_deltas' in when:
+            max_fact_deltas = int(when['max_fact_deltas'])
+            predicates.append(lambda change: len(change.fact_deltas) <= max_fact_deltas)
+        return predicates
+
+    def matches(self, change) -> bool:
+        return all(predicate(change) for predicate in self.predicates)
+
+    def __repr__(self) -> str:
+        return f"ModelTier({self.name!r}, {self.model!r})"
+
+
+class ModelRouter:
+    """
+    Routes changes between models of increasing size
+
+    Tiers are checked in order and the first matching one answers the
+    change; the last tier takes everything. An answer of a tier with a
+    confidence below its escalate_below threshold, or a failed one, is
+    asked again on the next tier.
+    """
+
+    def __init__(self, tiers: List[ModelTier]):
+        self.tiers = tiers
+
+    @classmethod
+    def single(cls, model: str) -> 'ModelRouter':
+        """Every change goes to one model"""
+        return cls([ModelTier('default', model)])
+
+    @classmethod
+    def from_dicts(cls, tiers: List[Dict[str, Any]], default_model: str) -> 'ModelRouter':
+        """Build the router from tier definitions; a tier without a model uses the default one"""
+        router = cls([
+            ModelTier(
+                name=tier['name'],
+                model=tier.get('model') or default_model,
+                when=tier.get('when'),
+                escalate_below=float(tier.get('escalate_below', 0.0)),
+            )
+            for tier in tiers
+        ])
+        if not router.tiers or router.tiers[-1].predicates:
+            # Changes matching no tier are analyzed by the default model
+            router.tiers.append(ModelTier('default', default_model))
+        return router
+
+    @classmethod
+    def from_yaml(cls, path: str, default_model: str) -> 'ModelRouter':
+        """Load the tier table from a YAML file; on error every change goes to the default model"""
+        tiers_path = Path(path)
+        if not tiers_path.is_absolute():
+            tiers_path = BASE_DIR / tiers_path
+        try:
+            with open(tiers_path, encoding='utf-8') as file:
+                config = yaml.safe_load(file) or {}
+            router = cls.from_dicts(config.get('tiers') or [], default_model)
+            logger.info(f"Loaded LLM model tiers from {tiers_path}: "
+                        + ", ".join(f"{tier.name}={tier.model}" for tier in router.tiers))
+            return router
+        except Exception as e:
+            logger.error(f"Error loading LLM model tiers from {tiers_path}: {e}")
+            return cls.single(default_model)
+
+    @property
+    def signature(self) -> str:
+        """Models of the table in routing order, part of the cache scope"""
+        return ">".join(tier.model for tier in self.tiers)
+
+    def route(self, change) -> ModelTier:
+        """First tier whose conditions the change meets"""
+        for tier in self.tiers[:-1]:
+            try:
+                if tier.matches(change):
+                    return tier
+            except Exception as e:
+                logger.debug(f"Model tier {tier.name} skipped for a change: {e}")
+        return self.tiers[-1]
+
+    def escalate(self, tier: ModelTier, result) -> Optional[ModelTier]:
+        """Next tier to ask if the answer is not good enough, None to keep it"""
+        if tier is self.tiers[-1] or result.pending_reanalysis or result.partial:
+            return None
+        if result.failed or result.confidence < tier.escalate_below:
+            return self.tiers[self.tiers.index(tier) + 1]
+        return None
@@ -0,0 +1,144 @@
+import re
+import math
+import textwrap
+from typing import Dict, List, Sequence, Tuple
+
+# Rough BPE lengths of Qwen/GPT-style tokenizers on contract text: Cyrillic
+# words split into pieces of about 3 characters, Latin ones of about 4, every
+# digit is a token of its own and so is each punctuation mark; a single space
+# merges into the next word, a run of line breaks is a token and so is the
+# indentation after it
+_TOKEN_PATTERN = re.compile(r'([^\W\d_]+)|\d|[\r\n]+|[^\S\r\n]{2,}|\S')
+_CYRILLIC = re.compile(r'[а-яё]', re.IGNORECASE)
+CYRILLIC_CHARS_PER_TOKEN = 3.0
+LATIN_CHARS_PER_TOKEN = 4.0
+
+_BLANK_LINES = re.compile(r'\n{3,}')
+_WHITESPACE = re.compile(r'\s+')
+
+ELLIPSIS = '…'
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of tokens in a text without running a tokenizer"""
+    tokens = 1
+    for word in _TOKEN_PATTERN.findall(text):
+        if word:
+            chars_per_token = CYRILLIC_CHARS_PER_TOKEN if _CYRILLIC.match(word) else LATIN_CHARS_PER_TOKEN
+            tokens += math.ceil(len(word) / chars_per_token)
+        else:
+            tokens += 1
+    return tokens
+
+
+def changed_chars(change) -> int:
+    """
+    Total length of the highlighted spans of a change; without spans (not yet
+    computed, e.g. lazy_detail) the whole original and modified texts count
+    """
+    spans = [*(change.original_spans or ()), *(change.modified_spans or ())]
+    if not spans:
+        return len(change.original_text or '') + len(change.modified_text or '')
+    return sum(end - start for start, end, *_ in spans)
+
+
+def compile_template(template: str) -> str:
+    """
+    Strip source indentation, trailing spaces and extra blank lines of a
+    prompt template; placeholders are filled in later with str.format
+    """
+    lines = [line.rstrip() for line in textwrap.dedent(template).strip().splitlines()]
+    return _BLANK_LINES.sub('\n\n', '\n'.join(lines))
+
+
+def compile_list(text: str) -> str:
+    """One item per line without indentation"""
+    return '\n'.join(line.strip() for line in text.strip().splitlines() if line.strip())
+
+
+def _regions(spans: Sequence[Tuple], text: str, other: str) -> List[Tuple[int, int]]:
+    """Changed character ranges: highlight spans, or the part between the common prefix and suffix"""
+    if spans:
+        return sorted((start, end) for start, end, *_ in spans)
+    prefix = 0
+    limit = min(len(text), len(other))
+    while prefix < limit and text[prefix] == other[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and text[-1 - suffix] == other[-1 - suffix]:
+        suffix += 1
+    return [(prefix, len(text) - suffix)]
+
+
+def _word_boundary(text: str, position: int, backward: bool) -> int:
+    """Nearest whitespace outwards from a position"""
+    if backward:
+        found = text.rfind(' ', 0, position)
+        return found + 1 if found >= 0 else 0
+    found = text.find(' ', position)
+    return found if found >= 0 else len(text)
+
+
+def trim_clause(text: str, spans: Sequence[Tuple], other: str, max_tokens: int, window: int) -> str:
+    """
+    Shorten a long clause to its changed regions with `window` characters of
+    context on each side; cut parts are replaced with an ellipsis
+
+    Args:
+        text: Clause text
+        spans: Highlight spans (start, end, kind) of the changes in the text
+        other: The other version of the clause, used when there are no spans
+        max_tokens: Clauses estimated at no more tokens are sent as they are
+        window: Context characters kept around each changed region
+    """
+    if not text or estimate_tokens(text) <= max_tokens:
+        return text
+    windows = []
+    for start, end in _regions(spans, text, other):
+        start = _word_boundary(text, max(start - window, 0), backward=True)
+        end = _word_boundary(text, min(end + window, len(text)), backward=False)
+        if windows and start <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+    parts = [text[start:end].strip() for start, end in windows]
+    trimmed = f" {ELLIPSIS} ".join(part for part in parts if part)
+    if windows[0][0] > 0:
+        trimmed = f"{ELLIPSIS} {trimmed}"
+    if windows[-1][1] < len(text):
+        trimmed = f"{trimmed} {ELLIPSIS}"
+    return trimmed
+
+
+def pack_regulations(regulations: List[Dict], budget: int, snippet_chars: int) -> Tuple[List[str], int]:
+    """
+    Deduplicated regulation snippets, most relevant first, within a token budget
+
+    Regulations are ordered by their 'relevance' score when the matcher gives
+    one, then by how many changes they were found for, then by the order they
+    came in. Returns the snippet lines and the estimated tokens left out.
+    """
+    unique = {}
+    for order, reg in enumerate(regulations):
+        content = _WHITESPACE.sub(' ', reg.get('content') or '').strip()
+        key = (reg.get('title'), content[:snippet_chars])
+        if key in unique:
+            unique[key][1] += 1
+        else:
+            unique[key] = [reg, 1, order, content]
+    ranked = sorted(
+        unique.values(),
+        key=lambda entry: (-float(entry[0].get('relevance') or 0.0), -entry[1], entry[2])
+    )
+
+    lines, used, left_out = [], 0, 0
+    for reg, _, _, content in ranked:
+        snippet = content[:snippet_chars].rstrip(' .')
+        line = f"- {reg.get('title') or 'Без названия'}: {snippet}..."
+        tokens = estimate_tokens(line)
+        if lines and used + tokens > budget:
+            left_out += tokens
+            continue
+        lines.append(line)
+        used += tokens
+    return lines, left_out
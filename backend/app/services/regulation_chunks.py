@@ -0,0 +1,167 @@
+import uuid
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Text, cast, delete, exists, func, insert, literal_column, or_, select, update
+from sqlalchemy.dialects.postgresql import TSQUERY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+
+from app.models.regulation import Regulation
+from app.models.regulation_chunk import RegulationChunk
+from app.services.sentence_segmenter import sentence_segmenter
+
+logger = logging.getLogger(__name__)
+
+# Regulations re-chunked per transaction when catching up on startup
+SYNC_BATCH_SIZE = 100
+
+# Full-text search configuration (the same as regulations.search_vector)
+SEARCH_CONFIG = literal_column("'russian'::regconfig")
+
+
+def chunk_text(text: str, size: int) -> List[Tuple[int, str]]:
+    """
+    Split a text into passages of whole sentences of at most size characters
+
+    Returns (character offset, passage) pairs. A sentence longer than size
+    is cut at the last space before the limit.
+    """
+    chunks = []
+    start = end = None
+    for sentence_start, sentence_end in sentence_segmenter.iter_spans(text):
+        if start is not None and sentence_end - start > size:
+            chunks.append((start, text[start:end]))
+            start = None
+        if start is None:
+            start = sentence_start
+        # A long sentence is cut at spaces
+        while sentence_end - start > size:
+            cut = text.rfind(' ', start + 1, start + size)
+            cut = cut if cut > start else start + size
+            chunks.append((start, text[start:cut]))
+            start = cut
+            while start < sentence_end and text[start].isspace():
+                start += 1
+        end = sentence_end
+    if start is not None and end > start:
+        chunks.append((start, text[start:end]))
+    return chunks
+
+
+class RegulationChunkStore:
+    """
+    Regulation passages in the regulation_chunks table
+
+    Regulations are cut into passages when they are added or changed;
+    each passage has a tsvector of the regulation title and the passage
+    text and a trigram index on the text. A search returns the best
+    passage of each matching regulation in one query, so the LLM context
+    gets the relevant part of a long regulation rather than its preamble.
+    """
+
+    def __init__(self, chunk_size: int = 1000):
+        self.chunk_size = chunk_size
+
+    async def sync(self, db: AsyncSession, regulation_ids: Optional[Iterable[str]] = None) -> int:
+        """
+        Re-chunk the given regulations, or every active regulation whose
+        passages are missing or outdated; returns the passages written
+        """
+        if regulation_ids is not None:
+            return await self._rechunk(db, [uuid.UUID(str(value)) for value in regulation_ids])
+
+        outdated = select(Regulation.id).where(
+            Regulation.active == True,
+            ~exists().where(
+                RegulationChunk.regulation_id == Regulation.id,
+                RegulationChunk.chunk_size == self.chunk_size,
+                RegulationChunk.created_at >= func.coalesce(Regulation.updated_at, Regulation.created_at),
+            ),
+        )
+        ids = list((await db.execute(outdated)).scalars().all())
+        written = 0
+        for k in range(0, len(ids), SYNC_BATCH_SIZE):
+            written += await self._rechunk(db, ids[k:k + SYNC_BATCH_SIZE])
+        if ids:
+            logger.info(f"Regulation passages rebuilt: {len(ids)} regulations, {written} passages")
+        return written
+
+    async def search(self, db: AsyncSession, text: str, limit: int = 5) -> List[Dict]:
+        """Best passage of each regulation matching a text, most relevant first"""
+        # Any word of the change, not all of them as in plainto_tsquery
+        terms = cast(
+            func.replace(cast(func.plainto_tsquery(SEARCH_CONFIG, text), Text), ' & ', ' | '), TSQUERY
+        )
+        relevance = (
+            func.ts_rank_cd(RegulationChunk.search_vector, terms)
+            + func.word_similarity(text, RegulationChunk.content)
+        ).label('relevance')
+        best = (
+            select(RegulationChunk.regulation_id, RegulationChunk.content, relevance)
+            .join(Regulation, Regulation.id == RegulationChunk.regulation_id)
+            .where(
+                Regulation.active == True,
+                or_(
+                    RegulationChunk.search_vector.op('@@')(terms),
+                    # Passage similar to the change (gin_trgm_ops index)
+                    RegulationChunk.content.op('%>')(text),
+                ),
+            )
+            .distinct(RegulationChunk.regulation_id)
+            .order_by(RegulationChunk.regulation_id, relevance.desc())
+            .subquery()
+        )
+        query = (
+            select(Regulation, best.c.content, best.c.relevance)
+            .join(best, Regulation.id == best.c.regulation_id)
+            .options(load_only(Regulation.id, Regulation.title, Regulation.category))
+            .order_by(best.c.relevance.desc())
+            .limit(limit)
+        )
+        result = await db.execute(query)
+        return [
+            {
+                'id': str(reg.id),
+                'title': reg.title,
+                'content': content,
+                'category': reg.category,
+                'services': reg.get_services(),
+                'relevance': round(float(score), 4),
+            }
+            for reg, content, score in result.all()
+        ]
+
+    async def _rechunk(self, db: AsyncSession, ids: List[uuid.UUID]) -> int:
+        if not ids:
+            return 0
+        # Regulation rows are locked: several backend instances get the same
+        # notification and rebuild the passages one after another
+        result = await db.execute(
+            select(Regulation).where(Regulation.id.in_(ids)).order_by(Regulation.id).with_for_update()
+        )
+        regulations = result.scalars().all()
+        await db.execute(delete(RegulationChunk).where(RegulationChunk.regulation_id.in_(ids)))
+        rows = [
+            {
+                'regulation_id': reg.id,
+                'position': position,
+                'start_offset': offset,
+                'content': passage,
+                'chunk_size': self.chunk_size,
+            }
+            for reg in regulations if reg.active
+            for position, (offset, passage) in enumerate(chunk_text(reg.content or '', self.chunk_size))
+        ]
+        if rows:
+            await db.execute(insert(RegulationChunk), rows)
+            await db.execute(
+                update(RegulationChunk)
+                .where(RegulationChunk.regulation_id == Regulation.id, RegulationChunk.regulation_id.in_(ids))
+                .values(search_vector=func.setweight(
+                    func.to_tsvector(SEARCH_CONFIG, func.coalesce(Regulation.title, '')), 'A'
+                ).op('||')(func.setweight(func.to_tsvector(SEARCH_CONFIG, RegulationChunk.content), 'B')))
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+        return len(rows)
@@ -0,0 +1,300 @@
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.services.russian_stemmer import iter_terms, terms
+
+# BM25 saturation and length normalization
+K1 = 1.2
+B_TITLE = 0.5
+B_CONTENT = 0.75
+
+# Collection statistics are recomputed for every posting once the number of
+# documents or their average length drifts this far from the last full build;
+# smaller changes only recompute the postings of the changed terms
+REBUILD_DRIFT = 0.1
+
+# Terms found in this share of the documents keep a dense score array:
+# adding it is cheaper than indexing by thousands of slots
+DENSE_SHARE = 0.25
+
+EMPTY_SLOTS = np.empty(0, dtype=np.int64)
+EMPTY_WEIGHTS = np.empty(0, dtype=np.float32)
+
+
+@dataclass
+class IndexedRegulation:
+    """Regulation fields returned by the index and its indexed terms"""
+    id: str
+    title: str
+    content: str
+    category: str
+    services: List[str]
+    # Term -> (occurrences in the title, character offsets in the content)
+    terms: Dict[str, Tuple[int, List[int]]]
+    title_length: int
+    content_length: int
+
+
+class RegulationIndex:
+    """
+    In-memory BM25F index over regulation titles and content
+
+    Titles and content are separate fields; title matches are weighted
+    title_weight times content matches. Each term keeps arrays of document
+    slots and their score for the term, so a query only adds up the arrays
+    of its terms. Regulations are added, replaced and removed one at a time:
+    only the postings of the changed regulation are computed, with the
+    length statistics of the last full build, and the idf of its terms is
+    updated on the next query.
+    """
+
+    def __init__(self, title_weight: float = 3.0):
+        self.title_weight = title_weight
+        self._slots: Dict[str, int] = {}
+        self._docs: List[Optional[IndexedRegulation]] = []
+        self._free: List[int] = []
+        # Term -> (document slots, BM25F term frequency saturation without idf)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # Term -> (slots, idf * saturation) used by queries; slots are None for dense scores
+        self._impacts: Dict[str, Tuple[Optional[np.ndarray], np.ndarray]] = {}
+        # Changes of postings since the last query
+        self._added: Dict[str, List[Tuple[int, float]]] = {}
+        self._removed: Dict[str, Set[int]] = {}
+        # Statistics the scores were computed with: documents, average title and content length
+        self._stats = (0, 0.0, 0.0)
+        self._title_total = 0
+        self._content_total = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @classmethod
+    def build(cls, regulations: Iterable[Dict], title_weight: float = 3.0) -> 'RegulationIndex':
+        """Index a set of regulations at once"""
+        index = cls(title_weight)
+        for regulation in regulations:
+            index._add(regulation, postings=False)
+        index._rebuild()
+        return index
+
+    def upsert(self, regulation: Dict):
+        """Add a regulation or replace its previous version"""
+        self.remove(str(regulation["id"]))
+        self._add(regulation)
+
+    def remove(self, regulation_id: str):
+        slot = self._slots.pop(str(regulation_id), None)
+        if slot is None:
+            return
+        doc = self._docs[slot]
+        for term in doc.terms:
+            # Removals are applied before additions: a slot may have been reused
+            self._removed.setdefault(term, set()).add(slot)
+            added = self._added.get(term)
+            if added:
+                self._added[term] = [item for item in added if item[0] != slot]
+        self._title_total -= doc.title_length
+        self._content_total -= doc.content_length
+        self._docs[slot] = None
+        self._free.append(slot)
+
+    def search(self, text: str, limit: int = 5) -> List[Tuple[IndexedRegulation, float]]:
+        """Regulations best matching a text with their BM25 scores, best first"""
+        query = set(terms(text))
+        if not query or not self._slots:
+            return []
+        self._refresh()
+
+        scores = np.zeros(len(self._docs), dtype=np.float32)
+        matched = False
+        for term in query:
+            impact = self._impacts.get(term)
+            if impact is None:
+                continue
+            slots, weights = impact
+            if slots is None:
+                scores[:len(weights)] += weights
+            else:
+                # Slots of one term are unique: plain addition without np.add.at
+                scores[slots] += weights
+            matched = True
+        if not matched:
+            return []
+
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self._docs[slot], float(scores[slot])) for slot in top if scores[slot] > 0]
+
+    def excerpt(self, doc: IndexedRegulation, text: str, max_length: int = 200) -> str:
+        """Part of the content with the most query terms within max_length characters"""
+        content = doc.content
+        if len(content) <= max_length:
+            return content
+        query = set(terms(text))
+        hits = sorted(offset for term in query if term in doc.terms for offset in doc.terms[term][1])
+        if not hits:
+            return content[:max_length] + '...'
+
+        # Window with the most matches, starting at a match
+        best_start, best_count, right = hits[0], 0, 0
+        for left, start in enumerate(hits):
+            while right < len(hits) and hits[right] < start + max_length:
+                right += 1
+            if right - left > best_count:
+                best_start, best_count = start, right - left
+        # A quarter of the excerpt before the first match, bounds at spaces
+        start = max(0, min(best_start - max_length // 4, len(content) - max_length))
+        if start > 0:
+            space = content.find(' ', start, best_start)
+            start = space + 1 if space >= 0 else start
+        end = min(len(content), start + max_length)
+        if end < len(content):
+            space = content.rfind(' ', start, end)
+            end = space if space > start else end
+
+        excerpt = content[start:end]
+        if start > 0:
+            excerpt = '...' + excerpt
+        if end < len(content):
+            excerpt = excerpt + '...'
+        return excerpt
+
+    def _add(self, regulation: Dict, postings: bool = True):
+        title = regulation.get('title') or ''
+        content = regulation.get('content') or ''
+        doc_terms: Dict[str, Tuple[int, List[int]]] = {}
+        title_length = content_length = 0
+        for _, term in iter_terms(title):
+            title_count, offsets = doc_terms.get(term, (0, []))
+            doc_terms[term] = (title_count + 1, offsets)
+            title_length += 1
+        for offset, term in iter_terms(content):
+            title_count, offsets = doc_terms.get(term, (0, []))
+            offsets.append(offset)
+            doc_terms[term] = (title_count, offsets)
+            content_length += 1
+
+        doc = IndexedRegulation(
+            id=str(regulation['id']),
+            title=title,
+            content=content,
+            category=regulation.get('category') or '',
+            services=list(regulation.get('services') or []),
+            terms=doc_terms,
+            title_length=title_length,
+            content_length=content_length,
+        )
+        slot = self._free.pop() if self._free else len(self._docs)
+        if slot == len(self._docs):
+            self._docs.append(doc)
+        else:
+            self._docs[slot] = doc
+        self._slots[doc.id] = slot
+        for term, (title_count, offsets) in doc_terms.items() if postings else ():
+            saturation = self._saturation(title_count, len(offsets), title_length, content_length)
+            self._added.setdefault(term, []).append((slot, saturation))
+        self._title_total += title_length
+        self._content_total += content_length
+
+    def _current_stats(self) -> Tuple[int, float, float]:
+        documents = len(self._slots)
+        if not documents:
+            return 0, 0.0, 0.0
+        return documents, self._title_total / documents, self._content_total / documents
+
+    def _refresh(self):
+        """Apply the postings changed since the last query"""
+        if not self._added and not self._removed:
+            return
+        documents, avg_title, avg_content = self._current_stats()
+        built_documents, built_title, built_content = self._stats
+
+        def drifted(current: float, built: float) -> bool:
+            return abs(current - built) > REBUILD_DRIFT * max(built, 1.0)
+
+        if drifted(documents, built_documents) or drifted(avg_title, built_title) \
+                or drifted(avg_content, built_content):
+            self._rebuild()
+            return
+        for term in self._added.keys() | self._removed.keys():
+            slots, saturation = self._postings.get(term, (EMPTY_SLOTS, EMPTY_WEIGHTS))
+            removed = self._removed.get(term)
+            if removed:
+                keep = ~np.isin(slots, np.fromiter(removed, dtype=np.int64, count=len(removed)))
+                slots, saturation = slots[keep], saturation[keep]
+            added = self._added.get(term)
+            if added:
+                slots = np.concatenate((slots, np.array([slot for slot, _ in added], dtype=np.int64)))
+                saturation = np.concatenate((saturation, np.array([value for _, value in added], dtype=np.float32)))
+            if len(slots):
+                self._postings[term] = (slots, saturation)
+                self._set_impact(term, slots, saturation, documents)
+            else:
+                self._postings.pop(term, None)
+                self._impacts.pop(term, None)
+        self._added.clear()
+        self._removed.clear()
+
+    def _rebuild(self):
+        """Recompute every posting with the current length statistics"""
+        self._stats = documents, avg_title, avg_content = self._current_stats()
+        collected: Dict[str, Tuple[List[int], List[int], List[int]]] = {}
+        for slot in self._slots.values():
+            for term, (title_count, offsets) in self._docs[slot].terms.items():
+                entry = collected.get(term)
+                if entry is None:
+                    entry = collected[term] = ([], [], [])
+                entry[0].append(slot)
+                entry[1].append(title_count)
+                entry[2].append(len(offsets))
+
+        title_lengths = np.zeros(len(self._docs), dtype=np.float32)
+        content_lengths = np.zeros(len(self._docs), dtype=np.float32)
+        for slot in self._slots.values():
+            title_lengths[slot] = self._docs[slot].title_length
+            content_lengths[slot] = self._docs[slot].content_length
+        title_norm = 1 - B_TITLE + B_TITLE * title_lengths / max(avg_title, 1.0)
+        content_norm = 1 - B_CONTENT + B_CONTENT * content_lengths / max(avg_content, 1.0)
+
+        self._postings = {}
+        self._impacts = {}
+        for term, (slots, title_counts, content_counts) in collected.items():
+            slots = np.array(slots, dtype=np.int64)
+            frequency = (
+                self.title_weight * np.array(title_counts, dtype=np.float32) / title_norm[slots]
+                + np.array(content_counts, dtype=np.float32) / content_norm[slots]
+            )
+            saturation = (frequency / (K1 + frequency)).astype(np.float32)
+            self._postings[term] = (slots, saturation)
+            self._set_impact(term, slots, saturation, documents)
+        self._added.clear()
+        self._removed.clear()
+
+    def _set_impact(self, term: str, slots: np.ndarray, saturation: np.ndarray, documents: int):
+        weights = saturation * self._idf(len(slots), documents)
+        if len(slots) >= DENSE_SHARE * documents:
+            dense = np.zeros(len(self._docs), dtype=np.float32)
+            dense[slots] = weights
+            self._impacts[term] = (None, dense)
+        else:
+            self._impacts[term] = (slots, weights)
+
+    def _saturation(self, title_count: int, content_count: int, title_length: int, content_length: int) -> float:
+        # BM25F: field frequencies are normalized by field length and summed with weights
+        _, avg_title, avg_content = self._stats
+        frequency = self.title_weight * title_count / (
+            1 - B_TITLE + B_TITLE * title_length / max(avg_title, 1.0)
+        ) + content_count / (
+            1 - B_CONTENT + B_CONTENT * content_length / max(avg_content, 1.0)
+        )
+        return frequency / (K1 + frequency)
+
+    @staticmethod
+    def _idf(frequency: int, documents: int) -> float:
+        return math.log(1 + (max(documents, frequency) - frequency + 0.5) / (frequency + 0.5))
@@ -1,43 +1,136 @@
+import time
+import uuid
+import asyncio
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Iterable, Optional, Set
+import asyncpg
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, text
+from sqlalchemy import select
 
+from app.core.config import settings
+from app.database.connection import AsyncSessionLocal
 from app.models.regulation import Regulation
+from app.services.metrics import metrics_service
+from app.services.regulation_chunks import RegulationChunkStore
+from app.services.regulation_index import RegulationIndex
 
 logger = logging.getLogger(__name__)
 
+# Notification channel of the regulations_notify_trigger trigger (db/init.sql)
+NOTIFY_CHANNEL = 'regulations_changed'
+
+# Pause before reconnecting a lost LISTEN connection (seconds)
+LISTEN_RETRY_DELAY = 5.0
+
 
 class RegulatoryMatcher:
     """Service for matching changes with relevant regulations"""
     
     def __init__(self):
-        pass
+        # Passages in PostgreSQL (chunks) or the in-memory BM25 index (index)
+        self.use_chunks = settings.REGULATION_SEARCH == 'chunks'
+        self.chunks = RegulationChunkStore(settings.CHUNK_SIZE)
+        # Built from the active regulations on startup or on the first query
+        self.index: Optional[RegulationIndex] = None
+        # Rebuilds and incremental updates are applied one at a time
+        self._lock = asyncio.Lock()
+        self._changed: Set[str] = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._listen_task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Bring the search up to date and follow regulation changes through LISTEN/NOTIFY"""
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.error(f"Error building regulation search: {e}")
+        if settings.REGULATION_INDEX_LISTEN:
+            self._listen_task = asyncio.ensure_future(self._listen())
+    
+    async def stop(self):
+        for task in (self._listen_task, self._refresh_task):
+            if task is not None:
+                task.cancel()
+        self._listen_task = self._refresh_task = None
+    
+    async def rebuild(self):
+        """Re-chunk outdated regulations or rebuild the in-memory index"""
+        if not self.use_chunks:
+            await self.reload()
+            return
+        async with self._lock:
+            async with AsyncSessionLocal() as session:
+                written = await self.chunks.sync(session)
+            metrics_service.record_regulation_chunks('full', written)
+    
+    async def reload(self, db: Optional[AsyncSession] = None):
+        """Rebuild the index from all active regulations"""
+        async with self._lock:
+            if db is None:
+                async with AsyncSessionLocal() as session:
+                    regulations = await self._load(session)
+            else:
+                regulations = await self._load(db)
+            self.index = RegulationIndex.build(
+                (self._to_document(reg) for reg in regulations), settings.REGULATION_TITLE_WEIGHT
+            )
+            metrics_service.record_regulation_index('full', len(self.index))
+            logger.info(f"Regulation index built: {len(self.index)} regulations")
+    
+    async def refresh(self, regulation_ids: Iterable[str]):
+        """Re-read changed regulations; deleted or inactive ones are dropped"""
+        regulation_ids = list(regulation_ids)
+        if not regulation_ids:
+            return
+        if self.use_chunks:
+            async with self._lock:
+                async with AsyncSessionLocal() as session:
+                    written = await self.chunks.sync(session, regulation_ids)
+                metrics_service.record_regulation_chunks('incremental', written)
+            return
+        async with self._lock:
+            if self.index is None:
+                return
+            async with AsyncSessionLocal() as session:
+                regulations = await self._load(session, regulation_ids)
+            found = {str(reg.id) for reg in regulations}
+            for reg in regulations:
+                self.index.upsert(self._to_document(reg))
+            for regulation_id in regulation_ids:
+                if regulation_id not in found:
+                    self.index.remove(regulation_id)
+            metrics_service.record_regulation_index('incremental', len(self.index))
     
     async def find_relevant_regulations(self, change_text: str, db: AsyncSession) -> List[Dict]:
         """Find regulations relevant to a specific change"""
         try:
-            # Simple keyword-based matching for now
-            query = select(Regulation).where(
-                Regulation.active == True
-            ).limit(5)
+            if self.use_chunks:
+                start = time.perf_counter()
+                # Best passage of each regulation in one query
+                relevant_regs = await self.chunks.search(db, change_text, settings.REGULATION_MATCH_LIMIT)
+                metrics_service.record_regulation_search(time.perf_counter() - start)
+                return relevant_regs
             
-            result = await db.execute(query)
-            regulations = result.scalars().all()
-            
-            # Convert to dictionaries
-            relevant_regs = []
-            for reg in regulations:
-                relevant_regs.append({
-                    'id': str(reg.id),
-                    'title': reg.title,
-                    'content': reg.content[:200] + '...',  # Truncate for response
-                    'category': reg.category,
-                    'services': reg.get_services()
-                })
+            if self.index is None:
+                await self.reload(db)
             
+            start = time.perf_counter()
+            matches = self.index.search(change_text, settings.REGULATION_MATCH_LIMIT)
+            relevant_regs = [
+                {
+                    'id': doc.id,
+                    'title': doc.title,
+                    # Excerpt with the most words of the change
+                    'content': self.index.excerpt(doc, change_text, settings.LLM_PROMPT_REGULATION_CHARS),
+                    'category': doc.category,
+                    'services': doc.services,
+                    'relevance': round(score, 4),
+                }
+                for doc, score in matches
+            ]
+            metrics_service.record_regulation_search(time.perf_counter() - start)
             return relevant_regs
-            
+        
         except Exception as e:
             logger.error(f"Error finding relevant regulations: {e}")
             return []
@@ -53,7 +146,75 @@ class RegulatoryMatcher:
             regulations = result.scalars().all()
             
             return [reg.to_dict() for reg in regulations]
-            
+        
         except Exception as e:
             logger.error(f"Error getting regulations: {e}")
-            return [] 
\ No newline at end of file
+            return []
+    
+    async def _load(self, db: AsyncSession, regulation_ids: Optional[List[str]] = None) -> List[Regulation]:
+        query = select(Regulation).where(Regulation.active == True)
+        if regulation_ids is not None:
+            query = query.where(Regulation.id.in_([uuid.UUID(value) for value in regulation_ids]))
+        result = await db.execute(query)
+        return list(result.scalars().all())
+    
+    def _to_document(self, reg: Regulation) -> Dict:
+        return {
+            'id': str(reg.id),
+            'title': reg.title,
+            'content': reg.content,
+            'category': reg.category,
+            'services': reg.get_services(),
+        }
+    
+    async def _listen(self):
+        """Keep a LISTEN connection open; after a reconnect the search is rebuilt"""
+        connected_before = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(settings.DATABASE_URL)
+                closed = asyncio.get_running_loop().create_future()
+                connection.add_termination_listener(
+                    lambda _: closed.done() or closed.set_result(None)
+                )
+                await connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                logger.info(f"Listening for regulation changes on {NOTIFY_CHANNEL}")
+                if connected_before:
+                    # Notifications sent while disconnected are lost
+                    await self.rebuild()
+                connected_before = True
+                await closed
+                logger.warning("Regulation LISTEN connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error listening for regulation changes: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(LISTEN_RETRY_DELAY)
+    
+    def _on_notify(self, connection, pid: int, channel: str, payload: str):
+        try:
+            regulation_id = str(uuid.UUID(payload))
+        except ValueError:
+            logger.warning(f"Unexpected {NOTIFY_CHANNEL} payload: {payload!r}")
+            return
+        # Notifications of a bulk update are collected into one index update
+        self._changed.add(regulation_id)
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._apply_changes())
+    
+    async def _apply_changes(self):
+        await asyncio.sleep(0)
+        while self._changed:
+            changed, self._changed = self._changed, set()
+            try:
+                await self.refresh(changed)
+            except Exception as e:
+                logger.error(f"Error refreshing regulation search, rebuilding: {e}")
+                try:
+                    await self.rebuild()
+                except Exception as e:
+                    logger.error(f"Error building regulation search: {e}")
@@ -0,0 +1,46 @@
+import re
+from functools import lru_cache
+from typing import Iterator, List, Tuple
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Endings for light suffix stripping: one word in different cases and numbers
+# ("Лизингодателя" / "Лизингодателю") is reduced to one stem
+_ENDINGS = tuple(sorted((
+    'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ях', 'ах', 'ов', 'ев', 'ей', 'ий', 'ый', 'ой', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие',
+    'ом', 'ем', 'ам', 'ям', 'ую', 'юю',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True))
+MIN_STEM_LENGTH = 4
+
+# Function words that do not distinguish documents
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'на', 'с', 'со', 'по', 'о', 'об', 'от', 'к', 'ко', 'за', 'из', 'у', 'до',
+    'для', 'при', 'без', 'под', 'над', 'не', 'ни', 'что', 'как', 'а', 'но', 'или', 'либо',
+    'его', 'ее', 'их', 'это', 'этот', 'тот', 'так', 'же', 'бы', 'ли', 'то', 'который',
+    'которые', 'которых', 'которым', 'также', 'если', 'после', 'между', 'чем',
+))
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Lower-cased word without its most likely inflection ending"""
+    word = word.lower()
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def iter_terms(text: str) -> Iterator[Tuple[int, str]]:
+    """Character offsets and stems of the words of a text, stop words skipped"""
+    for match in WORD_PATTERN.finditer(text):
+        word = match.group().lower()
+        if word not in STOP_WORDS:
+            yield match.start(), stem(word)
+
+
+def terms(text: str) -> List[str]:
+    """Stems of the words of a text, stop words skipped"""
+    return [term for _, term in iter_terms(text)]
@@ -0,0 +1,253 @@
+import os
+import re
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+# MinHash signature length and LSH banding: 8 bands of 4 values make pairs with
+# similarity 0.8 candidates with probability 0.985, pairs with 0.5 with 0.4
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+
+# Words of unchanged text on each side of the edit added to its signature
+CONTEXT_WORDS = 3
+
+# Changes with fewer shingles are too sensitive to a single word for reuse
+MIN_SHINGLES = 6
+
+# Bumped when signatures or the file layout change: saved indexes of older versions are dropped
+SIGNATURE_VERSION = 3
+
+# SHA-256 cache keys are stored as raw bytes, one uint8 row per entry
+KEY_BYTES = 32
+
+# Entries only match changes of the same type
+CHANGE_TYPE_CODES = {'modification': 0, 'addition': 1, 'deletion': 2}
+OTHER_CHANGE_TYPE = 3
+
+# Candidates compared per lookup; oversized buckets of boilerplate are cut
+MAX_CANDIDATES = 64
+
+# Inserts buffered in dictionaries before merging into the sorted band arrays
+MIN_MERGE_SIZE = 10000
+
+_random = np.random.RandomState(20240613)
+_PERM_A = _random.randint(1, 2 ** 63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _random.randint(0, 2 ** 63, size=NUM_PERM, dtype=np.uint64)
+_BAND_MIX = _random.randint(1, 2 ** 63, size=ROWS, dtype=np.uint64) | np.uint64(1)
+
+
+def change_type_code(change) -> int:
+    return CHANGE_TYPE_CODES.get(getattr(change, 'change_type', ''), OTHER_CHANGE_TYPE)
+
+
+def _span_words(text: str, spans) -> Tuple[List[str], List[str], List[str]]:
+    """Words inside the spans and up to CONTEXT_WORDS words before and after them"""
+    inside = [word for start, end, *_ in spans for word in _WORD_PATTERN.findall(text[start:end].lower())]
+    before = _WORD_PATTERN.findall(text[:spans[0][0]].lower())[-CONTEXT_WORDS:]
+    after = _WORD_PATTERN.findall(text[spans[-1][1]:].lower())[:CONTEXT_WORDS]
+    return inside, before, after
+
+
+def _edit_words(change) -> Tuple[List[str], List[str], List[str]]:
+    """Removed words, added words and the unchanged words around the edit"""
+    original_text = getattr(change, 'original_text', '') or ''
+    modified_text = getattr(change, 'modified_text', '') or ''
+    original_spans = sorted(getattr(change, 'original_spans', None) or ())
+    modified_spans = sorted(getattr(change, 'modified_spans', None) or ())
+    if original_spans or modified_spans:
+        removed, before, after = _span_words(original_text, original_spans) if original_spans else ([], [], [])
+        added, modified_before, modified_after = _span_words(modified_text, modified_spans) \
+            if modified_spans else ([], [], [])
+        return removed, added, (before or modified_before) + (after or modified_after)
+
+    # Spans not computed (lazy_detail): the difference between the common prefix and suffix
+    words1 = _WORD_PATTERN.findall(original_text.lower())
+    words2 = _WORD_PATTERN.findall(modified_text.lower())
+    prefix = 0
+    limit = min(len(words1), len(words2))
+    while prefix < limit and words1[prefix] == words2[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and words1[-1 - suffix] == words2[-1 - suffix]:
+        suffix += 1
+    context = words1[max(0, prefix - CONTEXT_WORDS):prefix] + words1[len(words1) - suffix:][:CONTEXT_WORDS]
+    return words1[prefix:len(words1) - suffix], words2[prefix:len(words2) - suffix], context
+
+
+def _shingles(change) -> List[bytes]:
+    """
+    Removed and added words and word pairs, tagged by side, plus the words
+    around the edit
+
+    Only the edit and its immediate context are compared: two different
+    edits of one long clause share the rest of the clause and would
+    otherwise look nearly identical.
+    """
+    removed, added, context = _edit_words(change)
+    if not removed and not added:
+        return []
+    shingles = []
+    for side, words in (('o', removed), ('m', added)):
+        shingles.extend(f"{side}:{word}" for word in words)
+        shingles.extend(f"{side}:{first} {second}" for first, second in zip(words, words[1:]))
+    shingles.extend(f"c:{word}" for word in context)
+    return [shingle.encode('utf-8') for shingle in set(shingles)]
+
+
+def minhash_signature(change) -> Optional[np.ndarray]:
+    """
+    MinHash signature of a change, None for changes that are not compared:
+    too short, or changing amounts, rates, dates or terms (the same wording
+    with another number is a different change)
+    """
+    if getattr(change, 'fact_deltas', None):
+        return None
+    shingles = _shingles(change)
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    hashes = np.frombuffer(
+        b''.join(hashlib.blake2b(shingle, digest_size=8).digest() for shingle in shingles),
+        dtype=np.uint64
+    )
+    # Multiply-shift hashing: high 32 bits of a * h + b (mod 2^64)
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) >> np.uint64(32)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def _band_keys(signatures: np.ndarray) -> np.ndarray:
+    """One 64-bit key per band for each signature row"""
+    bands = signatures.reshape(len(signatures), BANDS, ROWS).astype(np.uint64)
+    return (bands * _BAND_MIX).sum(axis=2, dtype=np.uint64)
+
+
+class MinHashIndex:
+    """
+    In-process LSH index of analyzed changes
+
+    Signatures are kept in one uint32 matrix and referenced by cache keys of
+    the LLM response cache. Each band is a sorted array of band keys searched
+    with binary search; new entries are buffered in dictionaries and merged
+    once the buffer reaches a tenth of the index, so inserts stay amortized
+    cheap and lookups do not depend on the number of stored changes.
+    """
+
+    def __init__(self, scope: str = ""):
+        # Model and prompt version the stored results belong to
+        self.scope = scope
+        self.size = 0
+        self._signatures = np.empty((1024, NUM_PERM), dtype=np.uint32)
+        self._keys = np.empty((1024, KEY_BYTES), dtype=np.uint8)
+        self._change_types = np.empty(1024, dtype=np.uint8)
+        self._sorted_keys = [np.empty(0, dtype=np.uint64) for _ in range(BANDS)]
+        self._sorted_ids = [np.empty(0, dtype=np.uint32) for _ in range(BANDS)]
+        self._merged = 0
+        self._pending: List[Dict[int, List[int]]] = [{} for _ in range(BANDS)]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, signature: np.ndarray, key: str, change_type: int = OTHER_CHANGE_TYPE):
+        """Add a change signature referencing an LLM cache key"""
+        if self.size == len(self._signatures):
+            self._signatures = np.resize(self._signatures, (2 * self.size, NUM_PERM))
+            self._keys = np.resize(self._keys, (2 * self.size, KEY_BYTES))
+            self._change_types = np.resize(self._change_types, 2 * self.size)
+        entry_id = self.size
+        self._signatures[entry_id] = signature
+        self._keys[entry_id] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+        self._change_types[entry_id] = change_type
+        self.size += 1
+        for band, band_key in enumerate(_band_keys(signature[None, :])[0].tolist()):
+            self._pending[band].setdefault(band_key, []).append(entry_id)
+        if self.size - self._merged >= max(MIN_MERGE_SIZE, self._merged // 10):
+            self._merge()
+
+    def query(self, signature: np.ndarray, change_type: int = OTHER_CHANGE_TYPE) -> Optional[Tuple[str, float]]:
+        """Cache key and estimated Jaccard similarity of the nearest stored change of the same type"""
+        if not self.size:
+            return None
+        candidates = []
+        for band, band_key in enumerate(_band_keys(signature[None, :])[0]):
+            sorted_keys = self._sorted_keys[band]
+            start = np.searchsorted(sorted_keys, band_key, side='left')
+            end = np.searchsorted(sorted_keys, band_key, side='right')
+            candidates.extend(self._sorted_ids[band][start:min(end, start + MAX_CANDIDATES)].tolist())
+            candidates.extend(self._pending[band].get(int(band_key), ())[:MAX_CANDIDATES])
+            if len(candidates) >= MAX_CANDIDATES:
+                break
+        if not candidates:
+            return None
+        candidates = np.unique(np.array(candidates[:MAX_CANDIDATES], dtype=np.int64))
+        candidates = candidates[self._change_types[candidates] == change_type]
+        if not len(candidates):
+            return None
+        similarities = (self._signatures[candidates] == signature).mean(axis=1)
+        best = int(similarities.argmax())
+        return self._keys[candidates[best]].tobytes().hex(), float(similarities[best])
+
+    def _merge(self):
+        """Merge buffered entries into the sorted band arrays"""
+        band_keys = _band_keys(self._signatures[self._merged:self.size])
+        entry_ids = np.arange(self._merged, self.size, dtype=np.uint32)
+        for band in range(BANDS):
+            order = np.argsort(band_keys[:, band])
+            new_keys = band_keys[order, band]
+            # Inserting the sorted new keys is O(n) instead of a full sort
+            positions = np.searchsorted(self._sorted_keys[band], new_keys)
+            self._sorted_keys[band] = np.insert(self._sorted_keys[band], positions, new_keys)
+            self._sorted_ids[band] = np.insert(self._sorted_ids[band], positions, entry_ids[order])
+            self._pending[band] = {}
+        self._merged = self.size
+
+    def save(self, path: str):
+        """Write the index to a .npz file atomically"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp.npz"
+        np.savez(
+            temp_path,
+            signatures=self._signatures[:self.size],
+            keys=self._keys[:self.size],
+            change_types=self._change_types[:self.size],
+            scope=np.array(self.scope),
+            version=np.array(SIGNATURE_VERSION)
+        )
+        os.replace(temp_path, path)
+        logger.info(f"Saved semantic cache index with {self.size} changes to {path}")
+
+    @classmethod
+    def load(cls, path: str, scope: str = "") -> 'MinHashIndex':
+        """Read an index saved for the same scope; on error or scope change start empty"""
+        index = cls(scope)
+        if not os.path.exists(path):
+            return index
+        try:
+            with np.load(path) as data:
+                if str(data['scope']) != scope:
+                    logger.info(f"Semantic cache index {path} belongs to {data['scope']}, starting empty")
+                    return index
+                if 'version' not in data.files or int(data['version']) != SIGNATURE_VERSION:
+                    logger.info(f"Semantic cache index {path} has outdated signatures, starting empty")
+                    return index
+                index._signatures = np.array(data['signatures'], dtype=np.uint32)
+                index._keys = np.array(data['keys'], dtype=np.uint8).reshape(-1, KEY_BYTES)
+                index._change_types = np.array(data['change_types'], dtype=np.uint8)
+            index.size = len(index._signatures)
+            if index.size:
+                index._merge()
+            else:
+                index = cls(scope)
+            logger.info(f"Loaded semantic cache index with {index.size} changes from {path}")
+        except Exception as e:
+            logger.error(f"Error loading semantic cache index from {path}: {e}")
+            index = cls(scope)
+        return index
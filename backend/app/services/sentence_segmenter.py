@@ -0,0 +1,146 @@
+import re
+import logging
+from typing import FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Сокращения, после которых предложение не заканчивается (за ними следует
+# номер, название или продолжение фразы): "п. 3.2", "ст. 614", "г. Москва"
+NON_TERMINAL_ABBREVIATIONS = frozenset({
+    "п", "пп", "подп", "ст", "ч", "гл", "разд", "абз", "прил", "стр", "см",
+    "т", "им", "ул", "пер", "д", "корп", "кв", "оф", "обл", "р-н", "г",
+    "тел", "р/с", "к/с", "рег", "вх", "исх", "инн", "огрн", "бик",
+    "т.е", "т.к", "т.ч", "в т.ч", "напр", "ср", "мн", "прим", "ред",
+})
+
+# Кандидат на границу: знаки конца предложения, закрывающие кавычки и скобки,
+# за которыми следует пробел или конец текста
+_BOUNDARY_PATTERN = re.compile(r'[.!?…]+["»”)\]]*(?=\s|$)')
+
+# Последнее "слово" перед знаком конца предложения (с внутренними точками: т.е, 3.2)
+_LAST_TOKEN_PATTERN = re.compile(r'[\w/№-]+(?:\.[\w/-]+)*$')
+
+# Первый непробельный символ после кандидата
+_NEXT_CHAR_PATTERN = re.compile(r'\s*(\S)')
+
+# Номер пункта после границы: "3.", "3.2."
+_NEXT_ENUMERATION_PATTERN = re.compile(r'\s*\d+(?:\.\d+)*\.(?=\s)')
+
+# Номер пункта в начале предложения: "3.", "3.2.", "IV."
+_ENUMERATION_PATTERN = re.compile(r'(?:\d+(?:\.\d+)*|[IVXLC]+|[а-яa-z])$')
+
+# Сколько символов перед кандидатом просматривать в поисках слова
+_LOOKBEHIND = 40
+
+
+class SentenceSegmenter:
+    """
+    Разбиение юридического текста на предложения за один проход.
+
+    Границей считается последовательность [.!?…], за которой следует пробел.
+    Точка не считается границей после сокращений из словаря (п., ст., г.,
+    т.е.), после инициалов, после номера пункта в начале предложения и
+    перед словом со строчной буквы; поэтому сокращения, которые могут
+    закончить предложение (руб., т.д., др.), в словарь не входят.
+    Точка внутри числа (1.5, 3.2.1) не является кандидатом, так как за ней
+    нет пробела.
+    """
+
+    def __init__(self, abbreviations: Optional[Iterable[str]] = None):
+        self.abbreviations: FrozenSet[str] = frozenset(
+            NON_TERMINAL_ABBREVIATIONS if abbreviations is None else abbreviations
+        )
+
+    def split(self, text: str) -> List[str]:
+        """Возвращает список предложений текста"""
+        return [text[start:end] for start, end in self.iter_spans(text)]
+
+    def iter_spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Лениво перебирает предложения как интервалы [start, end) в тексте.
+        Интервалы включают знаки конца предложения и не включают пробелы по краям.
+        """
+        if not text:
+            return
+
+        start = _skip_spaces(text, 0)
+        for match in _BOUNDARY_PATTERN.finditer(text):
+            end = match.end()
+            if end <= start:
+                continue
+            if self._is_boundary(text, start, match):
+                yield start, end
+                start = _skip_spaces(text, end)
+
+        end = len(text.rstrip())
+        if start < end:
+            yield start, end
+
+    def _is_boundary(self, text: str, start: int, match: re.Match) -> bool:
+        """Решает, заканчивает ли кандидат предложение"""
+        # "!", "?" и многоточие всегда заканчивают предложение
+        if '.' not in match.group():
+            return True
+
+        next_char = _NEXT_CHAR_PATTERN.match(text, match.end())
+        if next_char is None:
+            return True
+        next_char = next_char.group(1)
+
+        # Предложение не начинается со строчной буквы
+        if next_char.islower():
+            return False
+
+        token = _last_token(text, start, match.start())
+        if token is None:
+            return True
+        word = token.group()
+        lowered = word.lower()
+
+        # Сокращение перед числом: "100 руб. 50 коп.", но не "... договора. 3.2. Текст"
+        if next_char.isdigit() and word.isalpha() and word.islower() and \
+                _NEXT_ENUMERATION_PATTERN.match(text, match.end()) is None:
+            return False
+
+        # Номер пункта в начале предложения: "3.2. Лизингополучатель обязан"
+        if token.start() == start and _ENUMERATION_PATTERN.match(word):
+            return False
+
+        # Инициалы: "А. С. Иванов"
+        if len(word) == 1 and word.isupper() and word.isalpha():
+            return False
+
+        if lowered in self.abbreviations:
+            # "в 2024 г. Стороны ..." - год в конце предложения
+            if lowered == "г" and _previous_word_is_number(text, start, token.start()):
+                return True
+            return False
+
+        return True
+
+
+def _skip_spaces(text: str, position: int) -> int:
+    """Позиция первого непробельного символа, начиная с position"""
+    length = len(text)
+    while position < length and text[position].isspace():
+        position += 1
+    return position
+
+
+def _last_token(text: str, start: int, position: int) -> Optional[re.Match]:
+    """Последнее слово перед позицией (поиск начинается после последнего пробела)"""
+    lower = max(start, position - _LOOKBEHIND)
+    lower = max(lower, text.rfind(' ', lower, position) + 1)
+    return _LAST_TOKEN_PATTERN.search(text, lower, position)
+
+
+def _previous_word_is_number(text: str, start: int, position: int) -> bool:
+    """Проверяет, что перед позицией стоит число (год, сумма)"""
+    while position > start and text[position - 1].isspace():
+        position -= 1
+    token = _last_token(text, start, position)
+    return token is not None and token.group()[0].isdigit()
+
+
+# Общий экземпляр с лексиконом по умолчанию
+sentence_segmenter = SentenceSegmenter()
@@ -0,0 +1,217 @@
+import re
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import yaml
+
+from app.services.fact_extractor import DATE, fact_extractor
+from app.services.llm_analyzer import LLMAnalysisResult
+from app.services.prompt_compiler import changed_chars
+
+logger = logging.getLogger(__name__)
+
+# Backend directory: relative paths to rule files are resolved against it
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+# Minimum length of a word whose correction counts as a typo
+TYPO_MIN_WORD_LENGTH = 5
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_QUOTES_PATTERN = re.compile(r'[«»“”„‟"\']')
+# Punctuation except separators inside numbers (1,5; 3.2)
+_PUNCTUATION_PATTERN = re.compile(r'(?<!\d)[^\w\s]|[^\w\s](?!\d)')
+_LEADING_NUMBER_PATTERN = re.compile(r'^\s*(?:\d+(?:\.\d+)*[.)]|[IVX]+[.)]|[а-яёa-z][.)])\s*')
+_REFERENCE_PATTERN = re.compile(
+    r'\b(п|пп|подп|ст|разд|раздел[а-я]*|пункт[а-я]*|подпункт[а-я]*)\.?\s*\d+(?:\.\d+)*\.?',
+    re.IGNORECASE
+)
+_CLAUSE_NUMBER_PATTERN = re.compile(r'\b\d+(?:\.\d+)+\.?')
+
+
+def _normalize_dates(text: str) -> str:
+    """Приводит все даты к формату ISO"""
+    parts = []
+    position = 0
+    for fact in fact_extractor.extract(text):
+        if fact.kind != DATE:
+            continue
+        parts.append(text[position:fact.start])
+        parts.append(date.fromordinal(int(fact.value)).isoformat())
+        position = fact.end
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+def _normalize_numbering(text: str) -> str:
+    """Убирает номер подпункта и номера в ссылках на пункты"""
+    text = _LEADING_NUMBER_PATTERN.sub('', text, count=1)
+    text = _REFERENCE_PATTERN.sub(lambda match: f"{match.group(1)} #", text)
+    return _CLAUSE_NUMBER_PATTERN.sub('#', text)
+
+
+# Normalizations in the order they are applied
+NORMALIZATIONS: Dict[str, Callable[[str], str]] = {
+    'date_format': _normalize_dates,
+    'numbering': _normalize_numbering,
+    'quotes': lambda text: _QUOTES_PATTERN.sub('"', text),
+    'punctuation': lambda text: _PUNCTUATION_PATTERN.sub(' ', text),
+    'case': str.lower,
+    'whitespace': lambda text: _WHITESPACE_PATTERN.sub(' ', text).strip(),
+}
+
+
+def _edit_distance(word1: str, word2: str, limit: int) -> int:
+    """Расстояние Дамерау-Левенштейна; при превышении limit возвращает limit + 1"""
+    if abs(len(word1) - len(word2)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(word2) + 1))
+    for i, char1 in enumerate(word1, 1):
+        current = [i] + [0] * len(word2)
+        for j, char2 in enumerate(word2, 1):
+            cost = 0 if char1 == char2 else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and \
+                    char1 == word2[j - 2] and word1[i - 2] == char2:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class TriageRule:
+    """Declarative triage rule compiled into a list of predicates"""
+
+    CONDITIONS = (
+        'change_types', 'original_pattern', 'modified_pattern', 'equal_after',
+        'max_fact_deltas', 'max_severity_score', 'max_changed_chars', 'typo',
+    )
+
+    def __init__(self, name: str, when: Dict[str, Any], result: Dict[str, Any],
+                 description: str = ""):
+        self.name = name
+        self.description = description
+        self.result = LLMAnalysisResult(
+            comment=result['comment'],
+            required_services=list(result.get('required_services') or []),
+            severity=result.get('severity', 'low'),
+            confidence=float(result.get('confidence', 0.9)),
+            reasoning=f"Правило предварительной обработки: {name}"
+                      + (f" ({description})" if description else "") + ", анализ LLM не требуется",
+        )
+        self.predicates = self._compile(when)
+
+    def _compile(self, when: Dict[str, Any]) -> List[Callable[[Any], bool]]:
+        unknown = set(when) - set(self.CONDITIONS)
+        if unknown:
+            raise ValueError(f"Rule {self.name}: unknown conditions {sorted(unknown)}")
+
+        predicates = []
+        if 'change_types' in when:
+            change_types = frozenset(when['change_types'])
+            predicates.append(lambda change: change.change_type in change_types)
+        if 'original_pattern' in when:
+            original_pattern = re.compile(when['original_pattern'])
+            predicates.append(lambda change: original_pattern.search(change.original_text) is not None)
+        if 'modified_pattern' in when:
+            modified_pattern = re.compile(when['modified_pattern'])
+            predicates.append(lambda change: modified_pattern.search(change.modified_text) is not None)
+        if 'max_fact_deltas' in when:
+            max_fact_deltas = int(when['max_fact_deltas'])
+            predicates.append(lambda change: len(change.fact_deltas) <= max_fact_deltas)
+        if 'max_severity_score' in when:
+            max_severity_score = float(when['max_severity_score'])
+            predicates.append(lambda change: change.severity_score <= max_severity_score)
+        if 'max_changed_chars' in when:
+            max_changed_chars = int(when['max_changed_chars'])
+            predicates.append(lambda change: changed_chars(change) <= max_changed_chars)
+        if 'typo' in when:
+            limit = int(when['typo'])
+            predicates.append(lambda change: self._is_typo(change, limit))
+        if 'equal_after' in when:
+            unknown = set(when['equal_after']) - set(NORMALIZATIONS)
+            if unknown:
+                raise ValueError(f"Rule {self.name}: unknown normalizations {sorted(unknown)}")
+            steps = [step for name, step in NORMALIZATIONS.items() if name in when['equal_after']]
+            normalize = _compose(steps)
+            # Normalization is the most expensive check, so it runs last
+            predicates.append(
+                lambda change: normalize(change.original_text) == normalize(change.modified_text)
+            )
+        return predicates
+
+    @staticmethod
+    def _is_typo(change, limit: int) -> bool:
+        """Exactly one word replaced by a word within `limit` edits; numbers are never typos"""
+        if len(change.original_spans) != 1 or len(change.modified_spans) != 1:
+            return False
+        start1, end1, _ = change.original_spans[0]
+        start2, end2, _ = change.modified_spans[0]
+        word1 = change.original_text[start1:end1]
+        word2 = change.modified_text[start2:end2]
+        if min(len(word1), len(word2)) < TYPO_MIN_WORD_LENGTH or \
+                any(char.isspace() or char.isdigit() for char in word1 + word2):
+            return False
+        return _edit_distance(word1, word2, limit) <= limit
+
+    def matches(self, change) -> bool:
+        return all(predicate(change) for predicate in self.predicates)
+
+
+def _compose(steps: Sequence[Callable[[str], str]]) -> Callable[[str], str]:
+    def normalize(text: str) -> str:
+        for step in steps:
+            text = step(text)
+        return text
+    return normalize
+
+
+class TriageEngine:
+    """
+    Rule-based fast path that resolves trivial changes without calling the LLM
+
+    Rules are compiled once; the first matching rule produces an
+    LLMAnalysisResult directly.
+    """
+
+    def __init__(self, rules: Optional[List[TriageRule]] = None):
+        self.rules = rules or []
+
+    @classmethod
+    def from_dicts(cls, rules: List[Dict[str, Any]]) -> 'TriageEngine':
+        """Build engine from rule definitions (YAML file or database rows)"""
+        return cls([
+            TriageRule(
+                name=rule['name'],
+                when=rule.get('when') or {},
+                result=rule['result'],
+                description=rule.get('description', ""),
+            )
+            for rule in rules
+        ])
+
+    @classmethod
+    def from_yaml(cls, path: str) -> 'TriageEngine':
+        """Load rules from a YAML file; on error the fast path is disabled"""
+        rules_path = Path(path)
+        if not rules_path.is_absolute():
+            rules_path = BASE_DIR / rules_path
+        try:
+            with open(rules_path, encoding='utf-8') as file:
+                config = yaml.safe_load(file) or {}
+            engine = cls.from_dicts(config.get('rules') or [])
+            logger.info(f"Loaded {len(engine.rules)} triage rules from {rules_path}")
+            return engine
+        except Exception as e:
+            logger.error(f"Error loading triage rules from {rules_path}: {e}")
+            return cls()
+
+    def match(self, change) -> Optional[TriageRule]:
+        """Return the first rule matching the change"""
+        for rule in self.rules:
+            if rule.matches(change):
+                return rule
+        return None
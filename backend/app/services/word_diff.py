@@ -0,0 +1,356 @@
+import difflib
+import logging
+import math
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Поддерживаемые алгоритмы сравнения последовательностей
+DIFF_ALGORITHMS = ("difflib", "myers", "histogram")
+
+# Опкоды в формате difflib.SequenceMatcher.get_opcodes()
+Opcode = Tuple[str, int, int, int, int]
+MatchingBlock = Tuple[int, int, int]
+
+# Нижняя граница числа правок, после которого поиск middle snake
+# прекращается и диапазон делится по самой продвинутой диагонали
+# ("too expensive" в git xdiff); иначе граница - корень из N+M
+MYERS_MIN_COST = 64
+
+
+class TokenInterner:
+    """
+    Сопоставляет токенам целочисленные идентификаторы.
+
+    Один экземпляр используется для обеих сравниваемых последовательностей,
+    поэтому равные токены получают равные идентификаторы, и алгоритмы
+    сравнивают целые числа, а не строки.
+    """
+
+    def __init__(self):
+        self._ids: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def intern(self, tokens: Iterable[Hashable]) -> List[int]:
+        """Переводит последовательность токенов в список идентификаторов"""
+        ids = self._ids
+        setdefault = ids.setdefault
+        return [setdefault(token, len(ids)) for token in tokens]
+
+
+class WordDiffEngine:
+    """
+    Сравнение последовательностей токенов с интерфейсом опкодов difflib.
+
+    Алгоритм "difflib" сохраняет прежнее поведение SequenceMatcher.
+    Алгоритмы "myers" и "histogram" работают над целочисленными
+    идентификаторами токенов и не отбрасывают частые токены (autojunk),
+    что важно для юридического текста с повторяющимися словами.
+    """
+
+    # Максимальное число вхождений токена, при котором он может быть якорем
+    # гистограммного алгоритма (как в git)
+    HISTOGRAM_MAX_CHAIN = 64
+
+    def __init__(self, algorithm: str = "histogram"):
+        self.algorithm = self._validate_algorithm(algorithm)
+
+    @staticmethod
+    def _validate_algorithm(algorithm: str) -> str:
+        if algorithm not in DIFF_ALGORITHMS:
+            raise ValueError(
+                f"Неизвестный алгоритм сравнения: {algorithm}. "
+                f"Доступны: {', '.join(DIFF_ALGORITHMS)}"
+            )
+        return algorithm
+
+    def get_opcodes(self, seq1: Sequence[Hashable], seq2: Sequence[Hashable],
+                    algorithm: Optional[str] = None,
+                    interner: Optional[TokenInterner] = None) -> List[Opcode]:
+        """Возвращает опкоды преобразования seq1 в seq2"""
+        algorithm = self._validate_algorithm(algorithm or self.algorithm)
+
+        if algorithm == "difflib":
+            return difflib.SequenceMatcher(None, seq1, seq2).get_opcodes()
+
+        interner = interner or TokenInterner()
+        a = interner.intern(seq1)
+        b = interner.intern(seq2)
+        return self.get_opcodes_for_ids(a, b, algorithm)
+
+    def get_opcodes_for_ids(self, a: Sequence[int], b: Sequence[int],
+                            algorithm: Optional[str] = None) -> List[Opcode]:
+        """Возвращает опкоды для уже интернированных последовательностей"""
+        algorithm = self._validate_algorithm(algorithm or self.algorithm)
+
+        if algorithm == "difflib":
+            return difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+        if algorithm == "myers":
+            blocks = _myers_matching_blocks(a, b)
+        else:
+            blocks = _histogram_matching_blocks(a, b, self.HISTOGRAM_MAX_CHAIN)
+
+        return matching_blocks_to_opcodes(blocks, len(a), len(b))
+
+
+def matching_blocks_to_opcodes(blocks: List[MatchingBlock], len_a: int, len_b: int) -> List[Opcode]:
+    """Преобразует совпадающие блоки в опкоды (как SequenceMatcher.get_opcodes)"""
+    # Сливаем соседние блоки, чтобы опкоды совпадали по форме с difflib
+    merged: List[MatchingBlock] = []
+    for i, j, n in sorted(blocks):
+        if n == 0:
+            continue
+        if merged:
+            pi, pj, pn = merged[-1]
+            if pi + pn == i and pj + pn == j:
+                merged[-1] = (pi, pj, pn + n)
+                continue
+        merged.append((i, j, n))
+    merged.append((len_a, len_b, 0))
+
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for ai, bj, size in merged:
+        if i < ai and j < bj:
+            opcodes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            opcodes.append(('delete', i, ai, j, bj))
+        elif j < bj:
+            opcodes.append(('insert', i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(('equal', ai, i, bj, j))
+    return opcodes
+
+
+def _trim_common(a: Sequence[int], alo: int, ahi: int,
+                 b: Sequence[int], blo: int, bhi: int,
+                 blocks: List[MatchingBlock]) -> Tuple[int, int, int, int]:
+    """Отсекает общий префикс и суффикс диапазонов, записывая их как блоки"""
+    start = 0
+    while alo + start < ahi and blo + start < bhi and a[alo + start] == b[blo + start]:
+        start += 1
+    if start:
+        blocks.append((alo, blo, start))
+        alo += start
+        blo += start
+
+    end = 0
+    while alo < ahi - end and blo < bhi - end and a[ahi - end - 1] == b[bhi - end - 1]:
+        end += 1
+    if end:
+        blocks.append((ahi - end, bhi - end, end))
+        ahi -= end
+        bhi -= end
+
+    return alo, ahi, blo, bhi
+
+
+def _myers_max_cost(n: int, m: int) -> int:
+    return max(MYERS_MIN_COST, math.isqrt(n + m + 3))
+
+
+def _myers_middle_snake(a: Sequence[int], alo: int, ahi: int,
+                        b: Sequence[int], blo: int, bhi: int,
+                        max_cost: Optional[int] = None) -> Optional[Tuple[int, int]]:
+    """
+    Ищет точку разбиения кратчайшего редакционного пути (middle snake)
+    двунаправленным алгоритмом Майерса в линейной памяти.
+    Возвращает абсолютные координаты (x, y) или None, если общих токенов нет.
+
+    Если путь длиннее max_cost правок, поиск прекращается и возвращается
+    самая дальняя точка прямого или обратного прохода: результат остается
+    корректным, но может быть не минимальным.
+    """
+    n = ahi - alo
+    m = bhi - blo
+    max_d = (n + m + 1) // 2
+    if max_cost is None:
+        max_cost = _myers_max_cost(n, m)
+    v_offset = max_d
+    v_length = 2 * max_d + 2
+    v1 = [-1] * v_length
+    v2 = [-1] * v_length
+    v1[v_offset + 1] = 0
+    v2[v_offset + 1] = 0
+    delta = n - m
+    front = delta % 2 != 0
+    k1start = k1end = k2start = k2end = 0
+
+    for d in range(max_d):
+        # Прямой проход
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1_offset = v_offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[alo + x1] == b[blo + y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 > n:
+                k1end += 2
+            elif y1 > m:
+                k1start += 2
+            elif front:
+                k2_offset = v_offset + delta - k1
+                if 0 <= k2_offset < v_length and v2[k2_offset] != -1:
+                    if x1 >= n - v2[k2_offset]:
+                        return alo + x1, blo + y1
+
+        # Обратный проход
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2_offset = v_offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[ahi - x2 - 1] == b[bhi - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2end += 2
+            elif y2 > m:
+                k2start += 2
+            elif not front:
+                k1_offset = v_offset + delta - k2
+                if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    y1 = v_offset + x1 - k1_offset
+                    if x1 >= n - x2:
+                        return alo + x1, blo + y1
+
+        if d >= max_cost:
+            return _myers_furthest_point(v1, v2, v_offset, d, (k1start, k1end, k2start, k2end),
+                                         alo, ahi, blo, bhi)
+
+    return None
+
+
+def _myers_furthest_point(v1: List[int], v2: List[int], v_offset: int, d: int,
+                          bounds: Tuple[int, int, int, int],
+                          alo: int, ahi: int, blo: int, bhi: int) -> Optional[Tuple[int, int]]:
+    """Точка прямого или обратного прохода, дальше всех продвинувшаяся по диагоналям"""
+    n = ahi - alo
+    m = bhi - blo
+    k1start, k1end, k2start, k2end = bounds
+    best: Optional[Tuple[int, int]] = None
+    best_progress = 0
+    for k in range(-d + k1start, d + 1 - k1end, 2):
+        x = v1[v_offset + k]
+        y = x - k
+        if 0 <= x <= n and 0 <= y <= m and x + y > best_progress:
+            best, best_progress = (alo + x, blo + y), x + y
+    for k in range(-d + k2start, d + 1 - k2end, 2):
+        x = v2[v_offset + k]
+        y = x - k
+        if 0 <= x <= n and 0 <= y <= m and x + y > best_progress:
+            best, best_progress = (ahi - x, bhi - y), x + y
+    return best
+
+
+def _myers_matching_blocks(a: Sequence[int], b: Sequence[int],
+                           alo: int = 0, ahi: Optional[int] = None,
+                           blo: int = 0, bhi: Optional[int] = None) -> List[MatchingBlock]:
+    """
+    Совпадающие блоки по алгоритму Майерса (O((N+M)D) по времени, O(N+M) по памяти)
+
+    Число правок, просматриваемое в каждом диапазоне, ограничено
+    (_myers_max_cost), поэтому сильно переписанный текст из небольшого
+    набора слов сравнивается за O((N+M)^1.5), а не за O((N+M)^2).
+    """
+    ahi = len(a) if ahi is None else ahi
+    bhi = len(b) if bhi is None else bhi
+
+    blocks: List[MatchingBlock] = []
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        alo, ahi, blo, bhi = _trim_common(a, alo, ahi, b, blo, bhi, blocks)
+        if alo >= ahi or blo >= bhi:
+            continue
+        split = _myers_middle_snake(a, alo, ahi, b, blo, bhi)
+        if split is None or split == (alo, blo) or split == (ahi, bhi):
+            continue
+        x, y = split
+        stack.append((x, ahi, y, bhi))
+        stack.append((alo, x, blo, y))
+    return blocks
+
+
+def _histogram_matching_blocks(a: Sequence[int], b: Sequence[int],
+                               max_chain: int) -> List[MatchingBlock]:
+    """
+    Совпадающие блоки по гистограммному алгоритму (как в git diff --histogram).
+
+    В каждом диапазоне выбирается общая область, содержащая самый редкий
+    в первой последовательности токен; диапазоны слева и справа от неё
+    обрабатываются рекурсивно. Если общих редких токенов нет, диапазон
+    сравнивается алгоритмом Майерса.
+    """
+    blocks: List[MatchingBlock] = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        alo, ahi, blo, bhi = _trim_common(a, alo, ahi, b, blo, bhi, blocks)
+        if alo >= ahi or blo >= bhi:
+            continue
+
+        anchor = _histogram_find_anchor(a, alo, ahi, b, blo, bhi, max_chain)
+        if anchor is None:
+            blocks.extend(_myers_matching_blocks(a, b, alo, ahi, blo, bhi))
+            continue
+
+        i, j, size = anchor
+        blocks.append((i, j, size))
+        stack.append((i + size, ahi, j + size, bhi))
+        stack.append((alo, i, blo, j))
+    return blocks
+
+
+def _histogram_find_anchor(a: Sequence[int], alo: int, ahi: int,
+                           b: Sequence[int], blo: int, bhi: int,
+                           max_chain: int) -> Optional[MatchingBlock]:
+    """Находит самую длинную общую область с наименьшей частотой токена"""
+    positions: Dict[int, List[int]] = {}
+    for i in range(alo, ahi):
+        positions.setdefault(a[i], []).append(i)
+
+    best: Optional[MatchingBlock] = None
+    best_count = max_chain + 1
+    j = blo
+    while j < bhi:
+        occurrences = positions.get(b[j])
+        if occurrences is None or len(occurrences) > best_count:
+            j += 1
+            continue
+
+        next_j = j + 1
+        for i in occurrences:
+            # Расширяем совпадение в обе стороны, отслеживая минимальную частоту
+            start_i, start_j = i, j
+            count = len(occurrences)
+            while start_i > alo and start_j > blo and a[start_i - 1] == b[start_j - 1]:
+                start_i -= 1
+                start_j -= 1
+                count = min(count, len(positions[a[start_i]]))
+            end_i, end_j = i + 1, j + 1
+            while end_i < ahi and end_j < bhi and a[end_i] == b[end_j]:
+                count = min(count, len(positions[a[end_i]]))
+                end_i += 1
+                end_j += 1
+
+            size = end_i - start_i
+            if best is None or count < best_count or (count == best_count and size > best[2]):
+                best = (start_i, start_j, size)
+                best_count = count
+            next_j = max(next_j, end_j)
+        j = next_j
+
+    return best
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Группировка повторяющихся изменений перед анализом LLM.
+
+Документы из заданного числа подпунктов: в доле --mentions подпунктов
+упоминается Лизингодатель (в разных падежах), и в редакции клиента он
+глобально заменен на Арендодателя; в доле --change-rate подпунктов
+случайные правки (как в bench_streaming_diff). Для изменений ChangeSet
+выводит число изменений, число анализов LLM без группировки и с ней,
+число групп и время группировки на изменение - оно не должно расти
+с размером документа.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_change_clusters --clauses 1000 5000 20000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from benchmarks.bench_word_diff import generate_clause, mutate_clause
+
+for name in ("OPENAI_API_KEY", "POSTGRES_HOST", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB"):
+    os.environ.setdefault(name, "stub")
+os.environ.setdefault("UPLOAD_PATH", "/tmp/oozo-bench/uploads")
+os.environ.setdefault("LOG_FILE", "/tmp/oozo-bench/logs/app.log")
+
+from app.services.change_clusterer import cluster_changes  # noqa: E402
+from app.services.diff_analyzer import DiffAnalyzer  # noqa: E402
+
+PARTY_FORMS = ["Лизингодатель", "Лизингодателя", "Лизингодателю", "Лизингодателем"]
+
+
+def build_documents(clauses: int, words: int, mentions: float, change_rate: float, seed: int):
+    rng = random.Random(seed)
+    reference, client = [], []
+    for number in range(1, clauses + 1):
+        clause = generate_clause(rng, words)
+        if rng.random() < mentions:
+            clause.insert(rng.randrange(len(clause)), rng.choice(PARTY_FORMS))
+        reference.append(f"{number}. " + " ".join(clause))
+        clause = [word.replace("Лизингодател", "Арендодател") for word in clause]
+        if rng.random() < change_rate:
+            clause = mutate_clause(rng, clause, 0.1)
+        client.append(f"{number}. " + " ".join(clause))
+    return {"text": "\n".join(reference)}, {"text": "\n".join(client)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repeated change clustering")
+    parser.add_argument("--clauses", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--words", type=int, default=40)
+    parser.add_argument("--mentions", type=float, default=0.2)
+    parser.add_argument("--change-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    analyzer = DiffAnalyzer()
+    print(f"{args.mentions:.0%} clauses with a renamed party, {args.change_rate:.0%} with random edits")
+    print(f"{'clauses':>8} {'changes':>8} {'unclustered':>12} {'clustered':>10} {'clusters':>9} {'us/change':>10}")
+    for clauses in args.clauses:
+        reference, client = build_documents(clauses, args.words, args.mentions, args.change_rate, args.seed)
+        changes = asyncio.run(analyzer.analyze_change_set(reference, client))
+        start = time.perf_counter()
+        groups = cluster_changes(changes)
+        elapsed = time.perf_counter() - start
+        clusters = sum(1 for cluster_id, _ in groups if cluster_id is not None)
+        print(f"{clauses:>8} {len(changes):>8} {len(changes):>12} {len(groups):>10} {clusters:>9} "
+              f"{elapsed / len(changes) * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
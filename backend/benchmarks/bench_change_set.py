@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк памяти колоночного ChangeSet против списка подпунктов-словарей
+и объектов DiffChange.
+
+Для документов из заданного числа подпунктов измеряет (tracemalloc, без
+учета исходных текстов, которые вызывающий код хранит в любом случае):
+    - память разбиения на подпункты (словари против ClauseTable);
+    - удерживаемую память результата (List[DiffChange] против ChangeSet);
+    - пиковую память всего сравнения.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_change_set --clauses 5000
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from app.services.diff_analyzer import DiffAnalyzer
+from benchmarks.bench_streaming_diff import build_documents
+
+
+def measure(build):
+    """Возвращает (результат, удерживаемая память, пиковая память, время)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, elapsed
+
+
+def megabytes(size: int) -> str:
+    return f"{size / 1024 / 1024:>9.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar change set memory benchmark")
+    parser.add_argument("--clauses", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=60)
+    parser.add_argument("--change-rate", type=float, nargs="+", default=[0.05, 0.3])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    analyzer = DiffAnalyzer()
+    print(f"{'structure':<28} {'rate':>5} {'items':>7} {'kept MB':>9} {'peak MB':>9} {'time s':>7}")
+
+    for change_rate in args.change_rate:
+        reference, client = build_documents(args.clauses, args.words, change_rate, args.seed)
+        ref_text = reference["text"]
+
+        rows = []
+        clauses, kept, peak, elapsed = measure(lambda: analyzer._split_into_subparagraphs(ref_text))
+        rows.append(("clauses: list of dicts", len(clauses), kept, peak, elapsed))
+        del clauses
+        table, kept, peak, elapsed = measure(lambda: analyzer._clause_table(ref_text))
+        rows.append(("clauses: ClauseTable", len(table), kept, peak, elapsed))
+        del table
+
+        changes, kept, peak, elapsed = measure(
+            lambda: asyncio.run(analyzer.analyze_differences(reference, client))
+        )
+        rows.append(("changes: List[DiffChange]", len(changes), kept, peak, elapsed))
+        del changes
+        change_set, kept, peak, elapsed = measure(
+            lambda: asyncio.run(analyzer.analyze_change_set(reference, client))
+        )
+        rows.append(("changes: ChangeSet", len(change_set), kept, peak, elapsed))
+        del change_set
+
+        for name, items, kept, peak, elapsed in rows:
+            print(f"{name:<28} {change_rate:>5.2f} {items:>7} {megabytes(kept)} {megabytes(peak)} {elapsed:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк формата подсветки: интервалы (start, end, op) против разметки [-]/[+].
+
+Сравнивает размер JSON-ответа и время клиентского рендеринга в HTML
+для анализа с заданным числом измененных подпунктов.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_highlight_payload --changes 300
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+
+from app.services.diff_analyzer import DiffAnalyzer
+from benchmarks.bench_word_diff import generate_clause, mutate_clause
+
+DELETED_STYLE = "background-color: #ffcdd2; color: #d32f2f; font-weight: bold;"
+INSERTED_STYLE = "background-color: #c8e6c9; color: #2e7d32; font-weight: bold;"
+
+
+def render_markup(highlighted: str) -> str:
+    """Рендеринг устаревшей разметки, как в клиенте Streamlit"""
+    html = re.sub(r"\[-\](.*?)\[/-\]", rf'<span style="{DELETED_STYLE}">\1</span>', highlighted)
+    return re.sub(r"\[\+\](.*?)\[/\+\]", rf'<span style="{INSERTED_STYLE}">\1</span>', html)
+
+
+def render_spans(text: str, spans) -> str:
+    """Рендеринг по интервалам, как в клиенте Streamlit"""
+    parts = []
+    position = 0
+    for start, end, op in spans:
+        parts.append(text[position:start])
+        style = DELETED_STYLE if op == "-" else INSERTED_STYLE
+        parts.append(f'<span style="{style}">{text[start:end]}</span>')
+        position = end
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def build_changes(count: int, words: int, edit_rate: float, seed: int):
+    rng = random.Random(seed)
+    analyzer = DiffAnalyzer()
+    changes = []
+    for number in range(1, count + 1):
+        original = f"{number}. " + " ".join(generate_clause(rng, words))
+        modified = f"{number}. " + " ".join(mutate_clause(rng, original.split()[1:], edit_rate))
+        changes.append(analyzer._modification_change(
+            {"number": f"{number}.", "full_text": original},
+            {"number": f"{number}.", "full_text": modified},
+            number, "Документ", include_markup=True
+        ))
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Highlight payload benchmark")
+    parser.add_argument("--changes", type=int, default=300)
+    parser.add_argument("--words", type=int, default=120)
+    parser.add_argument("--edit-rate", type=float, default=0.15)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    changes = build_changes(args.changes, args.words, args.edit_rate, args.seed)
+
+    markup_payload = [{
+        "originalText": c.original_text,
+        "modifiedText": c.modified_text,
+        "highlightedOriginal": c.highlighted_original,
+        "highlightedModified": c.highlighted_modified,
+    } for c in changes]
+    spans_payload = [{
+        "originalText": c.original_text,
+        "modifiedText": c.modified_text,
+        "originalSpans": c.original_spans,
+        "modifiedSpans": c.modified_spans,
+    } for c in changes]
+
+    markup_bytes = len(json.dumps(markup_payload, ensure_ascii=False).encode("utf-8"))
+    spans_bytes = len(json.dumps(spans_payload, ensure_ascii=False).encode("utf-8"))
+
+    start = time.perf_counter()
+    for c in changes:
+        render_markup(c.highlighted_original)
+        render_markup(c.highlighted_modified)
+    markup_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for c in changes:
+        render_spans(c.original_text, c.original_spans)
+        render_spans(c.modified_text, c.modified_spans)
+    spans_ms = (time.perf_counter() - start) * 1000
+
+    print(f"changes: {len(changes)}")
+    print(f"{'format':>8} {'bytes':>10} {'render ms':>10}")
+    print(f"{'markup':>8} {markup_bytes:>10} {markup_ms:>10.2f}")
+    print(f"{'spans':>8} {spans_bytes:>10} {spans_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
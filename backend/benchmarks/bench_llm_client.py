@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест клиента LLM на локальной заглушке OpenAI-совместимого API.
+
+Заглушка (benchmarks.llm_stub) запускается в отдельном процессе и отвечает
+на /chat/completions с заданной задержкой. Сравниваются:
+    - executor: синхронный OpenAI в run_in_executor (прежняя реализация);
+    - async: LLMAnalyzer с AsyncOpenAI и общим пулом соединений httpx.
+Выводит пропускную способность, задержки и число потоков после прогрева
+и пиковое число потоков во время замера.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_llm_client --calls 2000 --in-flight 200 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+
+from benchmarks.llm_stub import STUB_HOST, STUB_PORT, run_stub
+
+
+class ThreadSampler:
+    """Периодически замеряет число потоков процесса"""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+async def run_calls(call, calls: int, in_flight: int):
+    semaphore = asyncio.Semaphore(in_flight)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return time.perf_counter() - start, latencies
+
+
+def report(mode: str, calls: int, elapsed: float, latencies, threads_before: int, threads_peak: int):
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{mode:>9} {calls / elapsed:>10.1f} {statistics.median(latencies) * 1000:>9.1f} "
+          f"{p95 * 1000:>9.1f} {threads_before:>8} {threads_peak:>8}")
+
+
+async def bench_executor(base_url: str, calls: int, in_flight: int):
+    from openai import OpenAI
+
+    client = OpenAI(api_key="stub", base_url=base_url, max_retries=0)
+    loop = asyncio.get_running_loop()
+
+    def sync_request():
+        return client.chat.completions.create(
+            model="stub", messages=[{"role": "user", "content": "prompt"}]
+        )
+
+    async def call():
+        await loop.run_in_executor(None, sync_request)
+
+    # Прогрев: соединения открыты, пул потоков создан
+    await run_calls(call, in_flight, in_flight)
+    threads_before = threading.active_count()
+    with ThreadSampler() as sampler:
+        elapsed, latencies = await run_calls(call, calls, in_flight)
+    report("executor", calls, elapsed, latencies, threads_before, sampler.peak)
+    client.close()
+
+
+async def bench_async(calls: int, in_flight: int):
+    from app.services.llm_analyzer import LLMAnalyzer
+
+    analyzer = LLMAnalyzer()
+    change = SimpleNamespace(
+        original_text="1. Лизинговый платеж 100 000 руб.",
+        modified_text="1. Лизинговый платеж 150 000 руб.",
+        context="Документ, подпункт 1.",
+    )
+
+    async def call():
+        await analyzer.analyze_change(change, [])
+
+    # Прогрев: соединения пула открыты (разрешение адреса при подключении
+    # выполняется в стандартном исполнителе asyncio)
+    await run_calls(call, in_flight, in_flight)
+    threads_before = threading.active_count()
+    with ThreadSampler() as sampler:
+        elapsed, latencies = await run_calls(call, calls, in_flight)
+    report("async", calls, elapsed, latencies, threads_before, sampler.peak)
+    await analyzer.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM client load test")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--in-flight", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=STUB_PORT)
+    args = parser.parse_args()
+
+    base_url = f"http://{STUB_HOST}:{args.port}/v1"
+    # Настройки приложения читаются при импорте LLMAnalyzer
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    # Одинаковые запросы не должны обслуживаться из кэша ответов
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    # Квота провайдера в заглушке задается через Faults
+    os.environ["LLM_RATE_LIMIT_REQUESTS"] = "0"
+    for name in ("POSTGRES_HOST", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB"):
+        os.environ.setdefault(name, "stub")
+    os.environ.setdefault("UPLOAD_PATH", "/tmp/oozo-bench/uploads")
+    os.environ.setdefault("LOG_FILE", "/tmp/oozo-bench/logs/app.log")
+
+    stub = multiprocessing.Process(target=run_stub, args=(args.port, args.latency), daemon=True)
+    stub.start()
+    time.sleep(0.5)
+    try:
+        print(f"{args.calls} calls, {args.in_flight} in flight, stub latency {args.latency * 1000:.0f} ms")
+        print(f"{'mode':>9} {'calls/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'threads':>8} {'peak':>8}")
+        asyncio.run(bench_executor(base_url, args.calls, args.in_flight))
+        asyncio.run(bench_async(args.calls, args.in_flight))
+    finally:
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Проверка устойчивости клиента LLM на заглушке с внедряемыми сбоями.
+
+Каждый сценарий запускает заглушку benchmarks.llm_stub с заданными сбоями
+и сравнивает LLMAnalyzer без механизма устойчивости и с ним:
+    - errors: 20% ответов 503 - доля результатов-заглушек без повторов и с ними;
+    - tail: 5% ответов в 40 раз медленнее - задержки без дублирующих запросов
+      и с ними;
+    - outage: сервис перестает отвечать на 6 секунд - время ожидания
+      неудачных вызовов без автоматического выключателя и с ним, доля
+      изменений, отложенных для повторного анализа.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_llm_resilience
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from types import SimpleNamespace
+
+from benchmarks.bench_llm_client import run_calls
+from benchmarks.llm_stub import STUB_HOST, Faults, run_stub
+
+READ_TIMEOUT = 1.0
+
+
+def configure_environment(port: int):
+    # Настройки приложения читаются при импорте LLMAnalyzer
+    os.environ["OPENAI_BASE_URL"] = f"http://{STUB_HOST}:{port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    for name in ("POSTGRES_HOST", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB"):
+        os.environ.setdefault(name, "stub")
+    os.environ.setdefault("UPLOAD_PATH", "/tmp/oozo-bench/uploads")
+    os.environ.setdefault("LOG_FILE", "/tmp/oozo-bench/logs/app.log")
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    # Квота провайдера в заглушке задается через Faults
+    os.environ["LLM_RATE_LIMIT_REQUESTS"] = "0"
+    os.environ["LLM_READ_TIMEOUT"] = str(READ_TIMEOUT)
+    # Сценарии сравнивают обычные запросы; потоковый режим - в bench_llm_streaming
+    os.environ["LLM_STREAMING_ENABLED"] = "false"
+
+
+def make_analyzer(attempts: int, hedge: bool, failure_threshold: int, recovery_timeout: float = 2.0):
+    from app.services.llm_analyzer import LLMAnalyzer
+    from app.services.llm_resilience import CircuitBreaker, ResilientCaller
+
+    analyzer = LLMAnalyzer()
+    analyzer.resilience = ResilientCaller(
+        CircuitBreaker(failure_threshold, recovery_timeout),
+        attempts=attempts, base_delay=0.05, max_delay=0.5,
+        hedge_enabled=hedge, hedge_min_delay=0.05,
+    )
+    return analyzer
+
+
+CHANGE = SimpleNamespace(
+    original_text="1. Лизинговый платеж 100 000 руб.",
+    modified_text="1. Лизинговый платеж 150 000 руб.",
+    context="Документ, подпункт 1.",
+)
+
+
+async def analyze_calls(analyzer, calls: int, in_flight: int):
+    results = []
+
+    async def call():
+        results.append(await analyzer.analyze_change(CHANGE, []))
+
+    elapsed, latencies = await run_calls(call, calls, in_flight)
+    await analyzer.aclose()
+    return elapsed, sorted(latencies), results
+
+
+def quantile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)] * 1000
+
+
+def with_stub(port: int, faults: Faults, scenario):
+    stub = multiprocessing.Process(target=run_stub, args=(port, 0.05, faults), daemon=True)
+    stub.start()
+    time.sleep(0.5)
+    try:
+        return asyncio.run(scenario())
+    finally:
+        stub.terminate()
+        stub.join()
+
+
+def errors_scenario(port: int, calls: int):
+    print("errors: 20% of responses are 503")
+    print(f"{'client':>22} {'failed':>8} {'p95 ms':>9}")
+    for label, attempts in (("no retries", 1), ("3 attempts + backoff", 3)):
+        async def scenario():
+            return await analyze_calls(make_analyzer(attempts, False, 10 ** 6), calls, 20)
+        _, latencies, results = with_stub(port, Faults(error_rate=0.2), scenario)
+        failed = sum(1 for result in results if result.failed) / len(results)
+        print(f"{label:>22} {failed:>8.1%} {quantile(latencies, 0.95):>9.1f}")
+
+
+def tail_scenario(port: int, calls: int):
+    print("tail: 5% of responses take 2 s instead of 50 ms")
+    print(f"{'client':>22} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label, hedge in (("no hedging", False), ("hedging after p95", True)):
+        async def scenario():
+            analyzer = make_analyzer(1, hedge, 10 ** 6)
+            # Прогрев: накопление задержек для оценки p95
+            await run_calls(lambda: analyzer.analyze_change(CHANGE, []), 100, 10)
+            return await analyze_calls(analyzer, calls, 10)
+        _, latencies, _ = with_stub(port, Faults(slow_rate=0.05, slow_latency=2.0), scenario)
+        print(f"{label:>22} {quantile(latencies, 0.5):>9.1f} {quantile(latencies, 0.95):>9.1f} "
+              f"{quantile(latencies, 0.99):>9.1f}")
+
+
+def outage_scenario(port: int):
+    print(f"outage: no responses from 2 s to 8 s (client read timeout {READ_TIMEOUT:.0f} s)")
+    print(f"{'client':>22} {'pending':>8} {'wait on failed call ms':>23} {'total s':>8}")
+    for label, threshold in (("retries only", 10 ** 6), ("circuit breaker", 3)):
+        async def scenario():
+            analyzer = make_analyzer(3, False, threshold)
+            results, waits, tasks = [], [], []
+            started = time.monotonic()
+            # Поток по 10 вызовов в секунду в течение 12 секунд
+            while time.monotonic() - started < 12:
+                async def call():
+                    start = time.monotonic()
+                    result = await analyzer.analyze_change(CHANGE, [])
+                    results.append(result)
+                    if result.failed:
+                        waits.append(time.monotonic() - start)
+                tasks.append(asyncio.ensure_future(call()))
+                await asyncio.sleep(0.1)
+            await asyncio.gather(*tasks)
+            await analyzer.aclose()
+            return results, waits, time.monotonic() - started
+        results, waits, total = with_stub(port, Faults(hang_from=2.0, hang_until=8.0), scenario)
+        pending = sum(1 for result in results if result.pending_reanalysis)
+        mean_wait = sum(waits) / len(waits) * 1000 if waits else 0.0
+        print(f"{label:>22} {pending:>8} {mean_wait:>23.1f} {total:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM client resilience check")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--scenario", choices=["errors", "tail", "outage"], nargs="+",
+                        default=["errors", "tail", "outage"])
+    args = parser.parse_args()
+
+    configure_environment(args.port)
+    # Каждый сбой логируется сервисом; в отчете нужны только итоги
+    logging.disable(logging.CRITICAL)
+    if "errors" in args.scenario:
+        errors_scenario(args.port, args.calls)
+    if "tail" in args.scenario:
+        tail_scenario(args.port, args.calls)
+    if "outage" in args.scenario:
+        outage_scenario(args.port)
+
+
+if __name__ == "__main__":
+    main()
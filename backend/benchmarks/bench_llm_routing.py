@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Маршрутизация изменений между малой и большой моделью на заглушке.
+
+Заглушка benchmarks.llm_stub отвечает большой модели с задержкой --large-latency,
+малой - с задержкой --small-latency, и доля --unsure ответов малой модели
+имеет низкую уверенность. Изменения: --low-risk доля редакционных правок
+подпунктов без изменения сумм и сроков, остальные - изменения лизингового
+платежа (изменения фактов и предварительная оценка критичности - как
+у DiffAnalyzer). Сравниваются:
+    - large: все изменения анализирует большая модель;
+    - routed: таблица моделей app/core/model_tiers.yaml с эскалацией.
+Выводит общее время, среднее время анализа редакционных правок и
+изменений платежа, число запросов к каждой модели и число эскалаций
+из метрик llm_model_*.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_llm_routing
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import random
+import time
+from types import SimpleNamespace
+
+from benchmarks.bench_llm_client import run_calls
+from benchmarks.llm_stub import ModelProfile, run_stub
+from benchmarks.bench_llm_resilience import configure_environment
+
+LARGE_MODEL = "qwen3:32b"
+SMALL_MODEL = "qwen3:8b"
+
+
+def make_changes(rng, count: int, low_risk: float):
+    from app.services.diff_analyzer import DiffAnalyzer
+    from app.services.fact_extractor import diff_facts, fact_extractor, severity_score
+
+    diff_analyzer = DiffAnalyzer()
+    changes = []
+    for number in range(count):
+        if rng.random() < low_risk:
+            original = (f"{number + 1}. Лизингополучатель обязан уведомить Лизингодателя "
+                        f"об изменении своих реквизитов в письменной форме.")
+            modified = original.replace("в письменной форме", "письменно")
+        else:
+            amount = rng.randrange(100, 900) * 1000
+            original = f"{number + 1}. Ежемесячный лизинговый платеж составляет {amount:,} руб.".replace(",", " ")
+            modified = original.replace(f"{amount:,}".replace(",", " "),
+                                        f"{amount * 3 // 2:,}".replace(",", " "))
+        original_spans, modified_spans = diff_analyzer.change_detail(original, modified)
+        fact_deltas = diff_facts(fact_extractor.extract(original), fact_extractor.extract(modified))
+        changes.append(SimpleNamespace(
+            change_type="modification", original_text=original, modified_text=modified,
+            original_spans=list(original_spans), modified_spans=list(modified_spans),
+            fact_deltas=fact_deltas, severity_score=severity_score(fact_deltas),
+            context=f"Договор лизинга, подпункт {number + 1}",
+        ))
+    return changes
+
+
+def model_samples():
+    from prometheus_client import REGISTRY
+
+    calls = {
+        model: REGISTRY.get_sample_value('llm_model_request_duration_seconds_count', {'model': model}) or 0.0
+        for model in (LARGE_MODEL, SMALL_MODEL)
+    }
+    escalations = REGISTRY.get_sample_value(
+        'llm_model_escalations_total', {'from_model': SMALL_MODEL, 'to_model': LARGE_MODEL}
+    ) or 0.0
+    return calls, escalations
+
+
+async def scenario(routed: bool, changes, in_flight: int):
+    from app.core.config import settings
+    from app.services.llm_analyzer import LLMAnalyzer
+
+    settings.LLM_ROUTING_ENABLED = routed
+    analyzer = LLMAnalyzer()
+    pending = list(changes)
+    latencies = {True: [], False: []}
+
+    async def call():
+        change = pending.pop()
+        start = time.perf_counter()
+        await analyzer.analyze_change(change, [])
+        latencies[not change.fact_deltas].append(time.perf_counter() - start)
+
+    calls_before, escalations_before = model_samples()
+    elapsed, _ = await run_calls(call, len(changes), in_flight)
+    await analyzer.aclose()
+    calls, escalations = model_samples()
+    return (
+        elapsed,
+        {low_risk: sum(values) / len(values) for low_risk, values in latencies.items()},
+        {model: int(calls[model] - calls_before[model]) for model in calls},
+        int(escalations - escalations_before),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM model routing check")
+    parser.add_argument("--changes", type=int, default=300)
+    parser.add_argument("--low-risk", type=float, default=0.7)
+    parser.add_argument("--in-flight", type=int, default=16)
+    parser.add_argument("--large-latency", type=float, default=0.6)
+    parser.add_argument("--small-latency", type=float, default=0.1)
+    parser.add_argument("--unsure", type=float, default=0.15)
+    parser.add_argument("--port", type=int, default=8770)
+    args = parser.parse_args()
+
+    configure_environment(args.port)
+    logging.disable(logging.CRITICAL)
+
+    changes = make_changes(random.Random(42), args.changes, args.low_risk)
+    models = {
+        LARGE_MODEL: ModelProfile(args.large_latency),
+        SMALL_MODEL: ModelProfile(args.small_latency, args.unsure),
+    }
+    print(f"{args.changes} changes ({args.low_risk:.0%} wording edits), {args.in_flight} in flight, "
+          f"large model {args.large_latency * 1000:.0f} ms, small model {args.small_latency * 1000:.0f} ms "
+          f"with {args.unsure:.0%} unsure answers")
+    print(f"{'mode':>7} {'total s':>8} {'edit s':>7} {'payment s':>10} "
+          f"{'large calls':>12} {'small calls':>12} {'escalations':>12}")
+    stub = multiprocessing.Process(target=run_stub, args=(args.port, args.large_latency),
+                                   kwargs={"models": models}, daemon=True)
+    stub.start()
+    time.sleep(0.5)
+    try:
+        for label, routed in (("large", False), ("routed", True)):
+            elapsed, latencies, calls, escalations = asyncio.run(scenario(routed, changes, args.in_flight))
+            print(f"{label:>7} {elapsed:>8.2f} {latencies[True]:>7.2f} {latencies[False]:>10.2f} "
+                  f"{calls[LARGE_MODEL]:>12} {calls[SMALL_MODEL]:>12} {escalations:>12}")
+    finally:
+        stub.terminate()
+        stub.join()
+
+
+if __name__ == "__main__":
+    main()
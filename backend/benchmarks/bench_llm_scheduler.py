@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Проверка планировщика запросов к LLM на заглушке с квотами провайдера.
+
+Заглушка benchmarks.llm_stub ограничивает запросы и токены в минуту (ведра
+с непрерывным пополнением) и число одновременных запросов; сверх квоты
+отвечает 429 с Retry-After. Несколько анализов одновременно отправляют
+поток вызовов, сравниваются:
+    - rate: квота запросов и токенов; прежнее поведение (LLM_MAX_CONNECTIONS
+      слотов) против ведер запросов и токенов по квоте;
+    - concurrency: квота одновременных запросов; фиксированные слоты против
+      адаптивного предела (AIMD).
+Выводит число ответов 429, долю отложенных изменений, пропускную
+способность и итоговый предел одновременных запросов.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_llm_scheduler
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import time
+
+from benchmarks.bench_llm_client import run_calls
+from benchmarks.llm_stub import Faults, run_stub
+from benchmarks.bench_llm_resilience import CHANGE, configure_environment
+
+
+def make_analyzer(faults: Faults, buckets: bool, adaptive: bool):
+    from app.core.config import settings
+    from app.services.llm_analyzer import LLMAnalyzer
+    from app.services.llm_resilience import CircuitBreaker, ResilientCaller
+    from app.services.llm_scheduler import AdaptiveConcurrencyLimiter, LLMScheduler, TokenBucket
+
+    analyzer = LLMAnalyzer()
+    analyzer.resilience = ResilientCaller(
+        CircuitBreaker(10 ** 6, 1.0), attempts=3, base_delay=0.05, max_delay=0.5
+    )
+    rate = 1 / faults.quota_window
+    analyzer.scheduler = LLMScheduler(
+        AdaptiveConcurrencyLimiter(
+            initial=settings.LLM_INITIAL_CONCURRENCY, minimum=1,
+            maximum=settings.LLM_MAX_CONNECTIONS, tolerance=2.0, adaptive=adaptive,
+        ),
+        requests=TokenBucket(faults.quota_requests, faults.quota_requests * rate) if buckets else None,
+        tokens=TokenBucket(faults.quota_tokens, faults.quota_tokens * rate) if buckets else None,
+    )
+    return analyzer
+
+
+def rate_limited_responses() -> float:
+    from prometheus_client import REGISTRY
+
+    return REGISTRY.get_sample_value('llm_retries_total', {'error': 'RateLimitError'}) or 0.0
+
+
+def run_scenario(args, faults: Faults, configs):
+    print(f"{'scheduler':>16} {'429s':>6} {'pending':>8} {'calls/s':>8} {'p95 s':>7} {'limit':>6}")
+    for label, buckets, adaptive in configs:
+        stub = multiprocessing.Process(target=run_stub, args=(args.port, 0.05, faults), daemon=True)
+        stub.start()
+        time.sleep(0.5)
+        try:
+            async def scenario():
+                analyzer = make_analyzer(faults, buckets, adaptive)
+                results = []
+
+                async def call():
+                    results.append(await analyzer.analyze_change(CHANGE, []))
+
+                rejected_before = rate_limited_responses()
+                elapsed, latencies = await run_calls(call, args.calls, args.in_flight)
+                await analyzer.aclose()
+                return (results, elapsed, sorted(latencies),
+                        rate_limited_responses() - rejected_before, int(analyzer.scheduler.limiter.limit))
+
+            results, elapsed, latencies, rejected, limit = asyncio.run(scenario())
+        finally:
+            stub.terminate()
+            stub.join()
+        pending = sum(1 for result in results if result.pending_reanalysis) / len(results)
+        p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+        print(f"{label:>16} {rejected:>6.0f} {pending:>8.1%} {len(results) / elapsed:>8.1f} "
+              f"{p95:>7.1f} {limit:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM scheduler check against a quota-enforcing stub")
+    parser.add_argument("--calls", type=int, default=600)
+    parser.add_argument("--in-flight", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    configure_environment(args.port)
+    logging.disable(logging.CRITICAL)
+
+    faults = Faults(quota_requests=120, quota_tokens=120000, quota_window=5.0)
+    print(f"\nrate: {args.calls} calls from {args.in_flight} callers, quota "
+          f"{faults.quota_requests} requests / {faults.quota_tokens} tokens per {faults.quota_window:.0f} s")
+    run_scenario(args, faults, (("fixed", False, False), ("buckets", True, False)))
+
+    faults = Faults(quota_requests=10 ** 6, quota_tokens=10 ** 9, quota_window=5.0, quota_concurrency=12)
+    print(f"\nconcurrency: {args.calls} calls from {args.in_flight} callers, "
+          f"at most {faults.quota_concurrency} concurrent requests")
+    run_scenario(args, faults, (("fixed", False, False), ("AIMD", False, True)))
+
+
+if __name__ == "__main__":
+    main()
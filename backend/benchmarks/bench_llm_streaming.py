@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Потоковый разбор ответа LLM на заглушке с генерацией по фрагментам.
+
+Заглушка benchmarks.llm_stub генерирует ответ фрагментами по 4 символа
+с задержкой --token-delay; ответ содержит длинное обоснование и текст после
+всех полей. Сравниваются:
+    - buffered: обычный запрос, результат после генерации всего ответа;
+    - stream: потоковый запрос, поток закрывается, как только получены все поля;
+    - stream + cap: то же с ограничением обоснования
+      LLM_STREAM_REASONING_MAX_CHARS.
+Выводит среднее время до комментария, служб и критичности (из частичных
+результатов), среднее время до итогового результата и длину обоснования
+в нем.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_llm_streaming
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+
+from benchmarks.bench_llm_client import run_calls
+from benchmarks.llm_stub import STREAM_CHUNK_CHARS, STREAM_CONTENT, run_stub
+from benchmarks.bench_llm_resilience import CHANGE, configure_environment
+
+LATENCY = 0.2
+
+
+async def scenario(streaming: bool, reasoning_cap: int, calls: int, in_flight: int):
+    from app.core.config import settings
+    from app.services.llm_analyzer import LLMAnalyzer
+
+    settings.LLM_STREAMING_ENABLED = streaming
+    settings.LLM_STREAM_REASONING_MAX_CHARS = reasoning_cap
+    analyzer = LLMAnalyzer()
+    first_fields, reasoning = [], []
+
+    async def call():
+        start = time.perf_counter()
+        marks = []
+
+        def on_update(result):
+            if not marks and result.severity != "medium" and result.required_services != ["Общий анализ"]:
+                marks.append(time.perf_counter() - start)
+
+        result = await analyzer.analyze_change(CHANGE, [], on_update=on_update)
+        # Без потока поля доступны только вместе с итоговым результатом
+        first_fields.append(marks[0] if marks else time.perf_counter() - start)
+        reasoning.append(len(result.reasoning))
+
+    elapsed, latencies = await run_calls(call, calls, in_flight)
+    await analyzer.aclose()
+    return (sum(first_fields) / len(first_fields), sum(latencies) / len(latencies),
+            sum(reasoning) // len(reasoning))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming LLM response parsing")
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--in-flight", type=int, default=8)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--reasoning-cap", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8769)
+    args = parser.parse_args()
+
+    configure_environment(args.port)
+    # Обычный запрос ждет генерации всего ответа
+    os.environ["LLM_READ_TIMEOUT"] = "30"
+    logging.disable(logging.CRITICAL)
+
+    chunks = -(-len(STREAM_CONTENT) // STREAM_CHUNK_CHARS)
+    generation = LATENCY + chunks * args.token_delay
+    print(f"{args.calls} calls, {args.in_flight} in flight, {chunks} chunks of "
+          f"{STREAM_CHUNK_CHARS} characters, full completion {generation:.2f} s")
+    print(f"{'mode':>13} {'fields s':>9} {'result s':>9} {'reasoning chars':>16}")
+    stub = multiprocessing.Process(
+        target=run_stub, args=(args.port, LATENCY, None, args.token_delay), daemon=True
+    )
+    stub.start()
+    time.sleep(0.5)
+    try:
+        for label, streaming, cap in (
+            ("buffered", False, 0),
+            ("stream", True, 0),
+            ("stream + cap", True, args.reasoning_cap),
+        ):
+            fields, result, reasoning = asyncio.run(scenario(streaming, cap, args.calls, args.in_flight))
+            print(f"{label:>13} {fields:>9.2f} {result:>9.2f} {reasoning:>16}")
+    finally:
+        stub.terminate()
+        stub.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Проверка справедливой очереди запросов к LLM на заглушке.
+
+Большой пакетный анализ ставит в очередь --large изменений со случайной
+предварительной оценкой критичности; через полсекунды приходит небольшой
+интерактивный анализ из --small изменений. Сравниваются:
+    - shared: все запросы в одном общем потоке, как без указания анализа;
+    - fair: запросы под своими анализами и классами приоритета.
+Выводит время выполнения небольшого анализа, среднюю позицию (0 - первым,
+1 - последним) самых критичных 10% изменений большого анализа и среднее
+время ожидания в очереди по классам из гистограммы llm_queue_wait_seconds.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_llm_work_queue
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import random
+import time
+from types import SimpleNamespace
+
+from benchmarks.llm_stub import run_stub
+from benchmarks.bench_llm_resilience import configure_environment
+
+SLOTS = 8
+
+
+def make_analyzer():
+    from app.services.llm_analyzer import LLMAnalyzer
+    from app.services.llm_scheduler import AdaptiveConcurrencyLimiter, LLMScheduler
+
+    analyzer = LLMAnalyzer()
+    analyzer.scheduler = LLMScheduler(AdaptiveConcurrencyLimiter(
+        initial=SLOTS, minimum=1, maximum=SLOTS, tolerance=2.0, adaptive=False,
+        queue=analyzer.work_queue,
+    ))
+    return analyzer
+
+
+def make_changes(rng, count: int, prefix: str):
+    return [
+        SimpleNamespace(
+            original_text=f"{prefix} {number}. Лизинговый платеж 100 000 руб.",
+            modified_text=f"{prefix} {number}. Лизинговый платеж 150 000 руб.",
+            context="Документ",
+            severity_score=rng.random(),
+        )
+        for number in range(count)
+    ]
+
+
+def queue_waits():
+    from prometheus_client import REGISTRY
+
+    waits = {}
+    for priority in ("interactive", "batch"):
+        total = REGISTRY.get_sample_value('llm_queue_wait_seconds_sum', {'priority': priority}) or 0.0
+        count = REGISTRY.get_sample_value('llm_queue_wait_seconds_count', {'priority': priority}) or 0.0
+        waits[priority] = (total, count)
+    return waits
+
+
+async def scenario(fair: bool, large: int, small: int):
+    from app.services.llm_work_queue import BATCH, INTERACTIVE, LLMJob
+
+    rng = random.Random(42)
+    analyzer = make_analyzer()
+    large_changes = make_changes(rng, large, "Пакет")
+    small_changes = make_changes(rng, small, "Интерактив")
+    large_job = LLMJob("large", BATCH) if fair else None
+    small_job = LLMJob("small", INTERACTIVE) if fair else None
+    completed = []
+
+    async def analyze(change, job):
+        await analyzer.analyze_change(change, [], job)
+        completed.append(change)
+
+    waits_before = queue_waits()
+    large_task = asyncio.gather(*(analyze(change, large_job) for change in large_changes))
+    await asyncio.sleep(0.5)
+    start = time.monotonic()
+    await asyncio.gather(*(analyze(change, small_job) for change in small_changes))
+    small_time = time.monotonic() - start
+    await large_task
+    await analyzer.aclose()
+
+    order = [change for change in completed if change in large_changes]
+    top = sorted(large_changes, key=lambda change: -change.severity_score)[:max(large // 10, 1)]
+    positions = {id(change): number / (len(order) - 1) for number, change in enumerate(order)}
+    top_position = sum(positions[id(change)] for change in top) / len(top)
+
+    waits = {}
+    for priority, (total, count) in queue_waits().items():
+        total_before, count_before = waits_before[priority]
+        if count > count_before:
+            waits[priority] = (total - total_before) / (count - count_before)
+    return small_time, top_position, waits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fair LLM work queue check")
+    parser.add_argument("--large", type=int, default=500)
+    parser.add_argument("--small", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    configure_environment(args.port)
+    logging.disable(logging.CRITICAL)
+
+    print(f"{args.large}-change batch analysis, {args.small}-change interactive analysis "
+          f"0.5 s later, {SLOTS} slots, 50 ms per request")
+    print(f"{'queue':>6} {'small analysis s':>17} {'top 10% severity position':>26} "
+          f"{'wait interactive s':>19} {'wait batch s':>13}")
+    for label, fair in (("shared", False), ("fair", True)):
+        stub = multiprocessing.Process(target=run_stub, args=(args.port, 0.05), daemon=True)
+        stub.start()
+        time.sleep(0.5)
+        try:
+            small_time, top_position, waits = asyncio.run(scenario(fair, args.large, args.small))
+        finally:
+            stub.terminate()
+            stub.join()
+        interactive = f"{waits['interactive']:.2f}" if "interactive" in waits else "-"
+        batch = f"{waits['batch']:.2f}" if "batch" in waits else "-"
+        print(f"{label:>6} {small_time:>17.2f} {top_position:>26.2f} {interactive:>19} {batch:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Сравнение размера промптов до и после компилятора промптов.
+
+Синтетические изменения: короткие подпункты (30-80 слов, 10% правок) и
+длинные (800-3000 слов, несколько правок в одном месте), по пять
+нормативных документов на изменение, как их возвращает RegulatoryMatcher.
+Прежние промпты собираются копией прежних шаблонов. Выводит оценку токенов
+(новой оценкой для обоих вариантов) для одиночных и пакетных промптов и
+время оценки токенов.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_prompt_compiler
+"""
+
+import argparse
+import os
+import random
+import time
+from types import SimpleNamespace
+
+from benchmarks.bench_word_diff import generate_clause, mutate_clause
+
+for name in ("OPENAI_API_KEY", "POSTGRES_HOST", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB"):
+    os.environ.setdefault(name, "stub")
+os.environ.setdefault("UPLOAD_PATH", "/tmp/oozo-bench/uploads")
+os.environ.setdefault("LOG_FILE", "/tmp/oozo-bench/logs/app.log")
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+from app.services.diff_analyzer import DiffAnalyzer  # noqa: E402
+from app.services.llm_analyzer import SERVICES_LIST, LLMAnalyzer  # noqa: E402
+from app.services.prompt_compiler import estimate_tokens  # noqa: E402
+
+LEGACY_SERVICES_LIST = """ЮрУ - юридическое управление,
+                    ДСКБ - Департамент сопровождения клиентов и бизнеса,
+                    ПА - проблемные активы,
+                    ФС - финансовая служба,
+                    УСДС - управление страхования,
+                    РД/УБУ - управление бухгалтерского учета,
+                    КД - кредитный департамент."""
+
+
+def legacy_regulations_context(regulations):
+    context = "Релевантные нормативные документы:\n"
+    for reg in regulations:
+        context += f"- {reg.get('title', 'Без названия')}: {reg.get('content', '')[:200]}...\n"
+    return context
+
+
+def legacy_analysis_prompt(change, regulations_context):
+    return f"""
+            Проанализируйте изменение в документе и определите необходимые согласования.
+            \nКОНТЕКСТ ИЗМЕНЕНИЯ: {change.context}
+
+            ИСХОДНЫЙ ТЕКСТ:
+            {change.original_text}
+
+            РЕДАКЦИЯ ЛИЗИНГОПОЛУЧАТЕЛЯ:
+            {change.modified_text}
+
+            НОРМАТИВНАЯ БАЗА:
+            {regulations_context}
+
+            Пожалуйста, предоставьте анализ в следующем формате:
+            КОММЕНТАРИЙ: [Краткое описание изменения и его последствий]
+            СОГЛАСОВАНИЯ: [Список необходимых служб через запятую, надо выбрать из списка:
+                    {LEGACY_SERVICES_LIST}
+                    В ответе должны быть только названия служб, без пробелов и других символов и без описания]
+            КРИТИЧНОСТЬ: [low/medium/high]
+            УВЕРЕННОСТЬ: [число от 0 до 1]
+            ОБОСНОВАНИЕ: [Подробное объяснение решения. Объясни что и почему нужно проверить]
+            """
+
+
+def legacy_batch_prompt(changes, regulations_context):
+    blocks = "".join(f"""
+            ИЗМЕНЕНИЕ {k + 1}\nКОНТЕКСТ ИЗМЕНЕНИЯ: {change.context}
+            ИСХОДНЫЙ ТЕКСТ:
+            {change.original_text}
+            РЕДАКЦИЯ ЛИЗИНГОПОЛУЧАТЕЛЯ:
+            {change.modified_text}
+            """ for k, change in enumerate(changes))
+    return f"""
+            Проанализируйте каждое изменение в документе и определите необходимые согласования.
+
+            НОРМАТИВНАЯ БАЗА:
+            {regulations_context}
+
+            {blocks}
+
+            Ответ дайте только в виде JSON-массива, по одному объекту на каждое изменение, без текста вне массива:
+            [{{"id": "номер изменения", "comment": "краткое описание изменения и его последствий",
+              "services": ["службы из списка"], "severity": "low/medium/high",
+              "confidence": число от 0 до 1, "reasoning": "что и почему нужно проверить"}}]
+            Службы для согласования (только сокращенные названия):
+                    {LEGACY_SERVICES_LIST}
+            """
+
+
+def local_edit(rng, words):
+    """Две-три правки в пределах одного предложения длинного подпункта"""
+    words = list(words)
+    position = rng.randrange(len(words) - 20)
+    for offset in rng.sample(range(20), rng.randint(2, 3)):
+        words[position + offset] = f"правка{rng.randrange(1000)}"
+    return words
+
+
+def make_changes(rng, count: int, long_share: float):
+    diff_analyzer = DiffAnalyzer()
+    changes = []
+    for number in range(count):
+        if rng.random() < long_share:
+            original = generate_clause(rng, rng.randint(800, 3000))
+            modified = local_edit(rng, original)
+        else:
+            original = generate_clause(rng, rng.randint(30, 80))
+            modified = mutate_clause(rng, original, 0.1)
+        original_text, modified_text = " ".join(original), " ".join(modified)
+        original_spans, modified_spans = diff_analyzer.change_detail(original_text, modified_text)
+        changes.append(SimpleNamespace(
+            original_text=original_text, modified_text=modified_text,
+            original_spans=list(original_spans), modified_spans=list(modified_spans),
+            context=f"Договор лизинга, подпункт {number + 1}",
+        ))
+    return changes
+
+
+def make_regulations(rng):
+    return [
+        {
+            'id': str(number),
+            'title': f"Регламент {number}",
+            'content': " ".join(generate_clause(rng, 60))[:200] + '...',
+        }
+        for number in range(5)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt compiler token savings")
+    parser.add_argument("--changes", type=int, default=200)
+    parser.add_argument("--long-share", type=float, default=0.3)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    analyzer = LLMAnalyzer()
+    changes = make_changes(rng, args.changes, args.long_share)
+    regulations = make_regulations(rng)
+    long_changes = [change for change in changes if len(change.original_text.split()) >= 800]
+    short_changes = [change for change in changes if len(change.original_text.split()) < 800]
+
+    print(f"{args.changes} changes ({len(long_changes)} long clauses), 5 regulations per change")
+    print(f"{'prompt':>22} {'legacy tokens':>14} {'compiled tokens':>16} {'saved':>7}")
+    rows = (
+        ("single, short clause", short_changes),
+        ("single, long clause", long_changes),
+    )
+    for label, group in rows:
+        legacy = sum(
+            estimate_tokens(legacy_analysis_prompt(change, legacy_regulations_context(regulations)))
+            for change in group
+        )
+        compiled = sum(
+            estimate_tokens(analyzer._create_analysis_prompt(
+                change, analyzer._create_regulations_context(regulations)
+            ))
+            for change in group
+        )
+        print(f"{label:>22} {legacy:>14} {compiled:>16} {1 - compiled / legacy:>7.1%}")
+
+    legacy = compiled = 0
+    for start in range(0, len(short_changes), args.batch):
+        batch = short_changes[start:start + args.batch]
+        legacy += estimate_tokens(legacy_batch_prompt(batch, legacy_regulations_context(regulations)))
+        compiled += estimate_tokens(analyzer._create_batch_prompt(
+            [analyzer._create_change_block(str(k + 1), change) for k, change in enumerate(batch)],
+            analyzer._create_regulations_context(regulations * len(batch), budget=len(batch) * 400)
+        ))
+    print(f"{'batch of short clauses':>22} {legacy:>14} {compiled:>16} {1 - compiled / legacy:>7.1%}")
+    print(f"services list: {estimate_tokens(LEGACY_SERVICES_LIST)} -> {estimate_tokens(SERVICES_LIST)} tokens")
+
+    prompts = [legacy_analysis_prompt(change, legacy_regulations_context(regulations)) for change in changes]
+    characters = sum(len(prompt) for prompt in prompts)
+    start = time.perf_counter()
+    for prompt in prompts:
+        estimate_tokens(prompt)
+    elapsed = time.perf_counter() - start
+    print(f"estimate_tokens: {elapsed / len(prompts) * 1e6:.0f} us per prompt, "
+          f"{characters / elapsed / 1e6:.1f} M characters/s")
+
+
+if __name__ == "__main__":
+    main()
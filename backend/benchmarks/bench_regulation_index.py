@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Поиск нормативных актов по тексту изменения.
+
+Синтетические акты: заголовок и текст из общих слов договора и слов
+тематического словаря (частоты по закону Ципфа). Запросы - подпункты
+с несколькими тематическими словами. Выводит время построения индекса,
+время запроса BM25 (должно быть заметно меньше миллисекунды и почти не
+зависеть от числа актов), время добавления одного акта с пересчетом
+при следующем запросе и время прежнего перебора всех актов с подсчетом
+пересечения множеств слов.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_regulation_index --regulations 500 2000 10000
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from benchmarks.bench_word_diff import generate_clause
+from app.services.regulation_index import RegulationIndex
+
+SYLLABLES = ["ра", "но", "ти", "ве", "ло", "ми", "ска", "про", "дель", "тор", "нал", "ция"]
+
+
+def build_vocabulary(rng: random.Random, size: int) -> List[str]:
+    vocabulary = set()
+    while len(vocabulary) < size:
+        vocabulary.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(3, 5))))
+    return sorted(vocabulary)
+
+
+def topic_words(rng: random.Random, vocabulary: List[str], count: int) -> List[str]:
+    # Ципф: редкие тематические слова различают акты
+    return [vocabulary[min(int(rng.paretovariate(0.8)) - 1, len(vocabulary) - 1)] for _ in range(count)]
+
+
+def build_regulations(rng: random.Random, count: int, words: int, vocabulary: List[str]) -> List[Dict]:
+    regulations = []
+    for number in range(count):
+        title = topic_words(rng, vocabulary, 4) + generate_clause(rng, 4)
+        content = generate_clause(rng, words)
+        for word in topic_words(rng, vocabulary, words // 5):
+            content.insert(rng.randrange(len(content) + 1), word)
+        regulations.append({
+            "id": f"reg-{number}",
+            "title": " ".join(title),
+            "content": " ".join(content),
+            "category": "general",
+            "services": ["Юридическая служба"],
+        })
+    return regulations
+
+
+def legacy_search(regulations: List[Dict], text: str, limit: int) -> List[Dict]:
+    """Прежний подбор: пересечение множеств слов с каждым актом"""
+    query_words = set(text.lower().split())
+    scored = []
+    for regulation in regulations:
+        content_overlap = len(query_words & set(regulation["content"].lower().split()))
+        title_overlap = len(query_words & set(regulation["title"].lower().split()))
+        relevance = min((content_overlap + title_overlap * 2) / len(query_words), 1.0)
+        if relevance > 0.1:
+            scored.append((relevance, regulation))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [regulation for _, regulation in scored[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regulation index search")
+    parser.add_argument("--regulations", type=int, nargs="+", default=[500, 2000, 10000])
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--legacy-queries", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = build_vocabulary(rng, args.vocabulary)
+    queries = [
+        " ".join(generate_clause(rng, 30) + topic_words(rng, vocabulary, 5)) for _ in range(args.queries)
+    ]
+
+    print(f"{'regulations':>12} {'build s':>8} {'query us':>9} {'upsert us':>10} {'legacy us':>10}")
+    for count in args.regulations:
+        regulations = build_regulations(rng, count, args.words, vocabulary)
+
+        start = time.perf_counter()
+        index = RegulationIndex.build(regulations)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query, args.limit)
+        query_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+        # Изменение одного акта: повторная индексация и пересчет его терминов при запросе
+        updates = build_regulations(rng, 50, args.words, vocabulary)
+        start = time.perf_counter()
+        for k, update in enumerate(updates):
+            index.upsert({**update, "id": f"reg-{k}"})
+            index.search(queries[k % len(queries)], args.limit)
+        upsert_us = (time.perf_counter() - start) / len(updates) * 1e6 - query_us
+
+        start = time.perf_counter()
+        for query in queries[:args.legacy_queries]:
+            legacy_search(regulations, query, args.limit)
+        legacy_us = (time.perf_counter() - start) / args.legacy_queries * 1e6
+
+        print(f"{count:>12} {build_seconds:>8.2f} {query_us:>9.1f} {upsert_us:>10.1f} {legacy_us:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк индекса MinHash LSH для поиска похожих изменений.
+
+Индекс заполняется до заданного размера: первые --real изменений - сигнатуры
+синтетических пар подпунктов, остальные - случайные сигнатуры (на время
+поиска влияет только распределение ключей полос, а не происхождение
+сигнатур). Затем измеряются:
+    - время поиска (вычисление сигнатуры + запрос к индексу), p50/p99;
+    - доля найденных соседей для той же правки в подпункте, отличающемся
+      одним словом вдали от правки;
+    - доля ложных срабатываний для другой правки того же подпункта
+      и для несвязанных изменений;
+    - время добавления, сохранения и загрузки, память массивов индекса.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_semantic_cache --entries 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.semantic_cache import NUM_PERM, MinHashIndex, minhash_signature
+from benchmarks.bench_word_diff import generate_clause
+
+THRESHOLD = 0.85
+
+
+def as_change(original, modified):
+    return SimpleNamespace(
+        original_text=" ".join(original), modified_text=" ".join(modified), change_type="modification"
+    )
+
+
+def edit_clause(rng, words):
+    """Правка нескольких соседних слов в случайном месте подпункта"""
+    start = rng.randrange(len(words) - 3)
+    return words[:start] + [f"{rng.randrange(10 ** 6)}" for _ in range(rng.randint(1, 3))] + words[start + 2:]
+
+
+def make_change(rng, words: int):
+    original = generate_clause(rng, words)
+    return original, edit_clause(rng, original)
+
+
+def same_edit_elsewhere(rng, original, modified):
+    """Та же правка в подпункте, отличающемся словом в начале (название стороны)"""
+    prefix = [f"сторона{rng.randrange(10 ** 6)}"]
+    return as_change(prefix + original, prefix + modified)
+
+
+def other_edit(rng, original):
+    """Другая правка того же подпункта"""
+    return as_change(original, edit_clause(rng, original))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def timed_lookups(index, changes):
+    latencies, results = [], []
+    for change in changes:
+        start = time.perf_counter()
+        signature = minhash_signature(change)
+        nearest = index.query(signature, 0) if signature is not None else None
+        latencies.append(time.perf_counter() - start)
+        results.append(nearest)
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MinHash LSH semantic cache benchmark")
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--real", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    real_changes = [make_change(rng, args.words) for _ in range(args.real)]
+    signatures = [minhash_signature(as_change(*change)) for change in real_changes]
+    signatures = [signature for signature in signatures if signature is not None]
+    random_signatures = np.random.RandomState(args.seed).randint(
+        0, 2 ** 32, size=(args.entries - args.real, NUM_PERM), dtype=np.uint32
+    )
+
+    index = MinHashIndex("bench")
+    start = time.perf_counter()
+    for number, signature in enumerate(signatures):
+        index.add(signature, f"{number:064x}", 0)
+    for number, signature in enumerate(random_signatures, len(signatures)):
+        index.add(signature, f"{number:064x}", 0)
+    add_time = time.perf_counter() - start
+    # Массивы индекса; буфер последних добавлений в словарях не учитывается
+    memory = index._signatures.nbytes + index._keys.nbytes + sum(
+        keys.nbytes + ids.nbytes for keys, ids in zip(index._sorted_keys, index._sorted_ids)
+    )
+    print(f"index: {len(index)} changes, add {add_time / len(index) * 1e6:.1f} us/change, "
+          f"memory {memory / 1024 / 1024:.0f} MB")
+
+    sampled = [real_changes[rng.randrange(args.real)] for _ in range(args.queries)]
+    near = [same_edit_elsewhere(rng, *change) for change in sampled]
+    other = [other_edit(rng, original) for original, _ in sampled]
+    unrelated = [as_change(*make_change(rng, args.words)) for _ in range(args.queries)]
+    near_latencies, near_results = timed_lookups(index, near)
+    other_latencies, other_results = timed_lookups(index, other)
+    far_latencies, far_results = timed_lookups(index, unrelated)
+    latencies = near_latencies + other_latencies + far_latencies
+
+    found = sum(1 for result in near_results if result and result[1] >= THRESHOLD)
+    other_false = sum(1 for result in other_results if result and result[1] >= THRESHOLD)
+    false = sum(1 for result in far_results if result and result[1] >= THRESHOLD)
+    similarities = [result[1] for result in near_results if result]
+    print(f"lookup: p50 {percentile(latencies, 0.5) * 1000:.3f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.3f} ms")
+    print(f"same edit elsewhere found at >= {THRESHOLD}: {found / args.queries:.1%} "
+          f"(median similarity {percentile(similarities, 0.5):.2f}), "
+          f"other edit of the clause false hits: {other_false / args.queries:.1%}, "
+          f"unrelated false hits: {false / args.queries:.1%}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "index.npz")
+        start = time.perf_counter()
+        index.save(path)
+        save_time = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = MinHashIndex.load(path, "bench")
+        load_time = time.perf_counter() - start
+        size = os.path.getsize(path)
+    print(f"persistence: save {save_time:.2f} s, load {load_time:.2f} s, "
+          f"file {size / 1024 / 1024:.0f} MB, {len(loaded)} changes loaded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк разбиения на предложения: прежние регулярные выражения [.!?]+
+против SentenceSegmenter со словарем сокращений.
+
+Корпус собирается из типовых предложений договора лизинга с сокращениями
+(т.е., г., руб., п. 3.2, ст. 614 ГК РФ), датами и дробными суммами.
+Выводит число фрагментов (при известном числе предложений) и скорость.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_sentence_segmenter --sentences 20000
+"""
+
+import argparse
+import random
+import re
+import time
+
+from app.services.sentence_segmenter import sentence_segmenter
+
+TEMPLATES = [
+    "Лизингополучатель уплачивает лизинговые платежи в размере {amount} руб. {kop} коп. ежемесячно.",
+    "Лизингодатель, т.е. ООО «Лизинг-{n}», передает предмет лизинга в г. Москва по адресу ул. Ленина, д. {n}.",
+    "В соответствии со ст. {article} ГК РФ и п. {clause} настоящего договора стороны несут ответственность.",
+    "Ставка удорожания составляет {rate}% годовых, т.е. не более {amount} тыс. руб. за весь срок.",
+    "Договор вступает в силу с {date} г. и действует до полного исполнения обязательств.",
+    "Страхование осуществляется за счет Лизингополучателя, в т.ч. риски утраты и повреждения.",
+    "Неустойка начисляется в размере {rate}% от суммы просроченного платежа за каждый день просрочки.",
+    "Акт приема-передачи подписывает генеральный директор А. В. Петров на основании устава.",
+    "Претензии направляются по адресу, указанному в разд. {n} договора, с приложением копий документов и т.п.",
+    "Выкупная цена предмета лизинга составляет {amount} руб. и уплачивается вместе с последним платежом.",
+    "Изменения согласно п. {clause} и пп. {n} прил. {n} к договору вносятся в письменной форме!",
+    "Кто несет риск случайной гибели предмета лизинга до подписания акта?",
+]
+
+
+def generate_corpus(rng: random.Random, sentences: int) -> str:
+    parts = []
+    for _ in range(sentences):
+        template = rng.choice(TEMPLATES)
+        parts.append(template.format(
+            amount=f"{rng.randint(1, 999)}.{rng.randint(0, 99):02d}" if rng.random() < 0.3 else rng.randint(1000, 999999),
+            kop=rng.randint(0, 99),
+            n=rng.randint(1, 20),
+            article=rng.choice([614, 665, 670, 330, 395]),
+            clause=f"{rng.randint(1, 12)}.{rng.randint(1, 9)}",
+            rate=f"{rng.randint(0, 30)}.{rng.randint(0, 9)}",
+            date=f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(2020, 2030)}",
+        ))
+    return " ".join(parts)
+
+
+def legacy_diff_split(text: str):
+    """Прежний DiffAnalyzer._split_into_sentences"""
+    return [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
+
+
+def legacy_document_split(text: str):
+    """Прежняя стратегия 3 DocumentProcessor._split_into_paragraphs"""
+    return [s for s in re.split(r'[.!?]+\s+', text) if s.strip()]
+
+
+def measure(name: str, split, text: str, sentences: int, repeats: int):
+    fragments = split(text)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        split(text)
+    elapsed = (time.perf_counter() - start) / repeats
+    megabytes = len(text.encode("utf-8")) / 1024 / 1024
+    print(f"{name:<22} {len(fragments):>9} {len(fragments) / sentences:>9.2f} "
+          f"{elapsed * 1000:>10.1f} {megabytes / elapsed:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentence segmenter benchmark")
+    parser.add_argument("--sentences", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    text = generate_corpus(random.Random(args.seed), args.sentences)
+    print(f"Corpus: {args.sentences} sentences, {len(text)} characters")
+    print(f"{'splitter':<22} {'fragments':>9} {'per sent.':>9} {'time, ms':>10} {'MB/s':>10}")
+    measure("legacy [.!?]+", legacy_diff_split, text, args.sentences, args.repeats)
+    measure("legacy [.!?]+\\s+", legacy_document_split, text, args.sentences, args.repeats)
+    measure("SentenceSegmenter", sentence_segmenter.split, text, args.sentences, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк оконного потокового сравнения больших документов.
+
+Сравнивает пиковую память (tracemalloc, без учета исходных текстов),
+общее время и время до первого изменения для полного и потокового режимов.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_streaming_diff --clauses 20000 --window 500
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+from app.services.diff_analyzer import DiffAnalyzer
+from benchmarks.bench_word_diff import generate_clause, mutate_clause
+
+
+def build_documents(clauses: int, words: int, change_rate: float, seed: int):
+    rng = random.Random(seed)
+    reference, client = [], []
+    for number in range(1, clauses + 1):
+        clause = generate_clause(rng, words)
+        reference.append(f"{number}. " + " ".join(clause))
+        roll = rng.random()
+        if roll < change_rate / 3:
+            continue
+        if roll < change_rate:
+            clause = mutate_clause(rng, clause, 0.1)
+        client.append(f"{number}. " + " ".join(clause))
+    return {"text": "\n".join(reference)}, {"text": "\n".join(client)}
+
+
+def measure_full(analyzer, reference, client):
+    tracemalloc.start()
+    start = time.perf_counter()
+    changes = asyncio.run(analyzer.analyze_differences(reference, client))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(changes), elapsed, elapsed, peak
+
+
+def measure_streaming(analyzer, reference, client, window):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in analyzer.iter_differences(reference, client, window_size=window):
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, first or elapsed, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming diff benchmark")
+    parser.add_argument("--clauses", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=60)
+    parser.add_argument("--change-rate", type=float, default=0.05)
+    parser.add_argument("--window", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    reference, client = build_documents(args.clauses, args.words, args.change_rate, args.seed)
+    analyzer = DiffAnalyzer()
+
+    print(f"reference: {len(reference['text'])} chars, client: {len(client['text'])} chars")
+    print(f"{'mode':>14} {'changes':>8} {'first s':>8} {'total s':>8} {'peak MB':>8}")
+    rows = [("full", *measure_full(analyzer, reference, client))]
+    for window in args.window:
+        rows.append((f"window={window}", *measure_streaming(analyzer, reference, client, window)))
+    for mode, count, first, total, peak in rows:
+        print(f"{mode:>14} {count:>8} {first:>8.2f} {total:>8.2f} {peak / 1024 / 1024:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
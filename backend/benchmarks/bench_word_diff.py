@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк словного сравнения подпунктов: difflib против myers/histogram.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_word_diff
+    python -m benchmarks.bench_word_diff --sizes 100 1000 20000 --edit-rate 0.05
+"""
+
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from app.services.word_diff import DIFF_ALGORITHMS, WordDiffEngine
+
+# Частые слова договоров лизинга: многократно повторяются в каждом подпункте
+COMMON_WORDS = [
+    "лизингополучатель", "лизингодатель", "договора", "предмет", "лизинга", "в",
+    "с", "и", "на", "по", "не", "оплаты", "платежей", "срок", "в течение",
+    "рабочих", "дней", "обязуется", "настоящего", "пункта", "от", "за", "порядке",
+]
+RARE_WORDS = [
+    "страхование", "неустойка", "пени", "расторжение", "имущество", "гарантия",
+    "поручительство", "выкупная", "стоимость", "уведомление", "акт", "приема-передачи",
+    "обременение", "сублизинг", "ремонт", "эксплуатация", "регистрация", "ГИБДД",
+]
+
+
+def generate_clause(rng: random.Random, size: int) -> List[str]:
+    """Генерирует подпункт с преобладанием повторяющихся слов"""
+    words = []
+    for _ in range(size):
+        if rng.random() < 0.8:
+            words.append(rng.choice(COMMON_WORDS))
+        elif rng.random() < 0.5:
+            words.append(rng.choice(RARE_WORDS))
+        else:
+            words.append(f"{rng.randint(1, 999)}")
+    return words
+
+
+def mutate_clause(rng: random.Random, words: List[str], edit_rate: float) -> List[str]:
+    """Вносит правки: замены, удаления и вставки слов"""
+    result = []
+    for word in words:
+        roll = rng.random()
+        if roll < edit_rate / 3:
+            continue
+        if roll < 2 * edit_rate / 3:
+            result.append(rng.choice(RARE_WORDS))
+            continue
+        result.append(word)
+        if roll < edit_rate:
+            result.append(f"{rng.randint(1000, 9999)}")
+    return result
+
+
+def matched_words(opcodes) -> int:
+    return sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == "equal")
+
+
+def run(sizes: List[int], edit_rate: float, repeat: int, seed: int) -> List[Tuple]:
+    rng = random.Random(seed)
+    engine = WordDiffEngine()
+    rows = []
+
+    for size in sizes:
+        original = generate_clause(rng, size)
+        modified = mutate_clause(rng, original, edit_rate)
+
+        for algorithm in DIFF_ALGORITHMS:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                opcodes = engine.get_opcodes(original, modified, algorithm)
+                timings.append(time.perf_counter() - start)
+            changed = sum(1 for op in opcodes if op[0] != "equal")
+            rows.append((size, algorithm, min(timings) * 1000, matched_words(opcodes), changed))
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Word diff benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100, 500, 1000, 5000, 10000, 20000])
+    parser.add_argument("--edit-rate", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'words':>7} {'algorithm':>10} {'best ms':>10} {'matched':>9} {'hunks':>7}")
+    for size, algorithm, ms, matched, hunks in run(args.sizes, args.edit_rate, args.repeat, args.seed):
+        print(f"{size:>7} {algorithm:>10} {ms:>10.2f} {matched:>9} {hunks:>7}")
+
+
+if __name__ == "__main__":
+    main()
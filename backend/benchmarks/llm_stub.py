@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Локальная заглушка OpenAI-совместимого API для нагрузочных тестов.
+
+Однопоточный asyncio HTTP/1.1 сервер с keep-alive, отвечающий на
+POST /v1/chat/completions (в том числе с "stream": true - фрагментами SSE)
+и GET /v1/models. Ответы детерминированы: одиночный анализ - в формате
+КОММЕНТАРИЙ:/СОГЛАСОВАНИЯ:/КРИТИЧНОСТЬ:/УВЕРЕННОСТЬ:/ОБОСНОВАНИЕ:,
+пакетный промпт - JSON-массив с объектом на каждый блок "ИЗМЕНЕНИЕ <id>";
+случайные задержки, сбои и неуверенные ответы берутся из генератора
+с фиксированным seed. Настраиваются:
+    - распределение задержки до первого токена (Latency);
+    - скорость генерации (--tokens-per-second, фрагмент - около токена);
+    - доля ответов 429 и 5xx, медленные ответы, окно зависания и квоты
+      провайдера (Faults);
+    - задержка и доля неуверенных ответов по моделям (ModelProfile).
+
+Тесты bench_llm_* запускают заглушку в отдельном процессе через run_stub.
+Отдельный запуск из каталога backend (приложение подключается через
+OPENAI_BASE_URL=http://127.0.0.1:8765/v1):
+    python -m benchmarks.llm_stub --latency lognormal:0.3:0.5 --tokens-per-second 40 \\
+        --error-rate 0.02 --rate-limit-rate 0.05 --model qwen3:8b=0.1,0.3
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+STUB_HOST = "127.0.0.1"
+STUB_PORT = 8765
+
+COMPLETION_CONTENT = (
+    "КОММЕНТАРИЙ: Изменен размер лизингового платежа\n"
+    "СОГЛАСОВАНИЯ: ФС, ЮрУ\n"
+    "КРИТИЧНОСТЬ: high\n"
+    "УВЕРЕННОСТЬ: 0.9\n"
+    "ОБОСНОВАНИЕ: Изменение влияет на финансовые условия договора"
+)
+UNSURE_CONFIDENCE = 0.4
+
+# Потоковый ответ: длинное обоснование и текст после всех полей, который
+# разбор ответа не использует
+STREAM_REASONING = (
+    " Размер платежа увеличен в полтора раза, что меняет график платежей,"
+    " расчет эффективной ставки и условия досрочного выкупа предмета лизинга."
+    " Необходимо проверить соответствие кредитной политике и лимитам клиента,"
+    " пересчитать резерв и согласовать новые условия с финансовой службой."
+)
+STREAM_CONTENT = (
+    COMPLETION_CONTENT + "." + STREAM_REASONING * 3
+    + "\n\nДополнительно рекомендуется запросить у клиента обоснование изменения"
+      " и подтверждение источников финансирования увеличенных платежей." * 2
+)
+
+# Символов в одном фрагменте потокового ответа (около одного токена)
+STREAM_CHUNK_CHARS = 4
+
+# Блоки изменений пакетного промпта и признак ответа JSON-массивом
+_BATCH_ITEM_PATTERN = re.compile(r'^ИЗМЕНЕНИЕ (\S+)', re.MULTILINE)
+_BATCH_MARKER = "JSON-массив"
+
+# Варианты полей ответа; выбор определяется хэшем текста изменения
+_ANSWERS = (
+    ("Изменен размер лизингового платежа", ["ФС", "ЮрУ"], "high",
+     "Изменение влияет на финансовые условия договора"),
+    ("Изменен срок исполнения обязательства", ["ДСКБ", "ЮрУ"], "medium",
+     "Необходимо проверить график исполнения и последствия просрочки"),
+    ("Уточнена редакция подпункта", ["ЮрУ"], "low",
+     "Изменение носит редакционный характер и не меняет условий договора"),
+    ("Изменены условия страхования предмета лизинга", ["УСДС", "ЮрУ"], "medium",
+     "Необходимо проверить соответствие требованиям к страхованию"),
+)
+
+
+@dataclass
+class Latency:
+    """
+    Распределение задержки ответа в секундах:
+        fixed - всегда mean;
+        uniform - равномерно в mean ± spread;
+        exponential - экспоненциальное со средним mean;
+        lognormal - логнормальное с медианой mean и сигмой spread
+    """
+    kind: str = "fixed"
+    mean: float = 0.05
+    spread: float = 0.0
+
+    KINDS = ("fixed", "uniform", "exponential", "lognormal")
+
+    def __post_init__(self):
+        if self.kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution {self.kind!r}, expected one of {self.KINDS}")
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        """Задержка из строки "0.05" или "вид:mean[:spread]", например "lognormal:0.3:0.5" """
+        parts = spec.split(":")
+        if len(parts) == 1:
+            return cls("fixed", float(parts[0]))
+        return cls(parts[0], float(parts[1]), float(parts[2]) if len(parts) > 2 else 0.0)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return max(0.0, rng.uniform(self.mean - self.spread, self.mean + self.spread))
+        if self.kind == "exponential":
+            return rng.expovariate(1.0 / self.mean) if self.mean > 0 else 0.0
+        if self.kind == "lognormal":
+            return self.mean * math.exp(rng.gauss(0.0, self.spread)) if self.mean > 0 else 0.0
+        return self.mean
+
+
+def as_latency(value: Union[float, str, Latency]) -> Latency:
+    if isinstance(value, Latency):
+        return value
+    if isinstance(value, str):
+        return Latency.parse(value)
+    return Latency("fixed", float(value))
+
+
+@dataclass
+class Faults:
+    """Сбои заглушки: доля ответов 5xx и 429, доля медленных ответов, окно зависания"""
+    error_rate: float = 0.0
+    error_status: int = 503
+    # Доля ответов 429 вне зависимости от квот
+    rate_limit_rate: float = 0.0
+    slow_rate: float = 0.0
+    slow_latency: float = 0.0
+    # Секунды от запуска заглушки, в течение которых запросы остаются без ответа
+    hang_from: Optional[float] = None
+    hang_until: Optional[float] = None
+    # Квоты провайдера: запросы и токены (промпт + max_tokens) за окно
+    # quota_window секунд и одновременные запросы; сверх квоты - ответ 429
+    quota_requests: Optional[int] = None
+    quota_tokens: Optional[int] = None
+    quota_window: float = 60.0
+    quota_concurrency: Optional[int] = None
+    seed: int = 42
+
+
+@dataclass
+class ModelProfile:
+    """Модель заглушки: задержка ответа и доля ответов с низкой уверенностью"""
+    latency: Union[float, str, Latency]
+    unsure_rate: float = 0.0
+
+
+class Quota:
+    """
+    Квоты заглушки. Как у провайдеров, запросы и токены списываются из ведер,
+    непрерывно пополняемых до квоты за quota_window секунд
+    """
+
+    def __init__(self, faults: Faults):
+        self.faults = faults
+        self.requests = faults.quota_requests
+        self.tokens = faults.quota_tokens
+        self.updated = time.monotonic()
+        self.in_flight = 0
+
+    def admit(self, request: Dict) -> bool:
+        faults = self.faults
+        now = time.monotonic()
+        refill = (now - self.updated) / faults.quota_window
+        self.updated = now
+        if self.requests is not None:
+            self.requests = min(faults.quota_requests, self.requests + refill * faults.quota_requests)
+        if self.tokens is not None:
+            self.tokens = min(faults.quota_tokens, self.tokens + refill * faults.quota_tokens)
+        tokens = prompt_tokens(request) + (request.get("max_tokens") or 0)
+        if ((self.requests is not None and self.requests < 1)
+                or (self.tokens is not None and self.tokens < tokens)
+                or (faults.quota_concurrency is not None and self.in_flight >= faults.quota_concurrency)):
+            return False
+        if self.requests is not None:
+            self.requests -= 1
+        if self.tokens is not None:
+            self.tokens -= tokens
+        return True
+
+
+def request_prompt(request: Dict) -> str:
+    return "\n".join(message.get("content") or "" for message in request.get("messages", []))
+
+
+def prompt_tokens(request: Dict) -> int:
+    """Оценка токенов промпта так же, как у провайдера"""
+    return len(request_prompt(request)) // 3 + 1
+
+
+def _answer_fields(text: str):
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=2).digest()
+    return _ANSWERS[int.from_bytes(digest, "big") % len(_ANSWERS)]
+
+
+def batch_content(prompt: str, unsure: List[bool]) -> str:
+    """JSON-массив ответов пакетного промпта, по объекту на блок изменения"""
+    blocks = _BATCH_ITEM_PATTERN.split(prompt)
+    # split с группой: [до первого блока, id, текст, id, текст, ...]
+    items = []
+    for k, (item_id, text) in enumerate(zip(blocks[1::2], blocks[2::2])):
+        comment, services, severity, reasoning = _answer_fields(text)
+        items.append({
+            "id": item_id,
+            "comment": comment,
+            "services": services,
+            "severity": severity,
+            "confidence": UNSURE_CONFIDENCE if unsure[k % len(unsure)] else 0.9,
+            "reasoning": reasoning,
+        })
+    return json.dumps(items, ensure_ascii=False)
+
+
+def is_batch(prompt: str) -> bool:
+    return _BATCH_MARKER in prompt and _BATCH_ITEM_PATTERN.search(prompt) is not None
+
+
+def error_response(status: int, message: str, error_type: str = "server_error",
+                   headers: str = "") -> bytes:
+    body = json.dumps({"error": {"message": message, "type": error_type}}).encode("utf-8")
+    reason = {429: "Too Many Requests", 404: "Not Found", 500: "Internal Server Error",
+              502: "Bad Gateway", 503: "Service Unavailable", 504: "Gateway Timeout"}.get(status, "Error")
+    return (
+        f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n{headers}"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+    )
+
+
+RATE_LIMIT_RESPONSE = error_response(
+    429, "stub quota exceeded", "rate_limit_exceeded", headers="Retry-After: 1\r\n"
+)
+NOT_FOUND_RESPONSE = error_response(404, "unknown endpoint", "invalid_request_error")
+
+
+def _sse(payload: Dict) -> bytes:
+    event = f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+    return f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n"
+
+
+def stream_events(content: str = STREAM_CONTENT, model: str = "stub", usage: Optional[Dict] = None):
+    """События SSE потокового ответа, по одному на фрагмент (в chunked-кодировании)"""
+    deltas = [{"content": content[start:start + STREAM_CHUNK_CHARS]}
+              for start in range(0, len(content), STREAM_CHUNK_CHARS)]
+    deltas.append({})
+    created = int(time.time())
+    events = [
+        _sse({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "delta": delta,
+                "finish_reason": "stop" if number == len(deltas) - 1 else None,
+            }],
+        })
+        for number, delta in enumerate(deltas)
+    ]
+    if usage is not None:
+        # Как при stream_options.include_usage: последний фрагмент без choices
+        events.append(_sse({
+            "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created,
+            "model": model, "choices": [], "usage": usage,
+        }))
+    data_done = b"data: [DONE]\n\n"
+    events.append(f"{len(data_done):x}\r\n".encode("ascii") + data_done + b"\r\n")
+    return events
+
+
+STREAM_HEADERS = (
+    b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+    b"Transfer-Encoding: chunked\r\n\r\n"
+)
+
+
+def completion_body(content: str = COMPLETION_CONTENT, model: str = "stub",
+                    usage: Optional[Dict] = None) -> bytes:
+    return json.dumps({
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": usage or {"prompt_tokens": 500, "completion_tokens": 60, "total_tokens": 560},
+    }, ensure_ascii=False).encode("utf-8")
+
+
+def json_response(body: bytes) -> bytes:
+    return (
+        b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+        + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+    )
+
+
+class StubServer:
+    """Состояние заглушки, общее для всех соединений"""
+
+    def __init__(self, latency: Union[float, str, Latency], faults: Optional[Faults] = None,
+                 token_delay: float = 0.0, models: Optional[Dict[str, ModelProfile]] = None):
+        self.latency = as_latency(latency)
+        self.faults = faults or Faults()
+        # Пауза между фрагментами ответа: скорость генерации
+        self.token_delay = token_delay
+        self.models = {name: (as_latency(profile.latency), profile.unsure_rate)
+                       for name, profile in (models or {}).items()}
+        self.rng = random.Random(self.faults.seed)
+        self.started = time.monotonic()
+        self.quota = Quota(self.faults)
+        # С генерацией по фрагментам одиночный ответ содержит длинное обоснование
+        content = STREAM_CONTENT if token_delay else COMPLETION_CONTENT
+        self.single_content = {
+            False: content,
+            True: content.replace("УВЕРЕННОСТЬ: 0.9", f"УВЕРЕННОСТЬ: {UNSURE_CONFIDENCE}"),
+        }
+
+    def content(self, prompt: str, unsure_rate: float) -> str:
+        if is_batch(prompt):
+            count = len(_BATCH_ITEM_PATTERN.findall(prompt))
+            return batch_content(prompt, [unsure_rate > 0 and self.rng.random() < unsure_rate
+                                          for _ in range(count)])
+        return self.single_content[unsure_rate > 0 and self.rng.random() < unsure_rate]
+
+    def models_body(self) -> bytes:
+        return json.dumps({
+            "object": "list",
+            "data": [{"id": name, "object": "model", "owned_by": "stub"} for name in self.models or ["stub"]],
+        }).encode("utf-8")
+
+    async def handle_connection(self, reader, writer):
+        """Обрабатывает keep-alive соединение: запрос за запросом"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path = (request_line.decode("latin-1").split() + ["", ""])[:2]
+                length = 0
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value.strip())
+                request_body = await reader.readexactly(length) if length else b""
+                if method == "GET" and path.rstrip("/").endswith("/models"):
+                    writer.write(json_response(self.models_body()))
+                elif method == "POST" and path.rstrip("/").endswith("/chat/completions"):
+                    await self.complete(writer, request_body)
+                else:
+                    writer.write(NOT_FOUND_RESPONSE)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def complete(self, writer, request_body: bytes):
+        faults = self.faults
+        try:
+            request = json.loads(request_body)
+        except ValueError:
+            writer.write(error_response(400, "invalid JSON body", "invalid_request_error"))
+            return
+        if not self.quota.admit(request):
+            writer.write(RATE_LIMIT_RESPONSE)
+            return
+        self.quota.in_flight += 1
+        try:
+            elapsed = time.monotonic() - self.started
+            if faults.hang_from is not None and faults.hang_from <= elapsed < faults.hang_until:
+                # Деградировавший сервис: ответа нет до таймаута клиента
+                await asyncio.sleep(faults.hang_until - elapsed + 3600)
+            model = request.get("model") or "stub"
+            latency, unsure_rate = self.models.get(model, (self.latency, 0.0))
+            roll = self.rng.random()
+            if roll < faults.error_rate:
+                await asyncio.sleep(self.latency.sample(self.rng))
+                writer.write(error_response(faults.error_status, "stub fault injected"))
+                return
+            if roll < faults.error_rate + faults.rate_limit_rate:
+                writer.write(RATE_LIMIT_RESPONSE)
+                return
+            slow = roll < faults.error_rate + faults.rate_limit_rate + faults.slow_rate
+            await asyncio.sleep(faults.slow_latency if slow else latency.sample(self.rng))
+
+            prompt = request_prompt(request)
+            content = self.content(prompt, unsure_rate)
+            tokens = prompt_tokens(request)
+            completion_tokens = -(-len(content) // STREAM_CHUNK_CHARS)
+            usage = {"prompt_tokens": tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": tokens + completion_tokens}
+            if request.get("stream"):
+                include_usage = (request.get("stream_options") or {}).get("include_usage")
+                writer.write(STREAM_HEADERS)
+                for event in stream_events(content, model, usage if include_usage else None):
+                    writer.write(event)
+                    if self.token_delay:
+                        await writer.drain()
+                        await asyncio.sleep(self.token_delay)
+                writer.write(b"0\r\n\r\n")
+                return
+            # Без потока ответ отдается только после генерации всех фрагментов
+            await asyncio.sleep(self.token_delay * (completion_tokens + 1))
+            writer.write(json_response(completion_body(content, model, usage)))
+        finally:
+            self.quota.in_flight -= 1
+
+
+def run_stub(port: int, latency: Union[float, str, Latency], faults: Optional[Faults] = None,
+             token_delay: float = 0.0, models: Optional[Dict[str, ModelProfile]] = None,
+             host: str = STUB_HOST):
+    """Запускает заглушку до завершения процесса (цель multiprocessing.Process)"""
+    stub = StubServer(latency, faults, token_delay, models)
+
+    async def serve():
+        server = await asyncio.start_server(stub.handle_connection, host, port, backlog=1024)
+        async with server:
+            await server.serve_forever()
+    asyncio.run(serve())
+
+
+def parse_model(spec: str):
+    """Профиль модели из строки "имя=задержка[,доля неуверенных]" """
+    name, _, profile = spec.partition("=")
+    latency, _, unsure_rate = profile.partition(",")
+    return name, ModelProfile(latency, float(unsure_rate or 0.0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible LLM stub")
+    parser.add_argument("--host", default=STUB_HOST)
+    parser.add_argument("--port", type=int, default=STUB_PORT)
+    parser.add_argument("--latency", default="0.05",
+                        help="seconds, or kind:mean[:spread] with kind fixed/uniform/exponential/lognormal")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="generation speed; 0 sends the whole answer at once")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=0.0)
+    parser.add_argument("--quota-requests", type=int)
+    parser.add_argument("--quota-tokens", type=int)
+    parser.add_argument("--quota-window", type=float, default=60.0)
+    parser.add_argument("--quota-concurrency", type=int)
+    parser.add_argument("--model", action="append", default=[], metavar="NAME=LATENCY[,UNSURE]",
+                        help="per-model latency and share of low-confidence answers")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    faults = Faults(
+        error_rate=args.error_rate, error_status=args.error_status, rate_limit_rate=args.rate_limit_rate,
+        slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+        quota_requests=args.quota_requests, quota_tokens=args.quota_tokens,
+        quota_window=args.quota_window, quota_concurrency=args.quota_concurrency, seed=args.seed,
+    )
+    models = dict(parse_model(spec) for spec in args.model)
+    token_delay = 1.0 / args.tokens_per_second if args.tokens_per_second else 0.0
+    print(f"LLM stub on OPENAI_BASE_URL=http://{args.host}:{args.port}/v1, latency {as_latency(args.latency)}")
+    try:
+        run_stub(args.port, args.latency, faults, token_delay, models, host=args.host)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
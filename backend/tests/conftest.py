@@ -0,0 +1,12 @@
+import os
+import sys
+from pathlib import Path
+
+# Тесты запускаются из каталога backend: python -m pytest tests
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+for name in ("OPENAI_API_KEY", "POSTGRES_HOST", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB"):
+    os.environ.setdefault(name, "stub")
+os.environ.setdefault("UPLOAD_PATH", "/tmp/oozo-tests/uploads")
+os.environ.setdefault("LOG_FILE", "/tmp/oozo-tests/logs/app.log")
+os.environ.setdefault("LLM_SEMANTIC_CACHE_PATH", "/tmp/oozo-tests/semantic_cache.npz")
@@ -0,0 +1,35 @@
+import asyncio
+
+from app.services import change_set as change_set_module
+from app.services.change_set import MODIFICATION, ChangeSet
+from app.services.diff_analyzer import DiffAnalyzer
+
+REFERENCE = {"text": "1. Арендная плата составляет 100 000 рублей в месяц.\n2. Срок аренды 12 месяцев."}
+CLIENT = {"text": "1. Арендная плата составляет 150 000 рублей в месяц.\n2. Срок аренды 24 месяцев."}
+
+
+def test_change_set_facts_match_full_diff():
+    analyzer = DiffAnalyzer()
+    changes = asyncio.run(analyzer.analyze_change_set(REFERENCE, CLIENT))
+    full = asyncio.run(analyzer.analyze_differences(REFERENCE, CLIENT))
+    assert [change.fact_deltas for change in changes] == [change.fact_deltas for change in full]
+    assert all(change.fact_deltas for change in changes)
+
+
+def test_fact_deltas_are_extracted_once(monkeypatch):
+    analyzer = DiffAnalyzer()
+    reference = analyzer._clause_table(REFERENCE["text"])
+    client = analyzer._clause_table(CLIENT["text"])
+    changes = ChangeSet(reference, client)
+    changes.append(MODIFICATION, 0, 0, 0)
+
+    calls = []
+    extract = change_set_module.fact_extractor.extract
+    monkeypatch.setattr(
+        change_set_module.fact_extractor, "extract", lambda text: calls.append(text) or extract(text)
+    )
+    # Триаж, маршрутизатор и группировка читают факты каждого изменения
+    first = changes[0].fact_deltas
+    for _ in range(3):
+        assert changes[0].fact_deltas == first
+    assert len(calls) == 2
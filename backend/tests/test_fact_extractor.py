@@ -0,0 +1,45 @@
+import pytest
+
+from app.services.fact_extractor import DURATION, MONEY, PERCENT, diff_facts, fact_extractor, severity_score
+
+
+@pytest.mark.parametrize("text, kind, value, unit", [
+    ("1 500 000 (один миллион пятьсот тысяч) рублей", MONEY, 1500000.0, "RUB"),
+    ("2,5 (два с половиной) млн. рублей", MONEY, 2500000.0, "RUB"),
+    ("USD 100", MONEY, 100.0, "USD"),
+    ("EUR 2 000,50", MONEY, 2000.5, "EUR"),
+    ("$ 15", MONEY, 15.0, "USD"),
+    ("100 000 руб.", MONEY, 100000.0, "RUB"),
+    ("12 (двенадцать) процентов", PERCENT, 12.0, "%"),
+    ("0,1 %", PERCENT, 0.1, "%"),
+    ("30 (тридцати) календарных дней", DURATION, 30.0, "days"),
+    ("10 (десяти) рабочих дней", DURATION, 10.0, "working_days"),
+    ("3 месяца", DURATION, 90.0, "days"),
+    ("2 (двух) лет", DURATION, 730.0, "days"),
+    ("1 год", DURATION, 365.0, "days"),
+])
+def test_extracts_contract_forms(text, kind, value, unit):
+    facts = fact_extractor.extract(f"Стороны согласовали {text} по договору.")
+    assert [(fact.kind, fact.value, fact.unit) for fact in facts] == [(kind, value, unit)]
+
+
+def test_parentheses_without_unit_are_not_facts():
+    assert fact_extractor.extract("в соответствии с пунктом 5 (пять) настоящего договора") == []
+
+
+@pytest.mark.parametrize("text", [
+    "Платежи вносятся в 2024 году",
+    "действует до 2025 года",
+    "с 2023 года ставка не меняется",
+    "в отчетном году",
+])
+def test_calendar_years_are_not_durations(text):
+    assert fact_extractor.extract(text) == []
+
+
+def test_changed_calendar_year_is_not_a_fact_delta():
+    old = fact_extractor.extract("Платежи в 2024 году вносятся ежемесячно.")
+    new = fact_extractor.extract("Платежи в 2025 году вносятся ежемесячно.")
+    deltas = diff_facts(old, new)
+    assert deltas == []
+    assert severity_score(deltas) == 0.0
@@ -0,0 +1,19 @@
+from app.services.diff_analyzer import DiffAnalyzer
+
+REFERENCE = "1. Лизинговый платеж вносится ежемесячно.\n2. Срок лизинга 36 месяцев.\n3. Страхование за счет лизингополучателя."
+CLIENT = "1. Лизинговый платеж вносится ежеквартально.\n2. Срок лизинга 36 месяцев.\n3. Страхование за счет лизингодателя."
+
+
+def test_ensure_details_computes_pending_spans():
+    analyzer = DiffAnalyzer()
+    changes = analyzer.analyze_hierarchical({"text": REFERENCE}, {"text": CLIENT})
+    modifications = [change for change in changes if change.change_type == "modification"]
+    assert modifications and all(change.detail_pending for change in modifications)
+    assert not any(change.original_spans or change.modified_spans for change in modifications)
+
+    analyzer.ensure_details(modifications)
+    for change in modifications:
+        assert not change.detail_pending
+        assert change.original_spans and change.modified_spans
+        expected = analyzer.change_detail(change.original_text, change.modified_text)
+        assert (tuple(change.original_spans), tuple(change.modified_spans)) == expected
@@ -0,0 +1,35 @@
+from app.services.diff_analyzer import DiffChange
+from app.services.llm_cache import LLMResponseCache
+
+REGULATIONS = [{"id": "reg-1", "title": "Положение об аренде"}]
+
+
+def change(context):
+    return DiffChange(
+        original_text="1. Арендная плата вносится ежемесячно.",
+        modified_text="1. Арендная плата вносится ежеквартально.",
+        change_type="modification",
+        position=0,
+        text="1. Арендная плата вносится ежеквартально.",
+        context=context,
+    )
+
+
+def key(context, regulations=REGULATIONS):
+    return LLMResponseCache.make_key(change(context), regulations, "qwen3:32b", 0.1, "v1")
+
+
+def test_key_depends_on_context():
+    assert key("Документ, подпункт 1") == key("Документ, подпункт 1")
+    assert key("Документ, подпункт 1") != key("Приложение 2, подпункт 1")
+
+
+def test_key_depends_on_regulation_ids():
+    other = [{"id": "reg-2", "title": "Положение об аренде"}]
+    assert key("Документ, подпункт 1", other) != key("Документ, подпункт 1")
+    assert key("Документ, подпункт 1", REGULATIONS + other) == key("Документ, подпункт 1", other + REGULATIONS)
+    assert key("Документ, подпункт 1", REGULATIONS + other) != key("Документ, подпункт 1")
+
+
+def test_key_ignores_context_formatting():
+    assert key("Документ,  подпункт 1 ") == key("Документ, подпункт 1")
@@ -0,0 +1,197 @@
+import asyncio
+import multiprocessing
+import random
+import socket
+import time
+from contextlib import contextmanager
+
+import httpx
+import openai
+import pytest
+from openai import AsyncOpenAI
+
+from app.services.llm_resilience import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, LLMUnavailableError, ResilientCaller,
+)
+from benchmarks.llm_stub import STUB_HOST, Faults, run_stub
+
+BODY = {"model": "stub", "messages": [{"role": "user", "content": "1. Срок аренды 11 месяцев."}]}
+
+# Сид заглушки, при котором первый запрос попадает в долю сбоев 0.5, а второй нет
+SEED = 1
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((STUB_HOST, 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def stub(faults: Faults):
+    """Заглушка LLM в отдельном процессе; возвращает ее base_url"""
+    port = free_port()
+    process = multiprocessing.Process(target=run_stub, args=(port, 0.01, faults), daemon=True)
+    process.start()
+    try:
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                socket.create_connection((STUB_HOST, port), timeout=0.1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+        yield f"http://{STUB_HOST}:{port}/v1"
+    finally:
+        process.terminate()
+        process.join()
+
+
+def make_caller(attempts: int, failure_threshold: int = 10 ** 6, recovery_timeout: float = 60.0):
+    return ResilientCaller(
+        CircuitBreaker(failure_threshold, recovery_timeout),
+        attempts=attempts, base_delay=0.01, max_delay=0.05,
+    )
+
+
+class Endpoint:
+    """Запросы к заглушке через клиент OpenAI без его собственных повторов"""
+
+    def __init__(self, base_url: str):
+        self.client = AsyncOpenAI(api_key="stub", base_url=base_url, max_retries=0,
+                                  timeout=httpx.Timeout(5.0))
+        self.requests = 0
+
+    async def request(self):
+        self.requests += 1
+        return await self.client.chat.completions.create(**BODY)
+
+
+@pytest.mark.parametrize("faults", [
+    Faults(error_rate=0.5, error_status=503, seed=SEED),
+    Faults(error_rate=0.5, error_status=500, seed=SEED),
+    Faults(rate_limit_rate=0.5, seed=SEED),
+], ids=["503", "500", "429"])
+def test_retryable_error_is_retried(faults):
+    rng = random.Random(SEED)
+    assert rng.random() < 0.5 <= rng.random()
+    caller = make_caller(attempts=3)
+
+    async def scenario(base_url):
+        endpoint = Endpoint(base_url)
+        response = await caller.call(endpoint.request)
+        await endpoint.client.close()
+        return endpoint.requests, response
+
+    with stub(faults) as base_url:
+        requests, response = asyncio.run(scenario(base_url))
+    assert requests == 2
+    assert response.choices[0].message.content
+    assert caller.breaker.state == CLOSED
+
+
+def test_non_retryable_error_is_not_retried():
+    caller = make_caller(attempts=3, failure_threshold=1)
+
+    async def scenario(base_url):
+        endpoint = Endpoint(base_url)
+        with pytest.raises(openai.BadRequestError):
+            await caller.call(endpoint.request)
+        await endpoint.client.close()
+        return endpoint.requests
+
+    with stub(Faults(error_rate=1.0, error_status=400)) as base_url:
+        assert asyncio.run(scenario(base_url)) == 1
+    # Ошибка запроса не говорит о неисправности сервиса
+    assert caller.breaker.state == CLOSED
+
+
+def test_circuit_opens_and_half_opens():
+    recovery_timeout = 0.3
+    caller = make_caller(attempts=1, failure_threshold=2, recovery_timeout=recovery_timeout)
+    breaker = caller.breaker
+
+    async def scenario(failing_url, healthy_url):
+        failing, healthy = Endpoint(failing_url), Endpoint(healthy_url)
+        for _ in range(2):
+            with pytest.raises(LLMUnavailableError):
+                await caller.call(failing.request)
+        assert breaker.state == OPEN
+
+        # Открытая цепь отклоняет запросы без обращения к сервису
+        with pytest.raises(CircuitOpenError):
+            await caller.call(failing.request)
+        assert failing.requests == 2
+
+        # После паузы пропускается один пробный запрос; его сбой снова размыкает цепь
+        await asyncio.sleep(recovery_timeout)
+        with pytest.raises(LLMUnavailableError):
+            await caller.call(failing.request)
+        assert failing.requests == 3
+        assert breaker.state == OPEN
+
+        # Пока идет пробный запрос, остальные отклоняются; его успех замыкает цепь
+        await asyncio.sleep(recovery_timeout)
+        trial = asyncio.ensure_future(caller.call(healthy.request))
+        await asyncio.sleep(0)
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await caller.call(healthy.request)
+        await trial
+        assert healthy.requests == 1
+        assert breaker.state == CLOSED
+
+        await caller.call(healthy.request)
+        assert healthy.requests == 2
+        await failing.client.close()
+        await healthy.client.close()
+
+    with stub(Faults(error_rate=1.0, error_status=503)) as failing_url, stub(Faults()) as healthy_url:
+        asyncio.run(scenario(failing_url, healthy_url))
+
+
+async def answer():
+    return "ok"
+
+
+def half_open_caller():
+    caller = make_caller(attempts=1, failure_threshold=1, recovery_timeout=0.0)
+    caller.breaker.record_failure()
+    assert caller.breaker.state == OPEN
+    return caller
+
+
+def test_cancelled_trial_releases_half_open_circuit():
+    caller = half_open_caller()
+
+    async def scenario():
+        trial = asyncio.ensure_future(caller.call(lambda: asyncio.sleep(60)))
+        await asyncio.sleep(0)
+        assert caller.breaker.state == HALF_OPEN
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        # Следующий запрос снова становится пробным, а не отклоняется навсегда
+        assert await caller.call(answer) == "ok"
+
+    asyncio.run(scenario())
+    assert caller.breaker.state == CLOSED
+
+
+def test_non_retryable_error_does_not_close_half_open_circuit():
+    caller = half_open_caller()
+
+    async def rejected():
+        raise ValueError("bad request")
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await caller.call(rejected)
+        # Цепь остается полуоткрытой, а пробным становится следующий запрос
+        assert caller.breaker.state == HALF_OPEN
+        assert await caller.call(answer) == "ok"
+
+    asyncio.run(scenario())
+    assert caller.breaker.state == CLOSED
@@ -0,0 +1,23 @@
+from app.services.diff_analyzer import DiffChange
+from app.services.model_router import ModelRouter
+
+TIERS = [{"name": "small", "model": "qwen3:8b", "when": {"max_changed_chars": 200}}]
+
+ORIGINAL = "1. Лизингополучатель обязан застраховать предмет лизинга. " * 4
+MODIFIED = "1. Лизингодатель вправе в одностороннем порядке изменить график платежей. " * 4
+
+
+def rewrite(**spans):
+    return DiffChange(
+        original_text=ORIGINAL, modified_text=MODIFIED, change_type="modification",
+        position=0, text=MODIFIED, **spans,
+    )
+
+
+def test_rewrite_without_spans_is_not_routed_to_small_model():
+    router = ModelRouter.from_dicts(TIERS, "qwen3:32b")
+    assert router.route(rewrite()).name == "default"
+    # Та же замена с короткой подсветкой - небольшое изменение
+    assert router.route(rewrite(original_spans=[(3, 18, "delete")],
+                                modified_spans=[(3, 16, "insert")])).name == "small"
+
@@ -0,0 +1,92 @@
+import asyncio
+from dataclasses import replace
+
+import pytest
+
+from app.core.config import settings
+from app.services.diff_analyzer import DiffAnalyzer
+from app.services.semantic_cache import MinHashIndex, change_type_code, minhash_signature
+
+CLAUSE = (
+    "4.2. Арендатор обязуется вносить арендную плату ежемесячно не позднее пятого числа "
+    "текущего месяца путем перечисления денежных средств на расчетный счет, указанный "
+    "в разделе 12 настоящего договора, а в случае просрочки платежа Арендатор уплачивает "
+    "пени в размере 0,1 процента от суммы задолженности за каждый день просрочки."
+)
+
+EDITS = {
+    "period": ("ежемесячно", "ежеквартально"),
+    "penalty": ("0,1 процента", "5 процентов"),
+    "party": ("Арендатор обязуется", "Арендодатель обязуется"),
+}
+
+
+def modification(original, modified, algorithm=None):
+    analyzer = DiffAnalyzer()
+    changes = asyncio.run(analyzer.analyze_differences({"text": original}, {"text": modified}, algorithm))
+    assert len(changes) == 1
+    return changes[0]
+
+
+def edited(name, clause=CLAUSE):
+    old, new = EDITS[name]
+    return modification(clause, clause.replace(old, new, 1))
+
+
+def nearest(index, change):
+    signature = minhash_signature(change)
+    return index.query(signature, change_type_code(change)) if signature is not None else None
+
+
+@pytest.fixture
+def index():
+    index = MinHashIndex("test")
+    change = edited("period")
+    index.add(minhash_signature(change), "aa" * 32, change_type_code(change))
+    return index
+
+
+@pytest.mark.parametrize("name", ["penalty", "party"])
+def test_other_edits_of_the_same_clause_do_not_match(index, name):
+    result = nearest(index, edited(name))
+    assert result is None or result[1] < settings.LLM_SEMANTIC_CACHE_THRESHOLD
+
+
+def test_other_edits_without_word_spans_do_not_match(index):
+    # lazy_detail: подсветки нет, отличие берется по общему началу и концу
+    change = replace(edited("party"), original_spans=[], modified_spans=[])
+    result = nearest(index, change)
+    assert result is None or result[1] < settings.LLM_SEMANTIC_CACHE_THRESHOLD
+
+
+def test_same_edit_in_a_clause_differing_elsewhere_matches(index):
+    clause = CLAUSE.replace("разделе 12", "разделе 11").replace("за каждый день", "за каждый календарный день")
+    result = nearest(index, edited("period", clause))
+    assert result is not None and result[1] >= settings.LLM_SEMANTIC_CACHE_THRESHOLD
+
+
+def test_changes_of_facts_are_not_compared():
+    change = edited("penalty")
+    assert change.fact_deltas
+    assert minhash_signature(change) is None
+
+
+def test_other_change_types_do_not_match(index):
+    change = edited("period")
+    signature = minhash_signature(change)
+    assert index.query(signature, change_type_code(change))[1] == 1.0
+    assert index.query(signature, change_type_code(replace(change, change_type="addition"))) is None
+
+
+@pytest.mark.parametrize("key", ["ab" * 31 + "00", "00" * 32, "00" + "ab" * 31])
+def test_keys_with_zero_bytes_survive_save_and_load(tmp_path, key):
+    change = edited("period")
+    signature = minhash_signature(change)
+    index = MinHashIndex("scope")
+    index.add(signature, key, change_type_code(change))
+    assert index.query(signature, change_type_code(change))[0] == key
+
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = MinHashIndex.load(path, "scope")
+    assert loaded.query(signature, change_type_code(change))[0] == key
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from app.services.diff_analyzer import DiffAnalyzer
+
+
+def clauses(texts):
+    return {"text": "\n".join(texts)}
+
+
+def summary(changes):
+    return [(c.change_type, c.original_text, c.modified_text) for c in changes]
+
+
+def unchanged(count):
+    return [f"{k + 1}. Подпункт остается без изменений и повторяет условия договора номер {k}." for k in range(count)]
+
+
+def inserted(count):
+    return [f"{k + 1}.1. Новое условие, добавленное клиентом в договор аренды {k}." for k in range(count)]
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return DiffAnalyzer()
+
+
+@pytest.mark.parametrize("reference, client", [
+    # Вставка длиннее окна
+    (unchanged(199), inserted(80) + unchanged(199)),
+    # Удаление длиннее окна в середине
+    (unchanged(100) + inserted(120) + unchanged(99), unchanged(100) + unchanged(99)),
+    # Вставка в конце и правки в начале
+    (unchanged(150), ["1. Изменено."] + unchanged(150)[1:] + inserted(60)),
+])
+def test_streaming_diff_matches_full_diff(analyzer, reference, client):
+    full = asyncio.run(analyzer.analyze_differences(clauses(reference), clauses(client)))
+    streamed = list(analyzer.iter_differences(clauses(reference), clauses(client), window_size=50))
+    assert summary(streamed) == summary(full)
+
+
+def test_long_insertion_is_not_paired_with_unchanged_clauses(analyzer):
+    reference, client = clauses(unchanged(199)), clauses(inserted(80) + unchanged(199))
+    streamed = list(analyzer.iter_differences(reference, client, window_size=50))
+    assert [change.change_type for change in streamed] == ["addition"] * 80
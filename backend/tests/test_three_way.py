@@ -0,0 +1,59 @@
+import asyncio
+
+from app.services.diff_analyzer import (
+    DiffAnalyzer, NEW_IN_THIS_ROUND, REVERTED_TO_REFERENCE, UNCHANGED_SINCE_PREVIOUS,
+)
+
+CLAUSES = [
+    "1. Лизинговый платеж вносится ежемесячно до пятого числа.",
+    "2. Срок лизинга составляет тридцать шесть месяцев.",
+    "3. Страхование предмета лизинга осуществляет лизингополучатель.",
+    "4. Споры рассматриваются в арбитражном суде по месту нахождения лизингодателя.",
+]
+MODIFIED_2 = "2. Срок лизинга составляет сорок восемь месяцев."
+INSERTED = "3.1. Лизингополучатель вправе досрочно выкупить предмет лизинга."
+
+
+def three_way(previous, client):
+    analyzer = DiffAnalyzer()
+    return asyncio.run(analyzer.analyze_three_way(
+        {"text": "\n".join(CLAUSES)}, {"text": "\n".join(previous)}, {"text": "\n".join(client)}
+    ))
+
+
+def only(changes):
+    assert len(changes) == 1, [(c.change_type, c.round_status, c.original_text) for c in changes]
+    return changes[0]
+
+
+def without_clause_2():
+    return [clause for clause in CLAUSES if not clause.startswith("2.")]
+
+
+def test_deletion_kept_from_previous_draft_is_unchanged():
+    change = only(three_way(without_clause_2(), without_clause_2()))
+    assert change.change_type == "deletion"
+    assert change.round_status == UNCHANGED_SINCE_PREVIOUS
+
+
+def test_deletion_of_clause_modified_in_previous_draft_is_new():
+    previous = [MODIFIED_2 if clause.startswith("2.") else clause for clause in CLAUSES]
+    change = only(three_way(previous, without_clause_2()))
+    assert change.change_type == "deletion"
+    assert change.original_text == CLAUSES[1]
+    assert change.round_status == NEW_IN_THIS_ROUND
+
+
+def test_reverted_insertion_is_reported():
+    previous = CLAUSES[:3] + [INSERTED] + CLAUSES[3:]
+    change = only(three_way(previous, CLAUSES))
+    assert change.change_type == "deletion"
+    assert change.original_text == INSERTED
+    assert change.round_status == REVERTED_TO_REFERENCE
+
+
+def test_insertion_kept_from_previous_draft_is_unchanged():
+    previous = CLAUSES[:3] + [INSERTED] + CLAUSES[3:]
+    change = only(three_way(previous, previous))
+    assert change.change_type == "addition"
+    assert change.round_status == UNCHANGED_SINCE_PREVIOUS
@@ -0,0 +1,37 @@
+from app.services.diff_analyzer import DiffChange
+from app.services.triage import TriageRule
+
+RESULT = {"comment": "Тривиальное изменение", "severity": "low"}
+
+
+def change(original, modified, original_spans=(), modified_spans=()):
+    return DiffChange(
+        original_text=original, modified_text=modified, change_type="modification",
+        position=0, text=modified,
+        original_spans=list(original_spans), modified_spans=list(modified_spans),
+    )
+
+
+def test_changed_chars_without_spans_counts_whole_texts():
+    rule = TriageRule("short", {"max_changed_chars": 200}, RESULT)
+    rewrite = change("1. Лизингополучатель обязан застраховать предмет лизинга. " * 4,
+                     "1. Лизингодатель вправе изменить график платежей. " * 4)
+    assert not rule.matches(rewrite)
+
+
+def replaced_word(original, modified, old, new):
+    start1, start2 = original.index(old), modified.index(new)
+    return change(original, modified, [(start1, start1 + len(old), "delete")],
+                  [(start2, start2 + len(new), "insert")])
+
+
+def test_typo_rule_matches_misspelled_word():
+    rule = TriageRule("typo", {"typo": 2}, RESULT)
+    assert rule.matches(replaced_word("1. Лизинговый платежж вносится.", "1. Лизинговый платеж вносится.",
+                                      "платежж", "платеж"))
+
+
+def test_number_change_is_not_a_typo():
+    rule = TriageRule("typo", {"typo": 2}, RESULT)
+    assert not rule.matches(replaced_word("1. Неустойка 15000 за каждый день.", "1. Неустойка 150000 за каждый день.",
+                                          "15000", "150000"))
@@ -0,0 +1,107 @@
+import difflib
+import random
+import time
+
+import pytest
+
+from app.services.word_diff import DIFF_ALGORITHMS, WordDiffEngine, _myers_matching_blocks
+
+
+def assert_valid_opcodes(a, b, opcodes):
+    """Опкоды покрывают обе последовательности подряд, equal - только равные токены"""
+    i = j = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (i, j)
+        assert i1 <= i2 and j1 <= j2
+        if tag == 'equal':
+            assert list(a[i1:i2]) == list(b[j1:j2])
+        elif tag == 'delete':
+            assert j1 == j2 and i1 < i2
+        elif tag == 'insert':
+            assert i1 == i2 and j1 < j2
+        else:
+            assert tag == 'replace' and i1 < i2 and j1 < j2
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+
+
+def apply_opcodes(a, b, opcodes):
+    result = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        result.extend(a[i1:i2] if tag == 'equal' else b[j1:j2])
+    return result
+
+
+def random_edit(rng, words, vocabulary, edit_rate):
+    result = []
+    for word in words:
+        roll = rng.random()
+        if roll < edit_rate / 3:
+            continue
+        if roll < 2 * edit_rate / 3:
+            result.append(rng.choice(vocabulary))
+            continue
+        result.append(word)
+        if roll < edit_rate:
+            result.append(rng.choice(vocabulary))
+    return result
+
+
+@pytest.mark.parametrize("algorithm", DIFF_ALGORITHMS)
+@pytest.mark.parametrize("vocabulary_size", [5, 50, 1000])
+def test_opcodes_are_valid(algorithm, vocabulary_size):
+    rng = random.Random(vocabulary_size)
+    vocabulary = [f"w{k}" for k in range(vocabulary_size)]
+    engine = WordDiffEngine(algorithm)
+    for _ in range(50):
+        a = [rng.choice(vocabulary) for _ in range(rng.randint(0, 80))]
+        b = random_edit(rng, a, vocabulary, rng.choice([0.0, 0.1, 0.5, 1.0]))
+        opcodes = engine.get_opcodes(a, b)
+        assert_valid_opcodes(a, b, opcodes)
+        assert apply_opcodes(a, b, opcodes) == b
+
+
+@pytest.mark.parametrize("algorithm", ["myers", "histogram"])
+def test_matches_difflib_on_unique_words(algorithm):
+    # Без повторяющихся слов кратчайшая правка единственна, и difflib находит ее же
+    rng = random.Random(7)
+    engine = WordDiffEngine(algorithm)
+    for _ in range(50):
+        a = [f"a{k}" for k in range(rng.randint(1, 60))]
+        b = [word for word in a if rng.random() > 0.1]
+        for _ in range(rng.randint(0, 5)):
+            b.insert(rng.randint(0, len(b)), f"new{rng.randrange(10 ** 6)}")
+        expected = difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+        assert engine.get_opcodes(a, b) == expected
+
+
+@pytest.mark.parametrize("algorithm", ["myers", "histogram"])
+def test_single_edits_match_difflib(algorithm):
+    engine = WordDiffEngine(algorithm)
+    a = "Арендатор обязан вносить арендную плату ежемесячно не позднее 10 числа".split()
+    for b in (
+        "Арендатор обязан вносить арендную плату ежеквартально не позднее 10 числа".split(),
+        "Арендатор обязан вносить арендную плату не позднее 10 числа".split(),
+        "Арендатор обязан своевременно вносить арендную плату ежемесячно не позднее 10 числа".split(),
+    ):
+        expected = difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+        assert engine.get_opcodes(a, b) == expected
+
+
+def test_myers_cost_limit_keeps_blocks_valid():
+    rng = random.Random(3)
+    a = [rng.randrange(20) for _ in range(3000)]
+    b = [rng.randrange(20) if rng.random() < 0.5 else token for token in a]
+    engine = WordDiffEngine("myers")
+
+    start = time.perf_counter()
+    opcodes = engine.get_opcodes_for_ids(a, b)
+    elapsed = time.perf_counter() - start
+
+    assert_valid_opcodes(a, b, opcodes)
+    # Без ограничения числа правок сравнение занимало секунды
+    assert elapsed < 2.0
+    # Ограничение уменьшает длину совпадения незначительно
+    matched = sum(size for _, _, size in _myers_matching_blocks(a, b))
+    reference = sum(size for *_, size in difflib.SequenceMatcher(None, a, b, autojunk=False).get_matching_blocks())
+    assert matched >= 0.95 * reference
@@ -50,7 +50,59 @@ CREATE TABLE IF NOT EXISTS analysis_results (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     analysis_id UUID NOT NULL,
     document_pair_reference VARCHAR(500),
-    document_pair_client VARCHAR(500)
+    document_pair_client VARCHAR(500),
+    required_services JSONB,
+    reasoning TEXT,
+    context VARCHAR(500),
+    position INTEGER,
+    original_spans JSONB,
+    modified_spans JSONB,
+    revision_status VARCHAR(20) NOT NULL DEFAULT 'new',
+    pending_reanalysis BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+-- Columns added for incremental re-analysis (existing installations)
+ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS required_services JSONB;
+ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS reasoning TEXT;
+ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS context VARCHAR(500);
+ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS position INTEGER;
+ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS original_spans JSONB;
+ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS modified_spans JSONB;
+ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS revision_status VARCHAR(20) NOT NULL DEFAULT 'new';
+ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS pending_reanalysis BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Create analyses table (compared drafts, used for incremental re-analysis)
+CREATE TABLE IF NOT EXISTS analyses (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    reference_filename VARCHAR(500),
+    client_filename VARCHAR(500),
+    reference_text TEXT NOT NULL,
+    client_text TEXT NOT NULL,
+    previous_analysis_id UUID,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create LLM response cache table (results keyed by a hash of the prompt inputs)
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key VARCHAR(64) PRIMARY KEY,
+    model VARCHAR(200) NOT NULL,
+    prompt_version VARCHAR(20) NOT NULL,
+    result JSONB NOT NULL,
+    hit_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    last_hit_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create regulation passages table (chunks searched for LLM context)
+CREATE TABLE IF NOT EXISTS regulation_chunks (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    regulation_id UUID NOT NULL REFERENCES regulations(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    start_offset INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    search_vector TSVECTOR,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Create regulation_services junction table
@@ -81,6 +133,11 @@ CREATE INDEX IF NOT EXISTS idx_regulations_search ON regulations USING GIN(searc
 CREATE INDEX IF NOT EXISTS idx_regulations_title_trgm ON regulations USING GIN(title gin_trgm_ops);
 CREATE INDEX IF NOT EXISTS idx_regulations_content_trgm ON regulations USING GIN(content gin_trgm_ops);
 
+-- Create indexes for regulation passages
+CREATE INDEX IF NOT EXISTS idx_regulation_chunks_regulation_id_position ON regulation_chunks(regulation_id, position);
+CREATE INDEX IF NOT EXISTS idx_regulation_chunks_search ON regulation_chunks USING GIN(search_vector);
+CREATE INDEX IF NOT EXISTS idx_regulation_chunks_content_trgm ON regulation_chunks USING GIN(content gin_trgm_ops);
+
 -- Create indexes for services
 CREATE INDEX IF NOT EXISTS idx_services_name ON services(name);
 CREATE INDEX IF NOT EXISTS idx_services_active ON services(active);
@@ -91,6 +148,16 @@ CREATE INDEX IF NOT EXISTS idx_analysis_results_analysis_id ON analysis_results(
 CREATE INDEX IF NOT EXISTS idx_analysis_results_created_at ON analysis_results(created_at);
 CREATE INDEX IF NOT EXISTS idx_analysis_results_severity ON analysis_results(severity);
 CREATE INDEX IF NOT EXISTS idx_analysis_results_change_type ON analysis_results(change_type);
+CREATE INDEX IF NOT EXISTS idx_analysis_results_pending_reanalysis ON analysis_results(analysis_id) WHERE pending_reanalysis;
+
+-- Create indexes for analyses
+CREATE INDEX IF NOT EXISTS idx_analyses_previous_analysis_id ON analyses(previous_analysis_id);
+CREATE INDEX IF NOT EXISTS idx_analyses_created_at ON analyses(created_at);
+
+-- Create indexes for LLM response cache
+CREATE INDEX IF NOT EXISTS idx_llm_cache_model_prompt_version ON llm_cache(model, prompt_version);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_created_at ON llm_cache(created_at);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit_at ON llm_cache(last_hit_at);
 
 -- Create function to update search vector
 CREATE OR REPLACE FUNCTION update_regulations_search_vector() RETURNS TRIGGER AS $$
@@ -110,6 +177,21 @@ CREATE TRIGGER regulations_search_vector_trigger
     FOR EACH ROW
     EXECUTE FUNCTION update_regulations_search_vector();
 
+-- Notify the backend of changed regulations: it re-chunks them and updates
+-- the in-memory search index (app/services/regulatory_matcher.py)
+CREATE OR REPLACE FUNCTION notify_regulations_changed() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('regulations_changed', COALESCE(NEW.id, OLD.id)::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS regulations_notify_trigger ON regulations;
+CREATE TRIGGER regulations_notify_trigger
+    AFTER INSERT OR UPDATE OR DELETE ON regulations
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_regulations_changed();
+
 -- Create function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column() RETURNS TRIGGER AS $$
 BEGIN
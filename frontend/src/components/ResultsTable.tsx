@@ -21,7 +21,7 @@ import {
   FilterOutlined
 } from '@ant-design/icons';
 import { useDocumentStore } from '../stores/documentStore';
-import { ResultsTableProps, AnalysisResult, ExportFormat } from '../types';
+import { ResultsTableProps, AnalysisResult, ExportFormat, HighlightSpan } from '../types';
 import { exportResults } from '../services/api';
 import toast from 'react-hot-toast';
 
@@ -76,6 +76,54 @@ const renderHighlightedText = (text: string) => {
   );
 };
 
+const DELETED_STYLE: React.CSSProperties = {
+  backgroundColor: '#ffcdd2',
+  textDecoration: 'line-through',
+  color: '#d32f2f',
+  padding: '2px 4px',
+  borderRadius: '3px',
+  margin: '0 1px'
+};
+
+const INSERTED_STYLE: React.CSSProperties = {
+  backgroundColor: '#c8e6c9',
+  color: '#2e7d32',
+  padding: '2px 4px',
+  borderRadius: '3px',
+  margin: '0 1px'
+};
+
+// Функция для рендеринга текста по интервалам подсветки
+const renderSpans = (text: string, spans: HighlightSpan[]) => {
+  if (!text) return <Text type="secondary">Пусто</Text>;
+
+  const parts: React.ReactNode[] = [];
+  let position = 0;
+  spans.forEach(([start, end, op], index) => {
+    if (start > position) {
+      parts.push(<span key={`t${index}`}>{text.slice(position, start)}</span>);
+    }
+    parts.push(
+      <span key={`s${index}`} style={op === '-' ? DELETED_STYLE : INSERTED_STYLE}>
+        {text.slice(start, end)}
+      </span>
+    );
+    position = end;
+  });
+  if (position < text.length) {
+    parts.push(<span key="tail">{text.slice(position)}</span>);
+  }
+
+  return <span>{parts}</span>;
+};
+
+// Подсветка изменений: интервалы, затем устаревшая разметка, затем простой текст
+const renderChangeText = (text: string, spans?: HighlightSpan[], highlighted?: string) => {
+  if (spans) return renderSpans(text, spans);
+  if (highlighted) return renderHighlightedText(highlighted);
+  return text || <Text type="secondary">Пусто</Text>;
+};
+
 const ResultsTable: React.FC<ResultsTableProps> = ({
   results: propResults,
   loading = false,
@@ -195,10 +243,7 @@ const ResultsTable: React.FC<ResultsTableProps> = ({
       render: (text: string, record: AnalysisResult) => (
         <div style={{ maxHeight: '120px', overflowY: 'auto' }}>
           <div style={{ fontSize: '13px', lineHeight: '1.4' }}>
-            {record.highlightedOriginal ? 
-              renderHighlightedText(record.highlightedOriginal) : 
-              (text || <Text type="secondary">Пусто</Text>)
-            }
+            {renderChangeText(text, record.originalSpans, record.highlightedOriginal)}
           </div>
         </div>
       ),
@@ -211,10 +256,7 @@ const ResultsTable: React.FC<ResultsTableProps> = ({
       render: (text: string, record: AnalysisResult) => (
         <div style={{ maxHeight: '120px', overflowY: 'auto' }}>
           <div style={{ fontSize: '13px', lineHeight: '1.4' }}>
-            {record.highlightedModified ? 
-              renderHighlightedText(record.highlightedModified) : 
-              (text || <Text type="secondary">Пусто</Text>)
-            }
+            {renderChangeText(text, record.modifiedSpans, record.highlightedModified)}
           </div>
         </div>
       ),
@@ -26,8 +26,13 @@ export interface AnalysisResult {
   createdAt: string;
   highlightedOriginal?: string;
   highlightedModified?: string;
+  originalSpans?: HighlightSpan[];
+  modifiedSpans?: HighlightSpan[];
 }
 
+// Интервал подсветки: [начало, конец, '-' | '+'] в символах текста
+export type HighlightSpan = [number, number, '-' | '+'];
+
 export interface AnalysisResponse {
   analysisId: string;
   changes: AnalysisResult[];
@@ -22,13 +22,46 @@ st.set_page_config(
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
 
 
-def create_highlighted_html(text, is_original=True, highlighted_text=None):
+REVISION_STATUS_LABELS = {
+    "new": "новое",
+    "carried_over": "перенесено",
+    "resolved": "снято",
+    "new_in_this_round": "новое в этом раунде",
+    "unchanged_since_previous": "без изменений с прошлой редакции",
+    "reverted_to_reference": "возвращено к редакции СБЛ",
+}
+
+DELETED_STYLE = "background-color: #ffcdd2; color: #d32f2f; font-weight: bold;"
+INSERTED_STYLE = "background-color: #c8e6c9; color: #2e7d32; font-weight: bold;"
+
+
+def apply_spans(text, spans, wrap):
+    """Оборачивает интервалы [start, end, op] текста функцией wrap(fragment, op)"""
+    parts = []
+    position = 0
+    for start, end, op in spans:
+        parts.append(text[position:start])
+        parts.append(wrap(text[start:end], op))
+        position = end
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def create_highlighted_html(text, is_original=True, highlighted_text=None, spans=None):
     """Создает HTML с подсветкой изменений"""
     if not text or text == "N/A":
         return f'<div style="color: {"#d32f2f" if is_original else "#2e7d32"}; font-weight: bold; font-style: italic;">Пусто</div>'
 
-    # Если есть подсветка из backend, используем её
-    if highlighted_text:
+    # Интервалы подсветки из backend: один проход по тексту без регулярных выражений
+    if spans:
+        html_text = apply_spans(
+            text,
+            spans,
+            lambda fragment, op: f'<span style="{DELETED_STYLE if op == "-" else INSERTED_STYLE}">{fragment}</span>',
+        )
+        html_text = html_text.replace("\n", "<br>")
+    # Устаревшая разметка [-]/[+] из backend
+    elif highlighted_text:
         # Конвертируем формат подсветки из backend в HTML
         # [-]текст[/-] -> красная подсветка для удаленного
         # [+]текст[/+] -> зеленая подсветка для добавленного
@@ -74,15 +107,26 @@ def highlight_changes(original_text, modified_text):
 
 
 def create_comparison_html(
-    original_text, modified_text, highlighted_original=None, highlighted_modified=None
+    original_text,
+    modified_text,
+    highlighted_original=None,
+    highlighted_modified=None,
+    original_spans=None,
+    modified_spans=None,
 ):
     """Создает HTML для сравнения двух текстов с подсветкой"""
 
     original_html = create_highlighted_html(
-        original_text, is_original=True, highlighted_text=highlighted_original
+        original_text,
+        is_original=True,
+        highlighted_text=highlighted_original,
+        spans=original_spans,
     )
     modified_html = create_highlighted_html(
-        modified_text, is_original=False, highlighted_text=highlighted_modified
+        modified_text,
+        is_original=False,
+        highlighted_text=highlighted_modified,
+        spans=modified_spans,
     )
 
     comparison_html = f"""
@@ -128,6 +172,26 @@ def upload_documents():
             st.success(f"✅ Загружен: {client_doc.name}")
             st.info(f"Размер: {client_doc.size / 1024:.1f} KB")
 
+    # Трехстороннее сравнение: LLM анализирует только изменения текущего раунда
+    previous_client_doc = st.file_uploader(
+        "Предыдущая редакция клиента (необязательно)",
+        type=["pdf", "docx", "txt"],
+        key="previous_client_doc",
+    )
+
+    # Повторный раунд согласования: анализируются только изменения с прошлого анализа
+    previous_analysis_id = st.text_input(
+        "ID предыдущего анализа (необязательно)",
+        value=st.session_state.get("analysis_result", {}).get("analysisId", ""),
+        help="Укажите ID анализа предыдущей редакции клиента, чтобы повторно проанализировать только измененные подпункты",
+    )
+
+    # Большие документы: пословная подсветка вычисляется по требованию
+    lazy_detail = st.checkbox(
+        "Отложенная пословная подсветка",
+        help="Быстрое сравнение по разделам и подпунктам; пословные изменения загружаются при просмотре",
+    )
+
     # Кнопка запуска анализа
     if company_doc and client_doc:
         if st.button("🚀 Запустить анализ", type="primary", use_container_width=True):
@@ -148,9 +212,23 @@ def upload_documents():
                     }
 
                     # Отправляем запрос на API
+                    if previous_client_doc:
+                        files["previous_client_doc"] = (
+                            previous_client_doc.name,
+                            previous_client_doc.getvalue(),
+                            previous_client_doc.type,
+                        )
+
+                    data = {}
+                    if previous_analysis_id.strip():
+                        data["previous_analysis_id"] = previous_analysis_id.strip()
+                    if lazy_detail:
+                        data["lazy_detail"] = "true"
+
                     response = requests.post(
                         f"{API_BASE_URL}/api/compare",
                         files=files,
+                        data=data,
                         timeout=300,  # 5 минут таймаут
                     )
 
@@ -209,6 +287,16 @@ def display_results():
     with col4:
         st.metric("ID анализа", result.get("analysisId", "N/A")[:8] + "...")
 
+    if result.get("previousAnalysisId"):
+        st.caption(f"ID анализа: {result.get('analysisId')}")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Новых изменений", summary.get("newChanges", 0))
+        with col2:
+            st.metric("Перенесено с прошлого раунда", summary.get("carriedOverChanges", 0))
+        with col3:
+            st.metric("Снято", summary.get("resolvedChanges", 0))
+
     # Информация о документах
     st.subheader("📄 Анализируемые документы")
     doc_info = summary.get("documentPair", {})
@@ -234,17 +322,26 @@ def display_results():
         # Используем данные подсветки из backend
         original_text = change.get("originalText", "N/A")
         modified_text = change.get("modifiedText", "N/A")
-        highlighted_original = change.get("highlightedOriginal", original_text)
-        highlighted_modified = change.get("highlightedModified", modified_text)
 
-        # Конвертируем подсветку в markdown формат для таблицы
-        # [-]текст[/-] -> **текст** (жирный для удаленного)
-        # [+]текст[/+] -> **текст** (жирный для добавленного)
-        original_markdown = re.sub(r"\[-\](.*?)\[/-\]", r"**\1**", highlighted_original)
-        original_markdown = re.sub(r"\[\+\](.*?)\[/\+\]", r"**\1**", original_markdown)
+        # Выделяем измененные фрагменты жирным для таблицы
+        if change.get("originalSpans") is not None or change.get("modifiedSpans") is not None:
+            original_markdown = apply_spans(
+                original_text, change.get("originalSpans") or [], lambda fragment, op: f"**{fragment}**"
+            )
+            modified_markdown = apply_spans(
+                modified_text, change.get("modifiedSpans") or [], lambda fragment, op: f"**{fragment}**"
+            )
+        else:
+            # Устаревшая разметка:
+            # [-]текст[/-] -> **текст** (жирный для удаленного)
+            # [+]текст[/+] -> **текст** (жирный для добавленного)
+            highlighted_original = change.get("highlightedOriginal") or original_text
+            highlighted_modified = change.get("highlightedModified") or modified_text
+            original_markdown = re.sub(r"\[-\](.*?)\[/-\]", r"**\1**", highlighted_original)
+            original_markdown = re.sub(r"\[\+\](.*?)\[/\+\]", r"**\1**", original_markdown)
 
-        modified_markdown = re.sub(r"\[-\](.*?)\[/-\]", r"**\1**", highlighted_modified)
-        modified_markdown = re.sub(r"\[\+\](.*?)\[/\+\]", r"**\1**", modified_markdown)
+            modified_markdown = re.sub(r"\[-\](.*?)\[/-\]", r"**\1**", highlighted_modified)
+            modified_markdown = re.sub(r"\[\+\](.*?)\[/\+\]", r"**\1**", modified_markdown)
 
         # Создаем HTML для служб с отметками от нейросети
         services = change.get("requiredServices", [])
@@ -302,6 +399,11 @@ def display_results():
     for i, change in enumerate(changes):
         with st.expander(
             f"Изменение {i+1}: {change.get('changeType', 'N/A')} - {change.get('severity', 'N/A')}"
+            + "".join(
+                f" ({REVISION_STATUS_LABELS.get(change[key], change[key])})"
+                for key in ("roundStatus", "revisionStatus")
+                if change.get(key)
+            )
         ):
 
             # Подсветка изменений с помощью HTML
@@ -310,11 +412,42 @@ def display_results():
             highlighted_original = change.get("highlightedOriginal", None)
             highlighted_modified = change.get("highlightedModified", None)
 
+            # Пословная подсветка запрашивается по требованию
+            if change.get("detailPending") and st.button(
+                "🔍 Показать пословные изменения", key=f"detail_{change.get('id')}"
+            ):
+                try:
+                    response = requests.get(
+                        f"{API_BASE_URL}/api/analyses/{result.get('analysisId')}"
+                        f"/changes/{change.get('id')}/detail",
+                        timeout=30,
+                    )
+                    if response.status_code == 200:
+                        detail = response.json()
+                        change["originalSpans"] = detail["originalSpans"]
+                        change["modifiedSpans"] = detail["modifiedSpans"]
+                        change["detailPending"] = False
+                    else:
+                        st.error(f"❌ Ошибка при сравнении: {response.text}")
+                except requests.exceptions.RequestException as e:
+                    st.error(f"❌ Ошибка подключения: {e}")
+
             comparison_html = create_comparison_html(
-                original_text, modified_text, highlighted_original, highlighted_modified
+                original_text,
+                modified_text,
+                highlighted_original,
+                highlighted_modified,
+                change.get("originalSpans"),
+                change.get("modifiedSpans"),
             )
             st.markdown(comparison_html, unsafe_allow_html=True)
 
+            # Изменения сумм, ставок, дат и сроков
+            if change.get("factDeltas"):
+                st.markdown(
+                    "**🔢 Числовые условия:** " + "; ".join(change["factDeltas"])
+                )
+
             # Анализ ИИ
             st.markdown("**🤖 Анализ Ассистента:**")
             st.info(change.get("llmComment", "N/A"))